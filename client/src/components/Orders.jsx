@@ -4,13 +4,55 @@ export default function Orders() {
   const [orders, setOrders] = useState([])
   const [form, setForm] = useState({ patient_first_name: '', patient_last_name: '', dob: '', status: 'new' })
   const [loading, setLoading] = useState(false)
+  const [nextPage, setNextPage] = useState(null)
 
-  useEffect(() => { refresh() }, [])
+  useEffect(() => {
+    // The list says which change it already reflects; the stream starts right
+    // after it, so nothing made between the two requests is missed. Changes
+    // the page raced with may arrive again, and applying them twice is harmless.
+    let feed = null
+    let closed = false
+    refresh().then(seq => {
+      if (closed) return
+      feed = new EventSource('/api/orders/changes/stream/' + (seq === null ? '' : `?since=${seq}`))
+      for (const action of ['created', 'updated', 'deleted', 'archived']) {
+        feed.addEventListener(action, e => applyChange(JSON.parse(e.data)))
+      }
+    })
+    return () => {
+      closed = true
+      if (feed) feed.close()
+    }
+  }, [])
+
+  function applyChange(change) {
+    setOrders(list => {
+      const loaded = list.some(o => o.id === change.order_id)
+      if (!change.order) return loaded ? list.filter(o => o.id !== change.order_id) : list
+      if (loaded) return list.map(o => (o.id === change.order_id ? change.order : o))
+      // New orders go on top; an update to an order on a page not loaded stays there
+      return change.action === 'created' ? [change.order, ...list] : list
+    })
+  }
+
+  function nextLink(res) {
+    const match = (res.headers.get('Link') || '').match(/<([^>]+)>;\s*rel="next"/)
+    return match ? match[1] : null
+  }
 
   async function refresh() {
     const res = await fetch('/api/orders/')
     const data = await res.json()
     setOrders(data)
+    setNextPage(nextLink(res))
+    return res.headers.get('X-Changes-Seq')
+  }
+
+  async function loadMore() {
+    const res = await fetch(nextPage)
+    const data = await res.json()
+    setOrders(o => [...o, ...data])
+    setNextPage(nextLink(res))
   }
 
   async function submit(e) {
@@ -22,13 +64,11 @@ export default function Orders() {
       body: JSON.stringify(form)
     })
     setForm({ patient_first_name: '', patient_last_name: '', dob: '', status: 'new' })
-    await refresh()
     setLoading(false)
   }
 
   async function remove(id) {
     await fetch(`/api/orders/${id}/`, { method: 'DELETE' })
-    await refresh()
   }
 
   return (
@@ -59,6 +99,7 @@ export default function Orders() {
         ))}
         {orders.length === 0 && <li className="p-6 text-center text-gray-500">No orders yet</li>}
       </ul>
+      {nextPage && <button onClick={loadMore} className="text-blue-600 hover:text-blue-700">Load more</button>}
     </div>
   )
 }
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Order
+from .models import Order, OrderArchive, OrderDailyStat
+from .search import filter_by_search
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
@@ -7,3 +8,30 @@ class OrderAdmin(admin.ModelAdmin):
     list_filter = ['status', 'created_at']
     search_fields = ['patient_first_name', 'patient_last_name']
     ordering = ['-created_at']
+
+    def get_search_results(self, request, queryset, search_term):
+        # Prefix search through the FTS5 index instead of icontains scans
+        if not search_term.strip():
+            return queryset, False
+        return filter_by_search(queryset, search_term), False
+
+
+@admin.register(OrderDailyStat)
+class OrderDailyStatAdmin(admin.ModelAdmin):
+    list_display = ['day', 'status', 'count']
+    list_filter = ['status']
+    ordering = ['-day', 'status']
+
+
+@admin.register(OrderArchive)
+class OrderArchiveAdmin(admin.ModelAdmin):
+    list_display = ['patient_first_name', 'patient_last_name', 'dob', 'status', 'created_at', 'archived_at']
+    list_filter = ['archived_at']
+    search_fields = ['patient_last_name__istartswith', 'patient_first_name__istartswith']
+    ordering = ['-created_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
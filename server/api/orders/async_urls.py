@@ -0,0 +1,7 @@
+from django.urls import path
+from . import async_views
+
+urlpatterns = [
+    path('', async_views.orders_list, name='async_orders_list'),
+    path('<int:order_id>/', async_views.order_detail, name='async_order_detail'),
+]
@@ -0,0 +1,202 @@
+import json
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from rest_framework import status
+
+from . import cache as order_cache
+from . import conditional
+from .bulk import clean_order_fields
+from .changes import CHANGES_SEQ_HEADER, latest_change
+from .filters import FilterError, filter_orders
+from .models import Order, OrderArchive
+from .pagination import PaginationError, apaginate, link_header, parse_page_size
+from .renderers import dumps
+from .serializers import (
+    PAGINATION_FIELDS, FieldsError, order_rows, order_to_dict, parse_fields, position_getter,
+    row_serializer, select_columns,
+)
+from .updates import delete_order, patch_order, put_fields
+
+# Native async counterparts of orders_list and order_detail for ASGI
+# deployments. They use the async ORM and never block the event loop on a
+# worker thread per request. DRF has no async views, so these are plain
+# Django views; like the DRF ones they are CSRF-exempt. ETags, conditional
+# GET and If-Match come from the same validators as the sync views, run
+# through acondition().
+
+
+def acondition(etag_func, last_modified_func):
+    """
+    django.views.decorators.http.condition for async views. condition()
+    calls its validators directly, and these query the database, which the
+    event loop isn't allowed to do; here they run in a worker thread.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            last_modified = await sync_to_async(last_modified_func)(request, *args, **kwargs)
+            if last_modified and not timezone.is_aware(last_modified):
+                last_modified = timezone.make_aware(last_modified, dt_timezone.utc)
+            last_modified = int(last_modified.timestamp()) if last_modified else None
+            etag = await sync_to_async(etag_func)(request, *args, **kwargs)
+            etag = quote_etag(etag) if etag is not None else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+        return inner
+    return decorator
+
+
+def _with_etag(response, order):
+    response['ETag'] = quote_etag(conditional.order_etag(order.id, order.updated_at))
+    return response
+
+
+def _parse_body(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _parse_dob(value, default=None):
+    if value and isinstance(value, str):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            return default
+    return value or default
+
+
+def _json_response(data):
+    # Read responses go through the same encoder as FastJSONRenderer
+    return HttpResponse(dumps(data), content_type='application/json')
+
+
+async def _build_list_page(request):
+    fields = parse_fields(request.GET.get('fields'))
+    columns = select_columns(fields, PAGINATION_FIELDS)
+    orders = order_rows(filter_orders(Order.objects.all(), request.GET), columns)
+    page_size = parse_page_size(request.GET.get('limit'))
+    rows, next_cursor, prev_cursor = await apaginate(
+        orders, request.GET.get('cursor'), page_size, position=position_getter(columns)
+    )
+    to_dict = row_serializer(columns, fields)
+    return [to_dict(row) for row in rows], link_header(request, next_cursor, prev_cursor)
+
+
+@csrf_exempt
+@acondition(etag_func=conditional.list_etag, last_modified_func=conditional.list_last_modified)
+@require_http_methods(['GET', 'POST'])
+async def orders_list(request):
+    """Async orders_list - GET a page of orders (newest first), POST create new order"""
+    if request.method == 'GET':
+        try:
+            # Read before the page, as in the sync view
+            latest = await sync_to_async(latest_change)()
+            data, links = await order_cache.aget_or_build(
+                order_cache.list_key(request.get_full_path(), latest),
+                lambda: _build_list_page(request)
+            )
+        except (FieldsError, FilterError, PaginationError) as e:
+            return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        response = _json_response(data)
+        response[CHANGES_SEQ_HEADER] = str(latest[0])
+        if links:
+            response['Link'] = links
+        return response
+
+    data = _parse_body(request)
+    if data is None:
+        return JsonResponse({'error': 'Body must be a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
+    order = await Order.objects.acreate(
+        patient_first_name=data.get('patient_first_name', ''),
+        patient_last_name=data.get('patient_last_name', ''),
+        dob=_parse_dob(data.get('dob')),
+        status=data.get('status', 'new')
+    )
+    return JsonResponse(order_to_dict(order), status=status.HTTP_201_CREATED)
+
+
+async def _get_order_dict(order_id, fields):
+    try:
+        row = await order_rows(Order.objects.all(), fields).aget(id=order_id)
+    except Order.DoesNotExist:
+        row = await order_rows(OrderArchive.objects.all(), fields).aget(id=order_id)
+    return row_serializer(fields, fields)(row)
+
+
+async def _write_failed(order_id, expected_updated_at):
+    if expected_updated_at is not None and await Order.objects.filter(id=order_id).aexists():
+        return JsonResponse({'error': 'Order was modified'}, status=status.HTTP_412_PRECONDITION_FAILED)
+    return JsonResponse({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
+
+
+async def _write_order(request, order_id):
+    # If-Match is checked inside the one UPDATE or DELETE, as in the sync view
+    matched, expected_updated_at = conditional.if_match_version(request, order_id)
+    if not matched:
+        return JsonResponse({'error': 'If-Match does not match this order'},
+                            status=status.HTTP_412_PRECONDITION_FAILED)
+
+    if request.method == 'DELETE':
+        if not await sync_to_async(delete_order)(order_id, expected_updated_at):
+            return await _write_failed(order_id, expected_updated_at)
+        return JsonResponse({'message': 'Order deleted successfully'})
+
+    data = _parse_body(request)
+    if data is None:
+        return JsonResponse({'error': 'Body must be a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
+    if request.method == 'PATCH':
+        fields, error = clean_order_fields(data, partial=True)
+        if error:
+            return JsonResponse({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        fields = put_fields(data)
+    order = await sync_to_async(patch_order)(order_id, fields, expected_updated_at)
+    if order is None:
+        return await _write_failed(order_id, expected_updated_at)
+    return _with_etag(JsonResponse(order_to_dict(order)), order)
+
+
+@csrf_exempt
+@acondition(etag_func=conditional.detail_etag, last_modified_func=conditional.detail_last_modified)
+@require_http_methods(['GET', 'PUT', 'PATCH', 'DELETE'])
+async def order_detail(request, order_id):
+    """Async order_detail - GET, PUT, PATCH or DELETE one order"""
+    if request.method != 'GET':
+        # Single UPDATE or DELETE, no SELECT first
+        return await _write_order(request, order_id)
+
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+    except FieldsError as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        # The row version acondition() already read
+        updated_at = await sync_to_async(conditional.detail_last_modified)(request, order_id)
+        if updated_at is None:
+            raise Order.DoesNotExist
+        data = await order_cache.aget_or_build(
+            order_cache.detail_key(order_id, updated_at, fields),
+            lambda: _get_order_dict(order_id, fields)
+        )
+    except (Order.DoesNotExist, OrderArchive.DoesNotExist):
+        return JsonResponse({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
+    return _json_response(data)
@@ -0,0 +1,179 @@
+from datetime import datetime
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .filters import FILTER_PARAMS, STATUS_VALUES, filter_orders
+from .models import Order
+
+MAX_BULK_ITEMS = 1000
+UPDATABLE_FIELDS = ['patient_first_name', 'patient_last_name', 'dob', 'status']
+
+
+class BulkError(ValueError):
+    pass
+
+
+def clean_order_fields(item, partial):
+    """Validate one create/update payload, returning (fields, error)"""
+    if not isinstance(item, dict):
+        return None, 'must be an object'
+    fields = {name: item[name] for name in UPDATABLE_FIELDS if name in item}
+    if not partial:
+        fields.setdefault('patient_first_name', '')
+        fields.setdefault('patient_last_name', '')
+        fields.setdefault('status', 'new')
+
+    dob = fields.get('dob')
+    if dob:
+        try:
+            fields['dob'] = datetime.strptime(dob, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return None, 'dob must be YYYY-MM-DD'
+    elif 'dob' in fields:
+        fields['dob'] = None
+
+    if 'status' in fields and (not isinstance(fields['status'], str) or fields['status'] not in STATUS_VALUES):
+        return None, f"Unknown status: {fields['status']}"
+    for name in ('patient_first_name', 'patient_last_name'):
+        if name in fields and not isinstance(fields[name], str):
+            return None, f'{name} must be a string'
+    return fields, None
+
+
+def _is_id(value):
+    # JSON true/false arrive as bools, which are ints to isinstance()
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _validate(payload):
+    creates = payload.get('create') or []
+    updates = payload.get('update') or []
+    deletes = payload.get('delete') or []
+    if not all(isinstance(group, list) for group in (creates, updates, deletes)):
+        raise BulkError('create, update and delete must be arrays')
+    if len(creates) + len(updates) + len(deletes) > MAX_BULK_ITEMS:
+        raise BulkError(f'At most {MAX_BULK_ITEMS} items per request')
+
+    errors = {'create': [], 'update': [], 'delete': []}
+    clean_creates = []
+    for index, item in enumerate(creates):
+        fields, error = clean_order_fields(item, partial=False)
+        if error:
+            errors['create'].append({'index': index, 'error': error})
+        clean_creates.append(fields)
+
+    clean_updates = {}
+    for index, item in enumerate(updates):
+        fields, error = clean_order_fields(item, partial=True)
+        order_id = item.get('id') if isinstance(item, dict) else None
+        if not error and not _is_id(order_id):
+            error = 'id is required'
+        elif not error and order_id in clean_updates:
+            error = 'duplicate id'
+        if error:
+            errors['update'].append({'index': index, 'error': error})
+        else:
+            clean_updates[order_id] = fields
+
+    seen_deletes = set()
+    for index, order_id in enumerate(deletes):
+        if not _is_id(order_id):
+            error = 'id must be an integer'
+        elif order_id in clean_updates:
+            error = 'id is also being updated'
+        elif order_id in seen_deletes:
+            error = 'duplicate id'
+        else:
+            seen_deletes.add(order_id)
+            continue
+        errors['delete'].append({'index': index, 'error': error})
+
+    return clean_creates, clean_updates, deletes, errors
+
+
+def _delete_returning_ids(ids):
+    # One statement that also reports which ids existed; QuerySet.delete()
+    # would SELECT the ids first and run the Collector
+    if not ids:
+        return set()
+    connection = connections[router.db_for_write(Order)]
+    qn = connection.ops.quote_name
+    pk = qn(Order._meta.pk.column)
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {qn(Order._meta.db_table)} WHERE {pk} IN ({placeholders}) RETURNING {pk}', ids)
+        return {row[0] for row in cursor.fetchall()}
+
+
+def apply_bulk(payload):
+    """
+    Apply a batch of creates, partial updates and deletes in one transaction.
+
+    Creates go through a single bulk_create, updates through one bulk_update
+    after a single in_bulk fetch, and deletes through one
+    DELETE ... WHERE id IN (...) RETURNING id.
+    Returns (results, ok); when any item fails validation nothing is written
+    and results carry the per-item errors.
+    """
+    if not isinstance(payload, dict):
+        raise BulkError('Body must be an object')
+    creates, updates, deletes, errors = _validate(payload)
+    if any(errors.values()):
+        return errors, False
+
+    results = {'create': [], 'update': [], 'delete': []}
+    with transaction.atomic():
+        created = Order.objects.bulk_create([Order(**fields) for fields in creates])
+        for index, order in enumerate(created):
+            results['create'].append({'index': index, 'id': order.id, 'result': 'created'})
+
+        existing = Order.objects.in_bulk(list(updates))
+        changed_fields = {'updated_at'}
+        now = timezone.now()
+        for order_id, fields in updates.items():
+            order = existing.get(order_id)
+            if order is None:
+                continue
+            for name, value in fields.items():
+                setattr(order, name, value)
+            order.updated_at = now  # bulk_update bypasses auto_now
+            changed_fields.update(fields)
+        Order.objects.bulk_update(existing.values(), sorted(changed_fields))
+        for index, order_id in enumerate(updates):
+            result = 'updated' if order_id in existing else 'not_found'
+            results['update'].append({'index': index, 'id': order_id, 'result': result})
+
+        found = _delete_returning_ids(deletes)
+
+        for index, order_id in enumerate(deletes):
+            result = 'deleted' if order_id in found else 'not_found'
+            results['delete'].append({'index': index, 'id': order_id, 'result': result})
+
+    return results, True
+
+
+def transition_status(payload):
+    """
+    Move every order matching the filter to a new status with a single
+    UPDATE statement. Returns the number of rows changed.
+    """
+    if not isinstance(payload, dict):
+        raise BulkError('Body must be an object')
+    to_status = payload.get('to_status')
+    if to_status not in STATUS_VALUES:
+        raise BulkError('to_status must be one of: ' + ', '.join(sorted(STATUS_VALUES)))
+    criteria = payload.get('filter')
+    if not isinstance(criteria, dict) or not criteria:
+        raise BulkError('filter is required')
+    unknown = set(criteria) - FILTER_PARAMS
+    if unknown:
+        raise BulkError(f"Unknown filter: {', '.join(sorted(unknown))}")
+
+    params = {k: '' if v is None else str(v).strip() for k, v in criteria.items()}
+    # filter_orders() skips blank values, so an all-blank filter would match every order
+    if not any(value.strip(',') for value in params.values()):
+        raise BulkError('filter needs at least one non-empty criterion')
+
+    queryset = filter_orders(Order.objects.all(), params)
+    return queryset.exclude(status=to_status).update(status=to_status, updated_at=timezone.now())
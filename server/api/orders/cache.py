@@ -0,0 +1,82 @@
+import hashlib
+import threading
+
+from django.core.cache import caches
+
+# Read-through cache for order responses, keyed by versions the database
+# owns, so a write from any process (a web worker, archive_orders, the
+# shell) makes older entries unreachable without telling anyone, and they
+# age out through the backend's eviction. List pages are keyed by the newest
+# change-log entry, which the orders_order triggers append on every insert,
+# update and delete; detail entries by the row's updated_at, which every
+# write path sets. No TTLs or invalidation calls are involved.
+
+CACHE_ALIAS = 'orders'
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _record(hit):
+    with _stats_lock:
+        _stats['hits' if hit else 'misses'] += 1
+
+
+def get_or_build(key, builder):
+    """Return the cached value for key, calling builder() and storing it on a miss"""
+    value = _cache().get(key)
+    if value is not None:
+        _record(True)
+        return value
+    _record(False)
+    value = builder()
+    _cache().set(key, value, timeout=None)
+    return value
+
+
+async def aget_or_build(key, builder):
+    """Async get_or_build; builder is a coroutine function"""
+    value = await _cache().aget(key)
+    if value is not None:
+        _record(True)
+        return value
+    _record(False)
+    value = await builder()
+    await _cache().aset(key, value, timeout=None)
+    return value
+
+
+def list_key(full_path, latest_change):
+    # latest_change is changes.latest_change(), read before the page is
+    # built: a write racing with the build moves it on, orphaning whatever
+    # the build stores
+    seq, changed_at = latest_change
+    digest = hashlib.md5(full_path.encode()).hexdigest()
+    return f"orders:list:{seq}:{changed_at.isoformat() if changed_at else ''}:{digest}"
+
+
+def detail_key(order_id, updated_at, fields=()):
+    # fields (a ?fields= selection) shares the row's version, so a write
+    # retires every projection of the row together
+    key = f'orders:detail:{order_id}:{updated_at.isoformat()}'
+    return f"{key}:{','.join(fields)}" if fields else key
+
+
+def stats():
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats['hits'] = _stats['misses'] = 0
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Max
+
+from .models import Order, OrderChange
+from .serializers import order_rows, row_to_dict
+
+CHANGE_BATCH_SIZE = 500
+# Sent with the orders list: the last change the page already reflects, for
+# opening the stream with ?since= without a gap between the two
+CHANGES_SEQ_HEADER = 'X-Changes-Seq'
+HEARTBEAT_SECONDS = 15
+# Actions after which the order is still in the hot table
+LIVE_ACTIONS = ('created', 'updated')
+
+
+def latest_sequence():
+    return OrderChange.objects.aggregate(last=Max('id'))['last'] or 0
+
+
+def latest_change():
+    """
+    (seq, changed_at) of the newest change, or (0, None). Together they name
+    the state of the orders table: a sequence number freed by a rolled-back
+    write comes back with a later changed_at.
+    """
+    return OrderChange.objects.order_by('-id').values_list('id', 'changed_at').first() or (0, None)
+
+
+def fetch_changes(since, limit=CHANGE_BATCH_SIZE):
+    """
+    Changes with a sequence number above since, oldest first. created/updated
+    events carry the order as it is now (None if it was deleted since);
+    deleted and archived events carry only the id.
+    """
+    changes = list(
+        OrderChange.objects.filter(id__gt=since).order_by('id')
+        .values_list('id', 'order_id', 'action', 'changed_at')[:limit]
+    )
+    live_ids = {order_id for _, order_id, action, _ in changes if action in LIVE_ACTIONS}
+    orders = {row[0]: row_to_dict(row) for row in order_rows(Order.objects.filter(id__in=live_ids))}
+    return [
+        {
+            'seq': seq,
+            'order_id': order_id,
+            'action': action,
+            'changed_at': changed_at.isoformat(),
+            'order': orders.get(order_id) if action in LIVE_ACTIONS else None,
+        }
+        for seq, order_id, action, changed_at in changes
+    ]
+
+
+def _format_event(change):
+    return f"id: {change['seq']}\nevent: {change['action']}\ndata: {json.dumps(change)}\n\n"
+
+
+def _stream_limits(max_seconds, poll_seconds):
+    if max_seconds is None:
+        max_seconds = settings.ORDER_CHANGES_STREAM_SECONDS
+    if poll_seconds is None:
+        poll_seconds = settings.ORDER_CHANGES_POLL_SECONDS
+    return max_seconds, poll_seconds
+
+
+def iter_events(since, max_seconds=None, poll_seconds=None):
+    """
+    Yield SSE frames for every change after since, polling the log until
+    max_seconds have passed. EventSource clients reconnect on their own and
+    resume from the Last-Event-ID they last saw.
+    """
+    max_seconds, poll_seconds = _stream_limits(max_seconds, poll_seconds)
+    deadline = time.monotonic() + max_seconds
+    last_sent = time.monotonic()
+
+    yield 'retry: 3000\n\n'
+    while True:
+        batch = fetch_changes(since)
+        for change in batch:
+            yield _format_event(change)
+        if batch:
+            since = batch[-1]['seq']
+            last_sent = time.monotonic()
+            continue
+        if time.monotonic() >= deadline:
+            return
+        if time.monotonic() - last_sent >= HEARTBEAT_SECONDS:
+            yield ': keepalive\n\n'
+            last_sent = time.monotonic()
+        time.sleep(poll_seconds)
+
+
+async def aiter_events(since, max_seconds=None, poll_seconds=None):
+    """
+    iter_events() for ASGI. Django's ASGI handler buffers a sync iterator
+    to the end before sending it, so the stream has to be async to reach
+    the client as it happens; it waits on asyncio.sleep between polls.
+    """
+    max_seconds, poll_seconds = _stream_limits(max_seconds, poll_seconds)
+    deadline = time.monotonic() + max_seconds
+    last_sent = time.monotonic()
+
+    yield 'retry: 3000\n\n'
+    while True:
+        batch = await sync_to_async(fetch_changes)(since)
+        for change in batch:
+            yield _format_event(change)
+        if batch:
+            since = batch[-1]['seq']
+            last_sent = time.monotonic()
+            continue
+        if time.monotonic() >= deadline:
+            return
+        if time.monotonic() - last_sent >= HEARTBEAT_SECONDS:
+            yield ': keepalive\n\n'
+            last_sent = time.monotonic()
+        await asyncio.sleep(poll_seconds)
@@ -0,0 +1,109 @@
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Count, Max
+from django.utils.http import parse_etags
+
+from .filters import FilterError, filter_orders
+from .models import Order, OrderArchive
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# Validators for django.views.decorators.http.condition. They only read
+# updated_at (and a COUNT for lists), so a matching If-None-Match returns 304
+# before any order is loaded or serialized.
+
+
+def _make_etag(*parts):
+    return hashlib.md5('|'.join(str(p) for p in parts).encode()).hexdigest()
+
+
+def _list_state(request):
+    # condition() asks for the ETag and Last-Modified separately; aggregate once
+    if not hasattr(request, '_orders_list_state'):
+        try:
+            queryset = filter_orders(Order.objects.all(), request.GET)
+            request._orders_list_state = queryset.aggregate(last=Max('updated_at'), count=Count('id'))
+        except FilterError:
+            request._orders_list_state = None
+    return request._orders_list_state
+
+
+def list_etag(request):
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    state = _list_state(request)
+    if state is None:
+        return None
+    # The row count catches deletes, which leave max(updated_at) unchanged
+    return _make_etag(request.get_full_path(), state['last'], state['count'])
+
+
+def list_last_modified(request):
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    state = _list_state(request)
+    return state['last'] if state else None
+
+
+def _detail_state(request, order_id):
+    if not hasattr(request, '_order_detail_state'):
+        updated_at = Order.objects.filter(id=order_id).values_list('updated_at', flat=True).first()
+        if updated_at is None and request.method in ('GET', 'HEAD'):
+            # order_detail serves archived orders read-only
+            updated_at = OrderArchive.objects.filter(id=order_id).values_list('updated_at', flat=True).first()
+        request._order_detail_state = updated_at
+    return request._order_detail_state
+
+
+def order_etag(order_id, updated_at):
+    """
+    Detail ETags encode the row version (updated_at in microseconds) so PATCH
+    can turn If-Match back into a WHERE clause without reading the row.
+    """
+    micros = (updated_at - EPOCH) // timedelta(microseconds=1)
+    return f'{order_id}-{micros}'
+
+
+def parse_order_etag(etag, order_id):
+    """updated_at encoded in a detail ETag for order_id, or None if it isn't one"""
+    prefix, _, micros = etag.removeprefix('W/').strip('"').partition('-')
+    if prefix != str(order_id) or not micros.isdigit():
+        return None
+    return EPOCH + timedelta(microseconds=int(micros))
+
+
+def if_match_version(request, order_id):
+    """
+    (ok, updated_at) for the request's If-Match. updated_at is None when there
+    is nothing to check (no header or *); ok is False when the tag is not a
+    detail ETag of this order.
+    """
+    etags = parse_etags(request.headers.get('If-Match', ''))
+    if not etags or etags == ['*']:
+        return True, None
+    updated_at = parse_order_etag(etags[0], order_id)
+    return updated_at is not None, updated_at
+
+
+# Writes check If-Match themselves, atomically, in the WHERE clause of their
+# UPDATE or DELETE; a separate SELECT here could pass a version another
+# writer replaces before the write runs.
+WRITE_METHODS = ('PUT', 'PATCH', 'DELETE')
+
+
+def detail_etag(request, order_id):
+    if request.method in WRITE_METHODS:
+        # Echo the client's tag so condition() neither reads the row nor rejects
+        etags = parse_etags(request.headers.get('If-Match', ''))
+        return etags[0] if etags else None
+    updated_at = _detail_state(request, order_id)
+    if updated_at is None:
+        return None
+    return order_etag(order_id, updated_at)
+
+
+def detail_last_modified(request, order_id):
+    if request.method in WRITE_METHODS:
+        return None
+    return _detail_state(request, order_id)
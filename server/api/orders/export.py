@@ -0,0 +1,80 @@
+import csv
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from .renderers import dumps
+from .serializers import ORDER_FIELDS, order_rows, row_to_dict
+
+EXPORT_FIELDS = list(ORDER_FIELDS)
+EXPORT_CHUNK_SIZE = 2000
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class _Echo:
+    """File-like object whose write() hands the line straight back to csv.writer's caller"""
+
+    def write(self, value):
+        return value
+
+
+def _iter_rows(queryset):
+    # values_list + iterator() streams tuples from a server-side cursor in
+    # fixed-size chunks: no model instances and no result cache, so memory
+    # stays flat regardless of how many rows match.
+    return order_rows(queryset.order_by('id')).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+async def _aiter_rows(queryset):
+    # For ASGI, where Django would collect a sync iterator in full before
+    # sending any of it. QuerySet.aiterator() runs a values_list() query on
+    # the event loop, so the same cursor is read a chunk per thread hop.
+    rows = _iter_rows(queryset)
+    while True:
+        chunk = await sync_to_async(list)(islice(rows, EXPORT_CHUNK_SIZE))
+        for row in chunk:
+            yield row
+        if len(chunk) < EXPORT_CHUNK_SIZE:
+            return
+
+
+def _csv_line(writer, row):
+    return writer.writerow(['' if value is None else value for value in row_to_dict(row).values()])
+
+
+def iter_ndjson(queryset):
+    for row in _iter_rows(queryset):
+        yield dumps(row_to_dict(row)) + b'\n'
+
+
+def iter_csv(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in _iter_rows(queryset):
+        yield _csv_line(writer, row)
+
+
+async def aiter_ndjson(queryset):
+    async for row in _aiter_rows(queryset):
+        yield dumps(row_to_dict(row)) + b'\n'
+
+
+async def aiter_csv(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    async for row in _aiter_rows(queryset):
+        yield _csv_line(writer, row)
+
+
+RENDERERS = {
+    'ndjson': iter_ndjson,
+    'csv': iter_csv,
+}
+ASYNC_RENDERERS = {
+    'ndjson': aiter_ndjson,
+    'csv': aiter_csv,
+}
@@ -0,0 +1,68 @@
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Order
+
+STATUS_VALUES = {value for value, _ in Order._meta.get_field('status').choices}
+
+# query parameter -> ORM lookup
+DATE_FILTERS = {
+    'created_after': 'created_at__gte',
+    'created_before': 'created_at__lt',
+    'updated_after': 'updated_at__gte',
+    'updated_before': 'updated_at__lt',
+}
+
+
+# query parameter -> case-insensitive prefix lookup (served by order_patient_name_idx)
+NAME_FILTERS = {
+    'last_name': 'patient_last_name__istartswith',
+    'first_name': 'patient_first_name__istartswith',
+}
+
+FILTER_PARAMS = {'status', *DATE_FILTERS, *NAME_FILTERS}
+
+
+class FilterError(ValueError):
+    pass
+
+
+def parse_timestamp(value):
+    """Parse an ISO datetime or plain YYYY-MM-DD date (midnight UTC)"""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def filter_orders(queryset, params):
+    """Apply status, created/updated window and name prefix filters from query params"""
+    statuses = [s for s in params.get('status', '').split(',') if s]
+    if statuses:
+        unknown = set(statuses) - STATUS_VALUES
+        if unknown:
+            raise FilterError(f"Unknown status: {', '.join(sorted(unknown))}")
+        queryset = queryset.filter(status__in=statuses)
+
+    for param, lookup in DATE_FILTERS.items():
+        value = params.get(param)
+        if not value:
+            continue
+        try:
+            queryset = queryset.filter(**{lookup: parse_timestamp(value)})
+        except ValueError:
+            raise FilterError(f'{param} must be an ISO date or datetime')
+
+    for param, lookup in NAME_FILTERS.items():
+        value = params.get(param, '').strip()
+        if value:
+            queryset = queryset.filter(**{lookup: value})
+
+    return queryset
@@ -0,0 +1,60 @@
+from datetime import date
+
+from django.db import connection, transaction
+from django.db.models.functions import Collate
+
+from .models import Order
+
+# Orders created straight from an uploaded PDF. Before inserting, the
+# patient is looked up by (last name, first name, dob) with the names
+# compared NOCASE, which is exactly how order_patient_name_idx is built, so
+# the check is an index seek however many orders there are.
+
+
+def find_patient_order(first_name, last_name, dob):
+    """Newest order for this patient, or None"""
+    return (
+        Order.objects
+        .alias(last=Collate('patient_last_name', 'NOCASE'), first=Collate('patient_first_name', 'NOCASE'))
+        .filter(last=last_name.strip(), first=first_name.strip(), dob=dob)
+        .order_by('-created_at', '-id')
+        .first()
+    )
+
+
+def _parse_dob(value):
+    # normalize_date only rearranges digits, so 'DOB: 31/12/1980' arrives as
+    # '1980-31-12'; a date that doesn't exist is treated as no date at all
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def _take_write_lock():
+    # A no-op write makes SQLite take the write lock now rather than at the
+    # INSERT, whatever transaction_mode the connection uses
+    with connection.cursor() as cursor:
+        cursor.execute(f'UPDATE {Order._meta.db_table} SET id = id WHERE 0')
+
+
+def get_or_create_patient_order(extracted):
+    """
+    (order, created) for the patient in upload_pdf's extracted fields: the
+    existing order for the same patient, or a new one. Without all three of
+    last name, first name and a valid DOB there's no reliable match, so a
+    new order is always created (an invalid DOB is stored as none).
+    """
+    first_name = (extracted.get('patient_first_name') or '').strip()
+    last_name = (extracted.get('patient_last_name') or '').strip()
+    dob = _parse_dob(extracted.get('dob'))
+
+    # Hold the write lock from the lookup on, so two uploads for the same
+    # patient can't both miss and insert
+    with transaction.atomic():
+        _take_write_lock()
+        if first_name and last_name and dob:
+            order = find_patient_order(first_name, last_name, dob)
+            if order is not None:
+                return order, False
+        return Order.objects.create(patient_first_name=first_name, patient_last_name=last_name, dob=dob), True
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.orders.archive import ARCHIVE_BATCH_SIZE, archivable_orders, archive_orders
+
+
+class Command(BaseCommand):
+    help = 'Move complete orders not updated for a while from Order to OrderArchive, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help=f'Archive orders untouched for this many days (default ORDER_ARCHIVE_AFTER_DAYS, '
+                                 f'{settings.ORDER_ARCHIVE_AFTER_DAYS})')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+                            help=f'Orders moved per transaction (default {ARCHIVE_BATCH_SIZE})')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many orders would move')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.ORDER_ARCHIVE_AFTER_DAYS
+        if options['dry_run']:
+            count = archivable_orders(days).count()
+            self.stdout.write(f'{count} orders would be archived (complete, untouched for {days} days)')
+            return
+        moved = archive_orders(days, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} orders untouched for {days} days'))
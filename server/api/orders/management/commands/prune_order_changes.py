@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.orders.models import OrderChange
+
+
+class Command(BaseCommand):
+    help = 'Delete change feed entries older than the retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Keep this many days of changes (default 7)')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        # The newest entry always stays: the order cache and stream clients
+        # rely on the newest change never going backwards
+        latest = OrderChange.objects.order_by('-id').values_list('id', flat=True)[:1]
+        deleted, _ = OrderChange.objects.filter(changed_at__lt=cutoff).exclude(id__in=latest).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} order changes older than {options["days"]} days'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.orders.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-day order status summary from the orders and archive tables'
+
+    def handle(self, *args, **options):
+        buckets = rebuild_stats()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {buckets} order stat buckets'))
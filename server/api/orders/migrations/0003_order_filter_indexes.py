@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:34
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='order_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(django.db.models.functions.comparison.Collate('patient_last_name', 'NOCASE'), django.db.models.functions.comparison.Collate('patient_first_name', 'NOCASE'), models.F('dob'), name='order_patient_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['updated_at'], name='order_updated_idx'),
+        ),
+    ]
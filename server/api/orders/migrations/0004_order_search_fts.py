@@ -0,0 +1,58 @@
+from django.db import migrations
+
+# External-content FTS5 index over patient names. It stores only the token
+# index; rows are read back from orders_order. The triggers keep it in sync
+# for every write path, including bulk_create/bulk_update and queryset.update().
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE orders_order_fts USING fts5(
+        patient_first_name,
+        patient_last_name,
+        content='orders_order',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='1 2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER orders_order_fts_ai AFTER INSERT ON orders_order BEGIN
+        INSERT INTO orders_order_fts(rowid, patient_first_name, patient_last_name)
+        VALUES (new.id, new.patient_first_name, new.patient_last_name);
+    END
+    """,
+    """
+    CREATE TRIGGER orders_order_fts_ad AFTER DELETE ON orders_order BEGIN
+        INSERT INTO orders_order_fts(orders_order_fts, rowid, patient_first_name, patient_last_name)
+        VALUES ('delete', old.id, old.patient_first_name, old.patient_last_name);
+    END
+    """,
+    """
+    CREATE TRIGGER orders_order_fts_au AFTER UPDATE OF patient_first_name, patient_last_name ON orders_order BEGIN
+        INSERT INTO orders_order_fts(orders_order_fts, rowid, patient_first_name, patient_last_name)
+        VALUES ('delete', old.id, old.patient_first_name, old.patient_last_name);
+        INSERT INTO orders_order_fts(rowid, patient_first_name, patient_last_name)
+        VALUES (new.id, new.patient_first_name, new.patient_last_name);
+    END
+    """,
+    # Index the orders that already exist
+    "INSERT INTO orders_order_fts(orders_order_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS orders_order_fts_au',
+    'DROP TRIGGER IF EXISTS orders_order_fts_ad',
+    'DROP TRIGGER IF EXISTS orders_order_fts_ai',
+    'DROP TABLE IF EXISTS orders_order_fts',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_order_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_SQL, DROP_SQL),
+    ]
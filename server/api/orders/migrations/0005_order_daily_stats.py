@@ -0,0 +1,71 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:39
+
+from django.db import migrations, models
+
+# Triggers keep OrderDailyStat in step with every write to orders_order,
+# including bulk_create/bulk_update, queryset.update() and queryset.delete().
+# Buckets are UTC days; empty buckets are removed.
+
+TRIGGER_SQL = [
+    """
+    CREATE TRIGGER orders_order_stats_ai AFTER INSERT ON orders_order BEGIN
+        INSERT INTO orders_orderdailystat(day, status, count)
+        VALUES (date(new.created_at), new.status, 1)
+        ON CONFLICT(day, status) DO UPDATE SET count = count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER orders_order_stats_ad AFTER DELETE ON orders_order BEGIN
+        UPDATE orders_orderdailystat SET count = count - 1
+        WHERE day = date(old.created_at) AND status = old.status;
+        DELETE FROM orders_orderdailystat
+        WHERE day = date(old.created_at) AND status = old.status AND count <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER orders_order_stats_au AFTER UPDATE OF status, created_at ON orders_order
+    WHEN old.status IS NOT new.status OR date(old.created_at) IS NOT date(new.created_at) BEGIN
+        UPDATE orders_orderdailystat SET count = count - 1
+        WHERE day = date(old.created_at) AND status = old.status;
+        DELETE FROM orders_orderdailystat
+        WHERE day = date(old.created_at) AND status = old.status AND count <= 0;
+        INSERT INTO orders_orderdailystat(day, status, count)
+        VALUES (date(new.created_at), new.status, 1)
+        ON CONFLICT(day, status) DO UPDATE SET count = count + 1;
+    END
+    """,
+    # Backfill from the orders that already exist
+    """
+    INSERT INTO orders_orderdailystat(day, status, count)
+    SELECT date(created_at), status, COUNT(*) FROM orders_order GROUP BY date(created_at), status
+    """,
+]
+
+DROP_TRIGGER_SQL = [
+    'DROP TRIGGER IF EXISTS orders_order_stats_au',
+    'DROP TRIGGER IF EXISTS orders_order_stats_ad',
+    'DROP TRIGGER IF EXISTS orders_order_stats_ai',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_search_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'status'), name='order_stat_day_status_uniq')],
+            },
+        ),
+        migrations.RunSQL(TRIGGER_SQL, DROP_TRIGGER_SQL),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+# Triggers append to the change log on every write to orders_order, whichever
+# path made it. AUTOINCREMENT ids never go backwards or get reused, so they
+# serve as the feed's resumable sequence.
+
+TRIGGER_SQL = [
+    """
+    CREATE TRIGGER orders_order_changes_ai AFTER INSERT ON orders_order BEGIN
+        INSERT INTO orders_orderchange(order_id, action, changed_at)
+        VALUES (new.id, 'created', strftime('%Y-%m-%d %H:%M:%f', 'now'));
+    END
+    """,
+    """
+    CREATE TRIGGER orders_order_changes_au AFTER UPDATE ON orders_order BEGIN
+        INSERT INTO orders_orderchange(order_id, action, changed_at)
+        VALUES (new.id, 'updated', strftime('%Y-%m-%d %H:%M:%f', 'now'));
+    END
+    """,
+    """
+    CREATE TRIGGER orders_order_changes_ad AFTER DELETE ON orders_order BEGIN
+        INSERT INTO orders_orderchange(order_id, action, changed_at)
+        VALUES (old.id, 'deleted', strftime('%Y-%m-%d %H:%M:%f', 'now'));
+    END
+    """,
+]
+
+DROP_TRIGGER_SQL = [
+    'DROP TRIGGER IF EXISTS orders_order_changes_ad',
+    'DROP TRIGGER IF EXISTS orders_order_changes_au',
+    'DROP TRIGGER IF EXISTS orders_order_changes_ai',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_daily_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=10)),
+                ('changed_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunSQL(TRIGGER_SQL, DROP_TRIGGER_SQL),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:50
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+# Moving an order into the archive deletes it from orders_order, which fires
+# the stats and change-log triggers. Matching stats triggers on the archive
+# add the row back to its bucket, so stats keep counting archived orders, and
+# the change-log delete trigger reports archived rather than deleted for ids
+# that are already in the archive (the move inserts there first).
+
+TRIGGER_SQL = [
+    """
+    CREATE TRIGGER orders_orderarchive_stats_ai AFTER INSERT ON orders_orderarchive BEGIN
+        INSERT INTO orders_orderdailystat(day, status, count)
+        VALUES (date(new.created_at), new.status, 1)
+        ON CONFLICT(day, status) DO UPDATE SET count = count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER orders_orderarchive_stats_ad AFTER DELETE ON orders_orderarchive BEGIN
+        UPDATE orders_orderdailystat SET count = count - 1
+        WHERE day = date(old.created_at) AND status = old.status;
+        DELETE FROM orders_orderdailystat
+        WHERE day = date(old.created_at) AND status = old.status AND count <= 0;
+    END
+    """,
+    'DROP TRIGGER orders_order_changes_ad',
+    """
+    CREATE TRIGGER orders_order_changes_ad AFTER DELETE ON orders_order BEGIN
+        INSERT INTO orders_orderchange(order_id, action, changed_at)
+        VALUES (
+            old.id,
+            CASE WHEN EXISTS (SELECT 1 FROM orders_orderarchive WHERE id = old.id)
+                THEN 'archived' ELSE 'deleted' END,
+            strftime('%Y-%m-%d %H:%M:%f', 'now')
+        );
+    END
+    """,
+]
+
+DROP_TRIGGER_SQL = [
+    'DROP TRIGGER IF EXISTS orders_order_changes_ad',
+    """
+    CREATE TRIGGER orders_order_changes_ad AFTER DELETE ON orders_order BEGIN
+        INSERT INTO orders_orderchange(order_id, action, changed_at)
+        VALUES (old.id, 'deleted', strftime('%Y-%m-%d %H:%M:%f', 'now'));
+    END
+    """,
+    'DROP TRIGGER IF EXISTS orders_orderarchive_stats_ad',
+    'DROP TRIGGER IF EXISTS orders_orderarchive_stats_ai',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_change_log'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orderchange',
+            name='action',
+            field=models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted'), ('archived', 'Archived')], max_length=10),
+        ),
+        migrations.CreateModel(
+            name='OrderArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('patient_first_name', models.CharField(max_length=100)),
+                ('patient_last_name', models.CharField(max_length=100)),
+                ('dob', models.DateField(blank=True, null=True)),
+                ('status', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-created_at', '-id'], name='order_archive_created_id_idx'), models.Index(django.db.models.functions.comparison.Collate('patient_last_name', 'NOCASE'), django.db.models.functions.comparison.Collate('patient_first_name', 'NOCASE'), models.F('dob'), name='order_archive_name_idx')],
+            },
+        ),
+        migrations.RunSQL(TRIGGER_SQL, DROP_TRIGGER_SQL),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Collate
 
 class Order(models.Model):
     patient_first_name = models.CharField(max_length=100)
@@ -12,5 +14,85 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Serves keyset pagination on (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+            # Status filter plus the same keyset ordering (list view, admin list_filter)
+            models.Index(fields=['status', '-created_at', '-id'], name='order_status_created_idx'),
+            # NOCASE so case-insensitive prefix lookups (istartswith -> LIKE 'x%') can range-scan it
+            models.Index(
+                Collate('patient_last_name', 'NOCASE'),
+                Collate('patient_first_name', 'NOCASE'),
+                F('dob'),
+                name='order_patient_name_idx',
+            ),
+            # Incremental exports and change polling by updated_at
+            models.Index(fields=['updated_at'], name='order_updated_idx'),
+        ]
+
     def __str__(self):
         return f"{self.patient_first_name} {self.patient_last_name}"
+
+
+class OrderDailyStat(models.Model):
+    """Order count per (created day, status), maintained by triggers on Order"""
+    day = models.DateField()
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='order_stat_day_status_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.count}"
+
+
+class OrderChange(models.Model):
+    """Append-only change log for orders; the id is the feed's sequence number"""
+    ACTIONS = [
+        ('created', 'Created'),
+        ('updated', 'Updated'),
+        ('deleted', 'Deleted'),
+        ('archived', 'Archived'),
+    ]
+
+    order_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    changed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"#{self.id} order {self.order_id} {self.action}"
+
+
+class OrderArchive(models.Model):
+    """
+    Completed orders moved out of Order by the archive_orders command. Rows
+    keep their Order id and columns and are read-only from then on.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    patient_first_name = models.CharField(max_length=100)
+    patient_last_name = models.CharField(max_length=100)
+    dob = models.DateField(null=True, blank=True)
+    status = models.CharField(max_length=20)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the archive list
+            models.Index(fields=['-created_at', '-id'], name='order_archive_created_id_idx'),
+            # Looking up a patient's past orders by name prefix
+            models.Index(
+                Collate('patient_last_name', 'NOCASE'),
+                Collate('patient_first_name', 'NOCASE'),
+                F('dob'),
+                name='order_archive_name_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.patient_first_name} {self.patient_last_name} (archived)"
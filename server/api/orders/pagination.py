@@ -0,0 +1,121 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(created_at, order_id, direction):
+    """Pack a (created_at, id) position into an opaque URL-safe token"""
+    raw = json.dumps([created_at.isoformat(), order_id, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Unpack a cursor token, raising PaginationError if it was tampered with"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, order_id, direction = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        return datetime.fromisoformat(created_at), int(order_id), direction
+    except (ValueError, TypeError):
+        raise PaginationError('Invalid cursor')
+
+
+def parse_page_size(value):
+    """Clamp the requested page size to [1, MAX_PAGE_SIZE]"""
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise PaginationError('limit must be an integer')
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def _page_queryset(queryset, cursor, page_size):
+    direction = 'next'
+    if cursor:
+        created_at, order_id, direction = decode_cursor(cursor)
+        if direction == 'next':
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=order_id)
+            )
+        else:
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=order_id)
+            )
+
+    if direction == 'next':
+        queryset = queryset.order_by('-created_at', '-id')
+    else:
+        queryset = queryset.order_by('created_at', 'id')
+
+    # Fetch one extra row to learn whether another page exists
+    return queryset[:page_size + 1], direction
+
+
+def _attribute_position(row):
+    return row.created_at, row.id
+
+
+def _finish_page(rows, cursor, direction, page_size, position):
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if direction == 'prev':
+        rows.reverse()
+
+    if not rows:
+        return rows, None, None
+
+    first, last = rows[0], rows[-1]
+    has_next = has_more if direction == 'next' else True
+    has_prev = bool(cursor) if direction == 'next' else has_more
+    next_cursor = encode_cursor(*position(last), 'next') if has_next else None
+    prev_cursor = encode_cursor(*position(first), 'prev') if has_prev else None
+    return rows, next_cursor, prev_cursor
+
+
+def paginate(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE, position=_attribute_position):
+    """
+    Keyset pagination over (created_at, id), newest first.
+
+    Each page is a range scan on the created_at/id index starting at the
+    cursor position, so page 1000 costs the same as page 1. Rows inserted
+    while a client is paging always sort ahead of the first page and never
+    shift the rows it has yet to see.
+
+    Rows may be model instances or values_list() tuples; position maps a row
+    to its (created_at, id) for the cursors.
+
+    Returns (rows, next_cursor, prev_cursor).
+    """
+    page, direction = _page_queryset(queryset, cursor, page_size)
+    return _finish_page(list(page), cursor, direction, page_size, position)
+
+
+async def apaginate(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE, position=_attribute_position):
+    """Async counterpart of paginate() for async views"""
+    page, direction = _page_queryset(queryset, cursor, page_size)
+    return _finish_page([row async for row in page], cursor, direction, page_size, position)
+
+
+def link_header(request, next_cursor, prev_cursor):
+    """Build an RFC 8288 Link header pointing at the neighbouring pages"""
+    links = []
+    for rel, token in (('next', next_cursor), ('prev', prev_cursor)):
+        if not token:
+            continue
+        params = request.GET.copy()
+        params['cursor'] = token
+        url = request.build_absolute_uri(request.path) + '?' + params.urlencode()
+        links.append(f'<{url}>; rel="{rel}"')
+    return ', '.join(links)
@@ -0,0 +1,33 @@
+import json
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+_ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+_encoder = JSONEncoder()
+
+
+def dumps(data):
+    """
+    Compact UTF-8 JSON bytes, through orjson when it is installed. Types
+    orjson does not handle natively (datetimes, Decimal, lazy strings) go
+    through DRF's encoder so the output matches JSONRenderer's.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_encoder.default, option=_ORJSON_OPTIONS)
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson when it is installed"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Indented output (?indent / Accept: ...; indent=N) stays with DRF
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
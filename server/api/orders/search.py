@@ -0,0 +1,44 @@
+import re
+
+from django.db.models.expressions import RawSQL
+
+from .models import Order
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def build_match_query(text):
+    """
+    Turn free text into an FTS5 MATCH expression: every word must match the
+    start of a first or last name. Each word is quoted, so FTS5 operators
+    typed by the user are treated as plain text.
+    """
+    tokens = _TOKEN_RE.findall(text or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_orders(text, limit=DEFAULT_SEARCH_LIMIT):
+    """Return orders whose names match text, best bm25 rank first"""
+    match = build_match_query(text)
+    if not match:
+        return []
+    return list(Order.objects.raw(
+        'SELECT o.* FROM orders_order_fts f '
+        'JOIN orders_order o ON o.id = f.rowid '
+        'WHERE orders_order_fts MATCH %s '
+        'ORDER BY f.rank LIMIT %s',
+        [match, limit],
+    ))
+
+
+def filter_by_search(queryset, text):
+    """Restrict queryset to orders matching text, as a subquery on the FTS index"""
+    match = build_match_query(text)
+    if not match:
+        return queryset.none()
+    return queryset.filter(id__in=RawSQL(
+        'SELECT rowid FROM orders_order_fts WHERE orders_order_fts MATCH %s', [match]
+    ))
@@ -0,0 +1,88 @@
+# Column order of the tuples order_rows() yields; row_to_dict() unpacks them
+# positionally, so keep the two in step.
+ORDER_FIELDS = ('id', 'patient_first_name', 'patient_last_name', 'dob', 'status', 'created_at', 'updated_at')
+CREATED_AT_INDEX = ORDER_FIELDS.index('created_at')
+# Columns keyset pagination reads from every row, requested or not
+PAGINATION_FIELDS = ('id', 'created_at')
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+# field -> converter applied by sparse serializers; other fields pass through
+_FORMATTERS = {'dob': _isoformat, 'created_at': _isoformat, 'updated_at': _isoformat}
+
+
+def parse_fields(value):
+    """
+    The ?fields= selection as a tuple in ORDER_FIELDS order, or every field
+    when value is empty. Raises FieldsError for names that aren't fields.
+    """
+    requested = {name.strip() for name in (value or '').split(',')} - {''}
+    if not requested:
+        return ORDER_FIELDS
+    unknown = requested - set(ORDER_FIELDS)
+    if unknown:
+        raise FieldsError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in ORDER_FIELDS if name in requested)
+
+
+def select_columns(fields, required=()):
+    """Columns to fetch for fields plus any the caller needs internally"""
+    return tuple(name for name in ORDER_FIELDS if name in fields or name in required)
+
+
+def order_rows(queryset, columns=ORDER_FIELDS):
+    """
+    Restrict queryset to the serialized columns as plain tuples. Reads through
+    here skip model instantiation, which dominates the cost of large lists.
+    """
+    return queryset.values_list(*columns)
+
+
+def row_to_dict(row):
+    """JSON-ready representation of a tuple from order_rows()"""
+    order_id, first_name, last_name, dob, order_status, created_at, updated_at = row
+    return {
+        'id': order_id,
+        'patient_first_name': first_name,
+        'patient_last_name': last_name,
+        'dob': dob.isoformat() if dob else None,
+        'status': order_status,
+        'created_at': created_at.isoformat(),
+        'updated_at': updated_at.isoformat()
+    }
+
+
+def row_serializer(columns, fields):
+    """Function turning an order_rows(queryset, columns) tuple into a dict of fields"""
+    if columns == fields == ORDER_FIELDS:
+        return row_to_dict
+    picks = [(name, columns.index(name), _FORMATTERS.get(name)) for name in fields]
+
+    def to_dict(row):
+        return {name: convert(row[i]) if convert else row[i] for name, i, convert in picks}
+    return to_dict
+
+
+def row_position(row):
+    """(created_at, id) of a tuple from order_rows(), for keyset pagination"""
+    return row[CREATED_AT_INDEX], row[0]
+
+
+def position_getter(columns):
+    """row_position() for tuples of the given columns"""
+    if columns == ORDER_FIELDS:
+        return row_position
+    created_at, order_id = columns.index('created_at'), columns.index('id')
+    return lambda row: (row[created_at], row[order_id])
+
+
+def order_to_dict(order):
+    """JSON-ready representation of an Order instance"""
+    return row_to_dict([getattr(order, name) for name in ORDER_FIELDS])
@@ -0,0 +1,48 @@
+from collections import defaultdict
+
+from django.db import connection, transaction
+
+from .filters import STATUS_VALUES
+from .models import OrderDailyStat
+
+# Archived orders still count; the archive has its own stats triggers
+REBUILD_SQL = (
+    'INSERT INTO orders_orderdailystat(day, status, count) '
+    'SELECT date(created_at), status, COUNT(*) FROM ('
+    'SELECT created_at, status FROM orders_order '
+    'UNION ALL SELECT created_at, status FROM orders_orderarchive'
+    ') GROUP BY date(created_at), status'
+)
+
+
+def rebuild_stats():
+    """Recompute every bucket from orders_order and the archive. Returns the number of buckets."""
+    with transaction.atomic():
+        OrderDailyStat.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(REBUILD_SQL)
+        return OrderDailyStat.objects.count()
+
+
+def order_stats(day_from=None, day_to=None):
+    """
+    Summarise the per-day buckets. Reads only OrderDailyStat, so the cost
+    grows with the number of (day, status) buckets, not the number of orders.
+    """
+    buckets = OrderDailyStat.objects.order_by('day')
+    if day_from:
+        buckets = buckets.filter(day__gte=day_from)
+    if day_to:
+        buckets = buckets.filter(day__lte=day_to)
+
+    by_status = dict.fromkeys(sorted(STATUS_VALUES), 0)
+    by_day = defaultdict(lambda: dict.fromkeys(sorted(STATUS_VALUES), 0))
+    for day, status, count in buckets.values_list('day', 'status', 'count'):
+        by_status[status] = by_status.get(status, 0) + count
+        by_day[day][status] = count
+
+    return {
+        'total': sum(by_status.values()),
+        'by_status': by_status,
+        'by_day': [{'day': day.isoformat(), **counts} for day, counts in by_day.items()],
+    }
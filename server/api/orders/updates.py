@@ -0,0 +1,71 @@
+from datetime import datetime
+
+from django.db import connections, router
+from django.utils import timezone
+
+from .models import Order
+
+
+def put_fields(data):
+    """
+    Fields a PUT body sets. PUT has always been lenient: missing keys keep
+    their value and a dob that isn't YYYY-MM-DD leaves the stored one alone.
+    """
+    fields = {name: data[name] for name in ('patient_first_name', 'patient_last_name', 'status') if name in data}
+    dob = data.get('dob')
+    if dob and isinstance(dob, str):
+        try:
+            fields['dob'] = datetime.strptime(dob, '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    return fields
+
+
+def patch_order(order_id, fields, expected_updated_at=None):
+    """
+    Write only the given fields plus updated_at in a single
+    UPDATE ... WHERE id = ? [AND updated_at = ?] RETURNING statement, with no
+    SELECT beforehand.
+
+    Returns the updated Order, or None when no row matched (missing order or,
+    with expected_updated_at, a stale version).
+    """
+    db = router.db_for_write(Order)
+    connection = connections[db]
+    meta = Order._meta
+    qn = connection.ops.quote_name
+
+    fields = {**fields, 'updated_at': timezone.now()}
+    assignments, params = [], []
+    for name, value in fields.items():
+        field = meta.get_field(name)
+        assignments.append(f'{qn(field.column)} = %s')
+        params.append(field.get_db_prep_save(value, connection))
+
+    where = [f'{qn(meta.pk.column)} = %s']
+    params.append(order_id)
+    if expected_updated_at is not None:
+        updated_field = meta.get_field('updated_at')
+        where.append(f'{qn(updated_field.column)} = %s')
+        params.append(updated_field.get_db_prep_value(expected_updated_at, connection))
+
+    columns = ', '.join(qn(field.column) for field in meta.concrete_fields)
+    sql = (
+        f'UPDATE {qn(meta.db_table)} SET {", ".join(assignments)} '
+        f'WHERE {" AND ".join(where)} RETURNING {columns}'
+    )
+    # raw() maps the RETURNING row onto an Order with the usual converters
+    rows = list(Order.objects.db_manager(db).raw(sql, params))
+    return rows[0] if rows else None
+
+
+def delete_order(order_id, expected_updated_at=None):
+    """
+    Delete the order in one DELETE ... WHERE id = ? [AND updated_at = ?].
+    Returns False when no row matched, like patch_order returning None.
+    """
+    orders = Order.objects.filter(id=order_id)
+    if expected_updated_at is not None:
+        orders = orders.filter(updated_at=expected_updated_at)
+    deleted, _ = orders.delete()
+    return deleted > 0
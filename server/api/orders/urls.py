@@ -3,5 +3,14 @@ from . import views
 
 urlpatterns = [
     path('', views.orders_list, name='orders_list'),
+    path('bulk/', views.orders_bulk, name='orders_bulk'),
+    path('bulk/transition/', views.orders_bulk_transition, name='orders_bulk_transition'),
+    path('search/', views.orders_search, name='orders_search'),
+    path('changes/', views.orders_changes, name='orders_changes'),
+    path('changes/stream/', views.orders_changes_stream, name='orders_changes_stream'),
+    path('stats/', views.orders_stats, name='orders_stats'),
+    path('cache/stats/', views.orders_cache_stats, name='orders_cache_stats'),
+    path('export/', views.orders_export, name='orders_export'),
+    path('archive/', views.orders_archive, name='orders_archive'),
     path('<int:order_id>/', views.order_detail, name='order_detail'),
 ]
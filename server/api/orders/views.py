@@ -1,26 +1,67 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition, require_GET
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from .models import Order
+from .models import Order, OrderArchive
+from . import cache as order_cache
+from . import conditional
+from .bulk import BulkError, apply_bulk, clean_order_fields, transition_status
+from .changes import CHANGE_BATCH_SIZE, CHANGES_SEQ_HEADER, aiter_events, fetch_changes, iter_events, latest_change, latest_sequence
+from .export import ASYNC_RENDERERS, CONTENT_TYPES, RENDERERS
+from .filters import FilterError, filter_orders
+from .pagination import PaginationError, paginate, parse_page_size, link_header
+from .search import DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT, search_orders
+from .serializers import (
+    ORDER_FIELDS, PAGINATION_FIELDS, FieldsError, order_rows, order_to_dict, parse_fields,
+    position_getter, row_serializer, select_columns,
+)
+from .stats import order_stats
+from .updates import delete_order, patch_order, put_fields
 from datetime import datetime
 
+def _build_list_page(request, queryset):
+    fields = parse_fields(request.query_params.get('fields'))
+    # Pagination needs id and created_at even when the client didn't ask for them
+    columns = select_columns(fields, PAGINATION_FIELDS)
+    orders = order_rows(filter_orders(queryset, request.query_params), columns)
+    page_size = parse_page_size(request.query_params.get('limit'))
+    rows, next_cursor, prev_cursor = paginate(
+        orders, request.query_params.get('cursor'), page_size, position=position_getter(columns)
+    )
+    to_dict = row_serializer(columns, fields)
+    return [to_dict(row) for row in rows], link_header(request, next_cursor, prev_cursor)
+
+def _get_order_dict(order_id, fields=ORDER_FIELDS):
+    try:
+        row = order_rows(Order.objects.all(), fields).get(id=order_id)
+    except Order.DoesNotExist:
+        # Archived orders keep their id, so a miss falls back to the archive
+        row = order_rows(OrderArchive.objects.all(), fields).get(id=order_id)
+    return row_serializer(fields, fields)(row)
+
+@condition(etag_func=conditional.list_etag, last_modified_func=conditional.list_last_modified)
 @api_view(['GET', 'POST'])
 def orders_list(request):
-    """Handle orders - GET all orders, POST create new order"""
+    """Handle orders - GET a page of orders (newest first), POST create new order"""
     if request.method == 'GET':
-        orders = Order.objects.all().order_by('-created_at')
-        data = []
-        for order in orders:
-            data.append({
-                'id': order.id,
-                'patient_first_name': order.patient_first_name,
-                'patient_last_name': order.patient_last_name,
-                'dob': order.dob.isoformat() if order.dob else None,
-                'status': order.status,
-                'created_at': order.created_at.isoformat(),
-                'updated_at': order.updated_at.isoformat()
-            })
-        return Response(data)
+        try:
+            # The change sequence is read before the page, so the page holds
+            # every change up to it and the stream can pick up from there
+            latest = latest_change()
+            data, links = order_cache.get_or_build(
+                order_cache.list_key(request.get_full_path(), latest),
+                lambda: _build_list_page(request, Order.objects.all())
+            )
+        except (FieldsError, FilterError, PaginationError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        headers = {CHANGES_SEQ_HEADER: str(latest[0])}
+        if links:
+            headers['Link'] = links
+        return Response(data, headers=headers)
     
     elif request.method == 'POST':
         data = request.data
@@ -39,61 +80,184 @@ def orders_list(request):
             status=data.get('status', 'new')
         )
         
-        return Response({
-            'id': order.id,
-            'patient_first_name': order.patient_first_name,
-            'patient_last_name': order.patient_last_name,
-            'dob': order.dob.isoformat() if order.dob else None,
-            'status': order.status,
-            'created_at': order.created_at.isoformat(),
-            'updated_at': order.updated_at.isoformat()
-        }, status=status.HTTP_201_CREATED)
-
-@api_view(['GET', 'PUT', 'DELETE'])
+        return Response(order_to_dict(order), status=status.HTTP_201_CREATED)
+
+def _with_etag(order):
+    return {'ETag': quote_etag(conditional.order_etag(order.id, order.updated_at))}
+
+def _write_failed(order_id, expected_updated_at):
+    # Only the failure path pays for a lookup, to tell a stale version from a missing order
+    if expected_updated_at is not None and Order.objects.filter(id=order_id).exists():
+        return Response({'error': 'Order was modified'}, status=status.HTTP_412_PRECONDITION_FAILED)
+    return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
+
+def _write_order(request, order_id):
+    # PUT, PATCH and DELETE check If-Match in the WHERE clause of their one
+    # statement, so no other writer can slip in between the check and the write
+    matched, expected_updated_at = conditional.if_match_version(request, order_id)
+    if not matched:
+        return Response({'error': 'If-Match does not match this order'}, status=status.HTTP_412_PRECONDITION_FAILED)
+
+    if request.method == 'DELETE':
+        if not delete_order(order_id, expected_updated_at):
+            return _write_failed(order_id, expected_updated_at)
+        return Response({'message': 'Order deleted successfully'})
+
+    if request.method == 'PATCH':
+        fields, error = clean_order_fields(request.data, partial=True)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        fields = put_fields(request.data)
+    order = patch_order(order_id, fields, expected_updated_at)
+    if order is None:
+        return _write_failed(order_id, expected_updated_at)
+    return Response(order_to_dict(order), headers=_with_etag(order))
+
+@condition(etag_func=conditional.detail_etag, last_modified_func=conditional.detail_last_modified)
+@api_view(['GET', 'PUT', 'PATCH', 'DELETE'])
 def order_detail(request, order_id):
     """Handle individual order operations"""
+    if request.method != 'GET':
+        # Single UPDATE or DELETE, no SELECT first
+        return _write_order(request, order_id)
+
     try:
-        order = Order.objects.get(id=order_id)
-    except Order.DoesNotExist:
+        fields = parse_fields(request.query_params.get('fields'))
+    except FieldsError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    # The row version condition() already read
+    updated_at = conditional.detail_last_modified(request._request, order_id)
+    try:
+        if updated_at is None:
+            raise OrderArchive.DoesNotExist
+        data = order_cache.get_or_build(
+            order_cache.detail_key(order_id, updated_at, fields),
+            lambda: _get_order_dict(order_id, fields)
+        )
+    except OrderArchive.DoesNotExist:
         return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
-    
-    if request.method == 'GET':
-        return Response({
-            'id': order.id,
-            'patient_first_name': order.patient_first_name,
-            'patient_last_name': order.patient_last_name,
-            'dob': order.dob.isoformat() if order.dob else None,
-            'status': order.status,
-            'created_at': order.created_at.isoformat(),
-            'updated_at': order.updated_at.isoformat()
-        })
-    
-    elif request.method == 'PUT':
-        data = request.data
-        # Handle date conversion
-        dob = data.get('dob')
-        if dob and isinstance(dob, str):
-            try:
-                dob = datetime.strptime(dob, '%Y-%m-%d').date()
-            except ValueError:
-                dob = order.dob  # Keep existing if invalid
-        
-        order.patient_first_name = data.get('patient_first_name', order.patient_first_name)
-        order.patient_last_name = data.get('patient_last_name', order.patient_last_name)
-        order.dob = dob if dob is not None else order.dob
-        order.status = data.get('status', order.status)
-        order.save()
-        
-        return Response({
-            'id': order.id,
-            'patient_first_name': order.patient_first_name,
-            'patient_last_name': order.patient_last_name,
-            'dob': order.dob.isoformat() if order.dob else None,
-            'status': order.status,
-            'created_at': order.created_at.isoformat(),
-            'updated_at': order.updated_at.isoformat()
-        })
-    
-    elif request.method == 'DELETE':
-        order.delete()
-        return Response({'message': 'Order deleted successfully'})
+    return Response(data)
+
+@api_view(['GET'])
+def orders_archive(request):
+    """Page through archived orders with the same filters, ?fields= and cursors as the list"""
+    try:
+        data, links = order_cache.get_or_build(
+            order_cache.list_key(request.get_full_path(), latest_change()),
+            lambda: _build_list_page(request, OrderArchive.objects.all())
+        )
+    except (FieldsError, FilterError, PaginationError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    headers = {}
+    if links:
+        headers['Link'] = links
+    return Response(data, headers=headers)
+
+@api_view(['GET'])
+def orders_search(request):
+    """Full-text prefix search on patient names, best match first"""
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_SEARCH_LIMIT))
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    return Response([order_to_dict(order) for order in search_orders(query, limit)])
+
+@api_view(['GET'])
+def orders_stats(request):
+    """Order counts by status and by created day, from the summary table"""
+    days = {}
+    for param in ('day_from', 'day_to'):
+        value = request.query_params.get(param)
+        try:
+            days[param] = parse_date(value) if value else None
+        except ValueError:
+            days[param] = None
+        if value and days[param] is None:
+            return Response({'error': f'{param} must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(order_stats(**days))
+
+@api_view(['GET'])
+def orders_cache_stats(request):
+    """Hit/miss counters for the order response cache in this process"""
+    return Response(order_cache.stats())
+
+@api_view(['POST'])
+def orders_bulk(request):
+    """Apply a batch of creates, partial updates and deletes atomically"""
+    try:
+        results, ok = apply_bulk(request.data)
+    except BulkError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if not ok:
+        return Response({'error': 'Validation failed, nothing was applied', 'results': results},
+                        status=status.HTTP_400_BAD_REQUEST)
+    return Response({'results': results})
+
+@api_view(['POST'])
+def orders_bulk_transition(request):
+    """Set the status of every order matching a filter in one UPDATE"""
+    try:
+        updated = transition_status(request.data)
+    except (BulkError, FilterError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'updated': updated})
+
+@require_GET
+def orders_export(request):
+    """Stream every matching order as NDJSON or CSV"""
+    # Plain Django view: DRF reserves ?format= for renderer negotiation and
+    # its Response cannot stream.
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in RENDERERS:
+        return JsonResponse({'error': 'format must be ndjson or csv'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        orders = filter_orders(Order.objects.all(), request.GET)
+    except FilterError as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Under ASGI a sync iterator would be buffered whole before sending
+    renderers = ASYNC_RENDERERS if isinstance(request, ASGIRequest) else RENDERERS
+    response = StreamingHttpResponse(renderers[export_format](orders), content_type=CONTENT_TYPES[export_format])
+    response['Content-Disposition'] = f'attachment; filename="orders.{export_format}"'
+    return response
+
+def _parse_sequence(value):
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+@api_view(['GET'])
+def orders_changes(request):
+    """Order changes after ?since= (a sequence number), oldest first"""
+    since = _parse_sequence(request.query_params.get('since', 0))
+    if since is None:
+        return Response({'error': 'since must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    changes = fetch_changes(since)
+    return Response({
+        'changes': changes,
+        'last_seq': changes[-1]['seq'] if changes else since,
+        'has_more': len(changes) == CHANGE_BATCH_SIZE,
+    })
+
+@require_GET
+def orders_changes_stream(request):
+    """Server-Sent Events feed of order changes, resumable via Last-Event-ID"""
+    resume_from = request.headers.get('Last-Event-ID') or request.GET.get('since')
+    if resume_from is None:
+        since = latest_sequence()
+    else:
+        since = _parse_sequence(resume_from)
+        if since is None:
+            return JsonResponse({'error': 'Last-Event-ID must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    events = aiter_events(since) if isinstance(request, ASGIRequest) else iter_events(since)
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Keep reverse proxies from buffering events
+    return response
@@ -1,9 +1,33 @@
-from django.test import TestCase
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 from rest_framework import status
-from api.orders.models import Order
+from api.orders import cache as order_cache
+from api.orders import conditional
+from api.orders import renderers
+from api.orders.renderers import FastJSONRenderer
+from api.orders.serializers import order_rows, order_to_dict, row_to_dict
+from api.orders.filters import filter_orders
+from api.orders.models import Order, OrderArchive, OrderChange, OrderDailyStat
+from django_backend.db_router import ReadWriteRouter
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+from unittest import mock
+import asyncio
+import io
 import json
+import os
+import subprocess
+import sys
+import tempfile
 
 class OrderModelTest(TestCase):
     def setUp(self):
@@ -124,3 +148,959 @@ class OrdersAPITest(APITestCase):
         response = self.client.delete(url)
         
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class OrdersPaginationTest(APITestCase):
+    def setUp(self):
+        for i in range(5):
+            Order.objects.create(patient_first_name=f'P{i}', patient_last_name='Page', status='new')
+        self.url = reverse('orders_list')
+
+    def _next_url(self, response, rel='next'):
+        for part in response.get('Link', '').split(','):
+            if f'rel="{rel}"' in part:
+                return part.split(';')[0].strip()[1:-1]
+        return None
+
+    def test_page_size_is_bounded(self):
+        """Test GET /api/orders/?limit= returns at most limit rows plus a next link"""
+        response = self.client.get(self.url, {'limit': 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        self.assertIsNotNone(self._next_url(response))
+        self.assertIsNone(self._next_url(response, 'prev'))
+
+    def test_walk_forward_and_back(self):
+        """Test following next cursors visits every order once, newest first"""
+        expected = list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        seen = []
+        pages = []
+        url, params = self.url, {'limit': 2}
+        while url:
+            response = self.client.get(url, params)
+            pages.append(response)
+            seen.extend(o['id'] for o in response.data)
+            url, params = self._next_url(response), None
+        self.assertEqual(seen, expected)
+
+        # The prev link of the last page returns the page before it
+        response = self.client.get(self._next_url(pages[-1], 'prev'))
+        self.assertEqual([o['id'] for o in response.data], [o['id'] for o in pages[-2].data])
+
+    def test_new_orders_do_not_shift_pages(self):
+        """Test inserts made while paging do not repeat or skip rows"""
+        first = self.client.get(self.url, {'limit': 2})
+        Order.objects.create(patient_first_name='Late', patient_last_name='Arrival')
+        second = self.client.get(self._next_url(first))
+
+        first_ids = {o['id'] for o in first.data}
+        second_ids = {o['id'] for o in second.data}
+        self.assertFalse(first_ids & second_ids)
+        self.assertEqual(len(second_ids), 2)
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor returns 400"""
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('error', response.data)
+
+class OrdersExportTest(APITestCase):
+    def setUp(self):
+        self.new = Order.objects.create(patient_first_name='Ann', patient_last_name='New', dob='1980-02-03', status='new')
+        self.done = Order.objects.create(patient_first_name='Cal', patient_last_name='Done', status='complete')
+        self.url = reverse('orders_export')
+
+    def _body(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        """Test GET /api/orders/export/ streams one JSON object per line"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self._body(response).splitlines()]
+        self.assertEqual([r['id'] for r in rows], [self.new.id, self.done.id])
+        self.assertEqual(rows[0]['dob'], '1980-02-03')
+        self.assertIsNone(rows[1]['dob'])
+
+    def test_export_csv(self):
+        """Test GET /api/orders/export/?format=csv streams a header and rows"""
+        response = self.client.get(self.url, {'format': 'csv'})
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = self._body(response).splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'patient_first_name', 'patient_last_name'])
+        self.assertEqual(len(lines), 3)
+
+    def test_export_filters(self):
+        """Test status and updated_at window filters narrow the export"""
+        response = self.client.get(self.url, {'status': 'complete'})
+        rows = [json.loads(line) for line in self._body(response).splitlines()]
+        self.assertEqual([r['id'] for r in rows], [self.done.id])
+
+        response = self.client.get(self.url, {'updated_after': '2999-01-01'})
+        self.assertEqual(self._body(response), '')
+
+    async def test_export_streams_an_async_iterator_under_asgi(self):
+        """Test the ASGI export isn't a sync iterator, which Django would buffer whole"""
+        response = await self.async_client.get(self.url, {'format': 'csv'})
+
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+
+    def test_export_rejects_bad_params(self):
+        """Test unknown format, status or timestamp returns 400"""
+        for params in ({'format': 'xml'}, {'status': 'lost'}, {'created_after': 'yesterday'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class OrdersFilterTest(APITestCase):
+    def setUp(self):
+        Order.objects.create(patient_first_name='John', patient_last_name='Smith', status='new')
+        Order.objects.create(patient_first_name='Jane', patient_last_name='Smithers', status='complete')
+        Order.objects.create(patient_first_name='Amy', patient_last_name='Jones', status='new')
+        self.url = reverse('orders_list')
+
+    def _names(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(o['patient_last_name'] for o in response.data)
+
+    def test_filter_by_status(self):
+        """Test GET /api/orders/?status= accepts one or more statuses"""
+        self.assertEqual(self._names({'status': 'new'}), ['Jones', 'Smith'])
+        self.assertEqual(self._names({'status': 'new,complete'}), ['Jones', 'Smith', 'Smithers'])
+
+    def test_filter_by_name_prefix(self):
+        """Test last_name/first_name are case-insensitive prefix matches"""
+        self.assertEqual(self._names({'last_name': 'smi'}), ['Smith', 'Smithers'])
+        self.assertEqual(self._names({'last_name': 'smi', 'first_name': 'jan'}), ['Smithers'])
+
+    def test_filter_by_created_window(self):
+        """Test created_after/created_before bound the list"""
+        self.assertEqual(len(self._names({'created_after': '2000-01-01'})), 3)
+        self.assertEqual(self._names({'created_before': '2000-01-01'}), [])
+
+    def test_invalid_filter(self):
+        """Test unknown status returns 400"""
+        response = self.client.get(self.url, {'status': 'archived'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def _plan(self, params):
+        queryset = filter_orders(Order.objects.all(), params).order_by('-created_at', '-id')[:100]
+        return queryset.explain()
+
+    def test_query_plans_use_indexes(self):
+        """Test list queries are index searches rather than table scans"""
+        plan = self._plan({'status': 'new'})
+        self.assertIn('USING INDEX order_status_created_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+        plan = self._plan({'last_name': 'smi'})
+        self.assertIn('SEARCH orders_order USING INDEX order_patient_name_idx', plan)
+
+        plan = self._plan({})
+        self.assertIn('USING INDEX order_created_id_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+class OrdersBulkTest(APITestCase):
+    def setUp(self):
+        self.first = Order.objects.create(patient_first_name='Ann', patient_last_name='One', status='processing')
+        self.second = Order.objects.create(patient_first_name='Ben', patient_last_name='Two', status='processing')
+        self.url = reverse('orders_bulk')
+
+    def test_bulk_create_update_delete(self):
+        """Test POST /api/orders/bulk/ applies every item and reports per-item results"""
+        data = {
+            'create': [
+                {'patient_first_name': 'Cat', 'patient_last_name': 'Three', 'dob': '1991-04-05'},
+                {'patient_first_name': 'Dan', 'patient_last_name': 'Four', 'status': 'processing'},
+            ],
+            'update': [{'id': self.first.id, 'status': 'complete'}, {'id': 999, 'status': 'new'}],
+            'delete': [self.second.id, 998],
+        }
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([r['result'] for r in results['create']], ['created', 'created'])
+        self.assertEqual([r['result'] for r in results['update']], ['updated', 'not_found'])
+        self.assertEqual([r['result'] for r in results['delete']], ['deleted', 'not_found'])
+
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.status, 'complete')
+        self.assertEqual(self.first.patient_first_name, 'Ann')  # Partial update keeps other fields
+        self.assertFalse(Order.objects.filter(id=self.second.id).exists())
+        created = Order.objects.get(id=results['create'][0]['id'])
+        self.assertEqual(created.status, 'new')
+        self.assertEqual(str(created.dob), '1991-04-05')
+
+    def test_bulk_validation_is_all_or_nothing(self):
+        """Test one invalid item rejects the whole batch"""
+        data = {
+            'create': [{'patient_first_name': 'Ok', 'patient_last_name': 'Row'}],
+            'update': [{'id': self.first.id, 'status': 'bogus'}],
+        }
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['results']['update'][0]['index'], 0)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_bulk_uses_constant_queries(self):
+        """Test the number of queries does not grow with batch size"""
+        def run(creates, deletes):
+            doomed = Order.objects.bulk_create([Order(patient_first_name=f'D{i}', patient_last_name='Bulk')
+                                                for i in range(deletes)])
+            data = {
+                'create': [{'patient_first_name': f'N{i}', 'patient_last_name': 'Bulk'} for i in range(creates)],
+                'update': [{'id': self.first.id, 'status': 'new'}, {'id': self.second.id, 'status': 'new'}],
+                'delete': [order.id for order in doomed] + [999999],
+            }
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(self.url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual([r['result'] for r in response.data['results']['delete']], ['deleted'] * deletes + ['not_found'])
+            delete_sql = [q['sql'] for q in queries if q['sql'].startswith('DELETE')]
+            self.assertEqual(len(delete_sql), 1)
+            self.assertIn('RETURNING', delete_sql[0])
+            return len(queries)
+
+        self.assertEqual(run(2, 2), run(50, 300))
+        self.assertFalse(Order.objects.filter(patient_first_name__startswith='D').exists())
+
+    def test_duplicate_delete_ids_are_rejected(self):
+        """Test an id listed twice in delete is an error, not two deletions"""
+        data = {'delete': [self.first.id, self.first.id]}
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['results']['delete'], [{'index': 1, 'error': 'duplicate id'}])
+        self.assertTrue(Order.objects.filter(id=self.first.id).exists())
+
+    def test_status_transition(self):
+        """Test POST /api/orders/bulk/transition/ updates matching orders in one statement"""
+        Order.objects.create(patient_first_name='Eve', patient_last_name='New', status='new')
+        url = reverse('orders_bulk_transition')
+        data = {'to_status': 'complete', 'filter': {'status': 'processing', 'created_before': '2999-01-01'}}
+
+        with self.assertNumQueries(1):
+            response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(Order.objects.filter(status='complete').count(), 2)
+        self.assertEqual(Order.objects.filter(status='new').count(), 1)
+
+    def test_status_transition_requires_filter(self):
+        """Test a transition without a known filter is rejected"""
+        url = reverse('orders_bulk_transition')
+        for data in ({'to_status': 'complete'}, {'to_status': 'complete', 'filter': {'colour': 'red'}}):
+            response = self.client.post(url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_status_transition_rejects_blank_filter(self):
+        """Test a filter whose values are all blank doesn't transition every order"""
+        url = reverse('orders_bulk_transition')
+        blank = {'status': ' , ', 'last_name': '  ', 'created_after': '', 'first_name': None}
+        response = self.client.post(url, {'to_status': 'complete', 'filter': blank}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.filter(status='complete').exists())
+
+    def test_bool_ids_are_rejected(self):
+        """Test JSON true/false aren't taken as order ids 1 and 0"""
+        response = self.client.post(self.url, {'update': [{'id': True, 'status': 'complete'}], 'delete': [False]},
+                                    format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['results']['update'], [{'index': 0, 'error': 'id is required'}])
+        self.assertEqual(response.data['results']['delete'], [{'index': 0, 'error': 'id must be an integer'}])
+
+class OrdersConditionalTest(APITestCase):
+    def setUp(self):
+        self.order = Order.objects.create(patient_first_name='Con', patient_last_name='Ditional', status='new')
+        self.list_url = reverse('orders_list')
+        self.detail_url = reverse('order_detail', kwargs={'order_id': self.order.id})
+
+    def test_list_not_modified(self):
+        """Test GET /api/orders/ with a matching If-None-Match returns 304"""
+        response = self.client.get(self.list_url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_etag_changes_on_write(self):
+        """Test creates, updates and deletes all change the list ETag"""
+        etags = [self.client.get(self.list_url)['ETag']]
+        other = Order.objects.create(patient_first_name='New', patient_last_name='Row')
+        etags.append(self.client.get(self.list_url)['ETag'])
+        self.client.put(self.detail_url, {'status': 'complete'}, format='json')
+        etags.append(self.client.get(self.list_url)['ETag'])
+        other.delete()
+        etags.append(self.client.get(self.list_url)['ETag'])
+
+        self.assertEqual(len(set(etags)), 4)
+
+    def test_list_etag_depends_on_query(self):
+        """Test different filters or pages get different ETags"""
+        all_etag = self.client.get(self.list_url)['ETag']
+        filtered_etag = self.client.get(self.list_url, {'status': 'complete'})['ETag']
+        self.assertNotEqual(all_etag, filtered_etag)
+
+    def test_detail_not_modified_skips_loading_order(self):
+        """Test a 304 for GET /api/orders/{id}/ needs only the updated_at lookup"""
+        etag = self.client.get(self.detail_url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_match_prevents_lost_update(self):
+        """Test PUT/DELETE with a stale If-Match return 412 and change nothing"""
+        etag = self.client.get(self.detail_url)['ETag']
+        response = self.client.put(self.detail_url, {'status': 'processing'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # A second writer still holding the old ETag is rejected
+        response = self.client.put(self.detail_url, {'status': 'complete'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        response = self.client.delete(self.detail_url, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'processing')
+
+    def test_if_match_is_checked_inside_the_write(self):
+        """Test a PUT/DELETE racing another writer after its If-Match check still returns 412"""
+        etag = self.client.get(self.detail_url)['ETag']
+        if_match_version = conditional.if_match_version
+
+        def then_another_writer(request, order_id):
+            # Another request updates the order after this one read its version
+            version = if_match_version(request, order_id)
+            Order.objects.filter(id=order_id).update(status='complete', updated_at=datetime.now(dt_timezone.utc))
+            return version
+
+        with mock.patch.object(conditional, 'if_match_version', then_another_writer):
+            response = self.client.put(self.detail_url, {'status': 'processing'}, format='json', HTTP_IF_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+            response = self.client.delete(self.detail_url, HTTP_IF_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'complete')
+
+        # The version check costs no extra query: one UPDATE, one DELETE
+        etag = self.client.get(self.detail_url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.put(self.detail_url, {'status': 'processing'}, format='json', HTTP_IF_MATCH=etag)
+        with self.assertNumQueries(1):
+            self.client.delete(self.detail_url, HTTP_IF_MATCH=response['ETag'])
+        self.assertFalse(Order.objects.filter(id=self.order.id).exists())
+
+# Serves the list from a process-local LocMemCache while archive_orders runs
+# in a separate process against the same database
+CROSS_PROCESS_ARCHIVE_SCRIPT = """
+import json, os, subprocess, sys
+from datetime import timedelta
+sys.path.insert(0, 'benchmarks')
+from _django import setup_django
+setup_django(disable_order_cache=False)
+from django.test import Client
+from django.utils import timezone
+from api.orders.changes import latest_sequence
+from api.orders.models import Order
+
+ids = [Order.objects.create(patient_first_name='Cross', patient_last_name='Process', status='complete').id
+       for _ in range(3)]
+Order.objects.filter(id=ids[0]).update(updated_at=timezone.now() - timedelta(days=30))
+client = Client()
+before = [o['id'] for o in client.get('/api/orders/').json()]
+subprocess.run([sys.executable, 'manage.py', 'archive_orders', '--days', '7'], check=True, capture_output=True)
+response = client.get('/api/orders/')
+print(json.dumps({'ids': ids, 'before': before, 'after': [o['id'] for o in response.json()],
+                  'after_seq': int(response['X-Changes-Seq']), 'latest_seq': latest_sequence()}))
+"""
+
+class OrdersCacheTest(APITestCase):
+    def setUp(self):
+        caches['orders'].clear()
+        order_cache.reset_stats()
+        self.order = Order.objects.create(patient_first_name='Cached', patient_last_name='Read', status='new')
+        self.list_url = reverse('orders_list')
+        self.detail_url = reverse('order_detail', kwargs={'order_id': self.order.id})
+
+    def test_repeated_reads_hit_cache(self):
+        """Test a second identical GET is served from cache without loading orders"""
+        self.client.get(self.detail_url)
+        # Only the conditional-GET updated_at lookup remains
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url)
+        self.assertEqual(response.data['patient_first_name'], 'Cached')
+
+        self.client.get(self.list_url)
+        self.client.get(self.list_url)
+
+        stats = self.client.get(reverse('orders_cache_stats')).data
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 2)
+
+    def test_writes_invalidate_cached_reads(self):
+        """Test PUT, POST and DELETE are visible on the next read"""
+        self.client.get(self.list_url)
+        self.client.get(self.detail_url)
+
+        self.client.put(self.detail_url, {'status': 'complete'}, format='json')
+        self.assertEqual(self.client.get(self.detail_url).data['status'], 'complete')
+        self.assertEqual(self.client.get(self.list_url).data[0]['status'], 'complete')
+
+        self.client.post(self.list_url, {'patient_first_name': 'B', 'patient_last_name': 'C'}, format='json')
+        self.assertEqual(len(self.client.get(self.list_url).data), 2)
+
+        self.client.delete(self.detail_url)
+        self.assertEqual(self.client.get(self.detail_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(len(self.client.get(self.list_url).data), 1)
+
+    def test_bulk_paths_invalidate_cached_reads(self):
+        """Test bulk updates and set-based transitions, which send no signals, retire cached reads"""
+        self.client.get(self.detail_url)
+        self.client.post(reverse('orders_bulk'), {'update': [{'id': self.order.id, 'status': 'processing'}]}, format='json')
+        self.assertEqual(self.client.get(self.detail_url).data['status'], 'processing')
+
+        data = {'to_status': 'complete', 'filter': {'status': 'processing'}}
+        self.client.post(reverse('orders_bulk_transition'), data, format='json')
+        self.assertEqual(self.client.get(self.detail_url).data['status'], 'complete')
+        self.assertEqual(self.client.get(self.list_url).data[0]['status'], 'complete')
+
+    def test_admin_style_save_invalidates(self):
+        """Test model saves outside the API (admin, shell) also invalidate"""
+        self.client.get(self.detail_url)
+        self.order.patient_last_name = 'Changed'
+        self.order.save()
+        self.assertEqual(self.client.get(self.detail_url).data['patient_last_name'], 'Changed')
+
+    def test_writes_from_another_process_retire_cached_reads(self):
+        """Test archive_orders run as its own process is visible to a warm per-process cache"""
+        result = subprocess.run([sys.executable, '-c', CROSS_PROCESS_ARCHIVE_SCRIPT], cwd=settings.BASE_DIR,
+                                capture_output=True, text=True, timeout=120)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        seen = json.loads(result.stdout)
+        self.assertEqual(seen['before'], seen['ids'][::-1])
+        self.assertEqual(seen['after'], seen['ids'][:0:-1])
+        self.assertEqual(seen['after_seq'], seen['latest_seq'])
+
+    def test_several_workers_default_to_a_shared_backend(self):
+        """Test WEB_CONCURRENCY > 1 swaps the per-process LocMemCache for a cache every worker sees"""
+        def backend(web_concurrency):
+            env = {k: v for k, v in os.environ.items() if not k.startswith('ORDERS_CACHE_')}
+            env.update(WEB_CONCURRENCY=web_concurrency, DJANGO_SETTINGS_MODULE='django_backend.settings')
+            code = "from django.conf import settings; print(settings.CACHES['orders']['BACKEND'])"
+            return subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+
+        self.assertEqual(backend('1'), 'django.core.cache.backends.locmem.LocMemCache')
+        self.assertEqual(backend('4'), 'django.core.cache.backends.filebased.FileBasedCache')
+
+class OrdersSearchTest(APITestCase):
+    def setUp(self):
+        self.jon = Order.objects.create(patient_first_name='Jonathan', patient_last_name='Smith')
+        self.joan = Order.objects.create(patient_first_name='Joan', patient_last_name='Smithson')
+        self.amy = Order.objects.create(patient_first_name='Amy', patient_last_name='Jones')
+        self.url = reverse('orders_search')
+
+    def _ids(self, q):
+        response = self.client.get(self.url, {'q': q})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [o['id'] for o in response.data]
+
+    def test_prefix_search(self):
+        """Test GET /api/orders/search/ matches name prefixes case-insensitively"""
+        self.assertEqual(set(self._ids('smi')), {self.jon.id, self.joan.id})
+        self.assertEqual(self._ids('jo smiths'), [self.joan.id])
+        self.assertEqual(set(self._ids('JO')), {self.jon.id, self.joan.id, self.amy.id})
+
+    def test_results_are_ranked(self):
+        """Test an order matching the query in both names ranks first"""
+        both = Order.objects.create(patient_first_name='Jones', patient_last_name='Jones')
+        self.assertEqual(self._ids('jones')[0], both.id)
+
+    def test_index_follows_writes(self):
+        """Test updates, bulk paths and deletes keep the index in sync"""
+        self.jon.patient_last_name = 'Carter'
+        self.jon.save()
+        self.assertEqual(self._ids('carter'), [self.jon.id])
+        self.assertNotIn(self.jon.id, self._ids('smith'))
+
+        Order.objects.bulk_create([Order(patient_first_name='Bulk', patient_last_name='Inserted')])
+        self.assertEqual(len(self._ids('inserted')), 1)
+
+        self.amy.delete()
+        self.assertEqual(self._ids('amy'), [])
+
+    def test_query_syntax_is_escaped(self):
+        """Test FTS operators in the query are treated as text"""
+        # "OR" becomes a required prefix term rather than an operator
+        self.assertEqual(self._ids('smith OR "'), [])
+        self.assertEqual(self._ids('NEAR( *'), [])
+
+    def test_admin_search_uses_index(self):
+        """Test the admin search box goes through the FTS index"""
+        model_admin = admin.site._registry[Order]
+        queryset, may_have_duplicates = model_admin.get_search_results(None, Order.objects.all(), 'smiths')
+        self.assertEqual(list(queryset), [self.joan])
+        self.assertIn('orders_order_fts', str(queryset.query))
+
+    def test_search_requires_query(self):
+        """Test missing q returns 400"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class OrdersStatsTest(APITestCase):
+    def setUp(self):
+        self.url = reverse('orders_stats')
+        self.first = Order.objects.create(patient_first_name='A', patient_last_name='One', status='new')
+        self.second = Order.objects.create(patient_first_name='B', patient_last_name='Two', status='new')
+
+    def _by_status(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['by_status']
+
+    def test_stats_follow_every_write_path(self):
+        """Test creates, PUT, DELETE, bulk and transition all keep counts exact"""
+        self.assertEqual(self._by_status(), {'complete': 0, 'new': 2, 'processing': 0})
+
+        self.client.post(reverse('orders_list'), {'patient_first_name': 'C', 'patient_last_name': 'Three', 'status': 'processing'}, format='json')
+        self.client.put(reverse('order_detail', kwargs={'order_id': self.first.id}), {'status': 'complete'}, format='json')
+        self.assertEqual(self._by_status(), {'complete': 1, 'new': 1, 'processing': 1})
+
+        self.client.post(reverse('orders_bulk'), {
+            'create': [{'patient_first_name': 'D', 'patient_last_name': 'Four'}],
+            'update': [{'id': self.second.id, 'status': 'processing'}],
+        }, format='json')
+        self.assertEqual(self._by_status(), {'complete': 1, 'new': 1, 'processing': 2})
+
+        self.client.post(reverse('orders_bulk_transition'), {'to_status': 'complete', 'filter': {'status': 'processing'}}, format='json')
+        self.assertEqual(self._by_status(), {'complete': 3, 'new': 1, 'processing': 0})
+
+        self.client.delete(reverse('order_detail', kwargs={'order_id': self.first.id}))
+        self.assertEqual(self._by_status(), {'complete': 2, 'new': 1, 'processing': 0})
+
+    def test_stats_by_day(self):
+        """Test per-day buckets and the day range filter"""
+        today = self.first.created_at.date().isoformat()
+        response = self.client.get(self.url, {'day_from': today, 'day_to': today})
+        self.assertEqual(response.data['by_day'], [{'day': today, 'complete': 0, 'new': 2, 'processing': 0}])
+
+        response = self.client.get(self.url, {'day_to': '2000-01-01'})
+        self.assertEqual(response.data['total'], 0)
+
+        response = self.client.get(self.url, {'day_from': 'soon'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stats_read_only_touches_summary(self):
+        """Test the stats query cost does not depend on the number of orders"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('orders_orderdailystat', queries[0]['sql'])
+        self.assertNotIn('orders_order"', queries[0]['sql'])
+
+    def test_rebuild_command(self):
+        """Test rebuild_order_stats recomputes drifted buckets"""
+        OrderDailyStat.objects.update(count=99)
+        out = io.StringIO()
+        call_command('rebuild_order_stats', stdout=out)
+        self.assertIn('Rebuilt 1', out.getvalue())
+        self.assertEqual(self._by_status()['new'], 2)
+
+@override_settings(ORDER_CHANGES_STREAM_SECONDS=0, ORDER_CHANGES_POLL_SECONDS=0)
+class OrdersChangeFeedTest(APITestCase):
+    def setUp(self):
+        self.order = Order.objects.create(patient_first_name='Feed', patient_last_name='Me')
+
+    def _events(self, response):
+        body = b''.join(response.streaming_content).decode()
+        events = []
+        for frame in body.strip().split('\n\n'):
+            fields = dict(line.split(': ', 1) for line in frame.splitlines() if not line.startswith(':'))
+            if 'data' in fields:
+                events.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+        return events
+
+    def test_changes_from_every_write_path(self):
+        """Test GET /api/orders/changes/ lists created/updated/deleted in sequence"""
+        self.client.put(reverse('order_detail', kwargs={'order_id': self.order.id}), {'status': 'complete'}, format='json')
+        self.client.post(reverse('orders_bulk'), {'create': [{'patient_first_name': 'B', 'patient_last_name': 'Ulk'}]}, format='json')
+        self.client.delete(reverse('order_detail', kwargs={'order_id': self.order.id}))
+
+        response = self.client.get(reverse('orders_changes'))
+        changes = response.data['changes']
+        self.assertEqual([c['action'] for c in changes], ['created', 'updated', 'created', 'deleted'])
+        seqs = [c['seq'] for c in changes]
+        self.assertEqual(seqs, sorted(seqs))
+        self.assertEqual(response.data['last_seq'], seqs[-1])
+        # The deleted order's earlier events no longer have a snapshot
+        self.assertIsNone(changes[1]['order'])
+        self.assertEqual(changes[2]['order']['patient_last_name'], 'Ulk')
+
+    def test_changes_since(self):
+        """Test ?since= returns only later changes"""
+        first_seq = self.client.get(reverse('orders_changes')).data['last_seq']
+        self.client.put(reverse('order_detail', kwargs={'order_id': self.order.id}), {'status': 'processing'}, format='json')
+
+        changes = self.client.get(reverse('orders_changes'), {'since': first_seq}).data['changes']
+        self.assertEqual([(c['action'], c['order']['status']) for c in changes], [('updated', 'processing')])
+
+    def test_stream_resumes_from_last_event_id(self):
+        """Test the SSE stream replays changes after Last-Event-ID"""
+        url = reverse('orders_changes_stream')
+        events = self._events(self.client.get(url, HTTP_LAST_EVENT_ID='0'))
+        self.assertEqual([(e[1], e[2]['order_id']) for e in events], [('created', self.order.id)])
+
+        self.order.status = 'complete'
+        self.order.save()
+        response = self.client.get(url, HTTP_LAST_EVENT_ID=str(events[-1][0]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual([e[1] for e in self._events(response)], ['updated'])
+
+    def test_stream_without_resume_point_starts_at_head(self):
+        """Test a fresh connection only receives changes made after it connects"""
+        response = self.client.get(reverse('orders_changes_stream'))
+        self.assertEqual(self._events(response), [])
+
+    def test_list_reports_the_sequence_it_reflects(self):
+        """Test the orders list sends the last change its page includes, cached or not"""
+        seq = self.client.get(reverse('orders_changes')).data['last_seq']
+        response = self.client.get(reverse('orders_list'))
+        self.assertEqual(response['X-Changes-Seq'], str(seq))
+        self.assertEqual(self.client.get(reverse('orders_list'))['X-Changes-Seq'], str(seq))
+
+        self.client.put(reverse('order_detail', kwargs={'order_id': self.order.id}), {'status': 'complete'}, format='json')
+        response = self.client.get(reverse('orders_list'))
+        self.assertEqual(int(response['X-Changes-Seq']), seq + 1)
+        # Opening the stream from there replays nothing the page already has
+        stream = self.client.get(reverse('orders_changes_stream'), {'since': response['X-Changes-Seq']})
+        self.assertEqual(self._events(stream), [])
+
+    async def test_async_list_reports_the_sequence(self):
+        """Test the async orders list sends the same sequence header"""
+        last = await OrderChange.objects.order_by('-id').afirst()
+        response = await self.async_client.get(reverse('async_orders_list'))
+        self.assertEqual(response['X-Changes-Seq'], str(last.id))
+
+    async def test_stream_is_async_under_asgi(self):
+        """Test the ASGI stream polls without blocking and still replays from Last-Event-ID"""
+        response = await self.async_client.get(reverse('orders_changes_stream'), headers={'Last-Event-ID': '0'})
+
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk.encode() if isinstance(chunk, str) else chunk
+                         async for chunk in response.streaming_content])
+        self.assertIn(b'event: created', body)
+
+    def test_prune_command(self):
+        """Test prune_order_changes deletes entries past the retention window but never the newest"""
+        self.client.put(reverse('order_detail', kwargs={'order_id': self.order.id}), {'status': 'complete'}, format='json')
+        newest = OrderChange.objects.latest('id').id
+        OrderChange.objects.update(changed_at=datetime(2000, 1, 1, tzinfo=dt_timezone.utc))
+        call_command('prune_order_changes', '--days', '1', stdout=io.StringIO())
+        self.assertEqual(list(OrderChange.objects.values_list('id', flat=True)), [newest])
+
+class AsyncOrdersViewTest(TestCase):
+    def setUp(self):
+        self.order = Order.objects.create(patient_first_name='Async', patient_last_name='Order', status='new')
+
+    async def test_async_list_and_create(self):
+        """Test the async list view pages, filters and creates like the sync one"""
+        url = reverse('async_orders_list')
+        response = await self.async_client.post(
+            url, {'patient_first_name': 'Bea', 'patient_last_name': 'Async', 'dob': '1999-09-09'},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['dob'], '1999-09-09')
+
+        response = await self.async_client.get(url, {'limit': 1})
+        self.assertEqual([o['patient_first_name'] for o in response.json()], ['Bea'])
+        self.assertIn('rel="next"', response['Link'])
+
+        response = await self.async_client.get(url, {'status': 'bogus'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = await self.async_client.get(url, {'fields': 'id,status'})
+        self.assertEqual(response.json()[0], {'id': response.json()[0]['id'], 'status': 'new'})
+        response = await self.async_client.get(url, {'fields': 'nope'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_async_detail(self):
+        """Test async GET, PUT and DELETE on one order"""
+        url = reverse('async_order_detail', kwargs={'order_id': self.order.id})
+        response = await self.async_client.get(url)
+        self.assertEqual(response.json()['patient_first_name'], 'Async')
+
+        response = await self.async_client.put(url, {'status': 'complete'}, content_type='application/json')
+        self.assertEqual(response.json()['status'], 'complete')
+        self.assertEqual((await self.async_client.get(url)).json()['status'], 'complete')
+
+        response = await self.async_client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_async_views_keep_cache_io_off_the_event_loop(self):
+        """Test the async views touch a FileBasedCache only from worker threads, never the event loop"""
+        calls = []
+
+        def recorded(name):
+            original = getattr(FileBasedCache, name)
+
+            def method(cache, *args, **kwargs):
+                try:
+                    asyncio.get_running_loop()
+                    calls.append((name, 'event loop'))
+                except RuntimeError:
+                    calls.append((name, 'thread'))
+                return original(cache, *args, **kwargs)
+            return mock.patch.object(FileBasedCache, name, method)
+
+        detail_url = reverse('async_order_detail', kwargs={'order_id': self.order.id})
+        with tempfile.TemporaryDirectory() as location, \
+                self.settings(CACHES={**settings.CACHES, 'orders': {
+                    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+                }}), \
+                recorded('get'), recorded('set'), recorded('add'):
+            for _ in range(2):
+                self.assertEqual((await self.async_client.get(reverse('async_orders_list'))).status_code, 200)
+                self.assertEqual((await self.async_client.get(detail_url)).status_code, 200)
+        self.assertEqual(len(calls), 6)  # two misses (get + set), then two hits
+        self.assertEqual({where for name, where in calls}, {'thread'})
+
+    async def test_async_conditional_requests_and_patch(self):
+        """Test the async detail view keeps ETags, If-Match protection and PATCH"""
+        url = reverse('async_order_detail', kwargs={'order_id': self.order.id})
+        response = await self.async_client.get(url)
+        etag = response['ETag']
+        self.assertEqual((await self.async_client.get(url, headers={'If-None-Match': etag})).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+        response = await self.async_client.patch(url, {'status': 'processing'}, content_type='application/json',
+                                                 headers={'If-Match': etag})
+        self.assertEqual((response.status_code, response.json()['status']), (status.HTTP_200_OK, 'processing'))
+        self.assertNotEqual(response['ETag'], etag)
+
+        for method in (self.async_client.put, self.async_client.patch):
+            response = await method(url, {'status': 'complete'}, content_type='application/json',
+                                    headers={'If-Match': etag})
+            self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual((await Order.objects.aget(id=self.order.id)).status, 'processing')
+
+        list_url = reverse('async_orders_list')
+        list_etag = (await self.async_client.get(list_url))['ETag']
+        self.assertEqual((await self.async_client.get(list_url, headers={'If-None-Match': list_etag})).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+class ReadWriteRouterTest(TestCase):
+    def test_routing(self):
+        """Test reads go to the replica except inside a write transaction"""
+        router = ReadWriteRouter()
+        self.assertEqual(router.db_for_write(Order), 'default')
+        self.assertEqual(router.allow_migrate('replica', 'orders'), False)
+        with mock.patch.object(connections['default'], 'in_atomic_block', False):
+            self.assertEqual(router.db_for_read(Order), 'replica')
+        with mock.patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(router.db_for_read(Order), 'default')
+
+
+class OrdersConcurrencyTest(SimpleTestCase):
+    def test_concurrent_posts_and_gets_under_production_profile(self):
+        """Test concurrent orders_list POSTs and GETs never hit "database is locked" """
+        script = Path(settings.BASE_DIR) / 'benchmarks' / 'stress_orders_db.py'
+        env = {**os.environ, 'DB_PROFILE': 'production'}
+        result = subprocess.run(
+            [sys.executable, str(script), '--writers', '6', '--readers', '6', '--seconds', '2'],
+            env=env, capture_output=True, text=True, timeout=120,
+        )
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        self.assertIn('writes ok', result.stdout)
+
+class OrdersPatchTest(APITestCase):
+    def setUp(self):
+        self.order = Order.objects.create(patient_first_name='Pat', patient_last_name='Ch', dob='1970-01-02', status='new')
+        self.url = reverse('order_detail', kwargs={'order_id': self.order.id})
+
+    def test_patch_is_a_single_update(self):
+        """Test PATCH issues one UPDATE of the given fields and updated_at, with no SELECT"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, {'status': 'complete'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]['sql']
+        self.assertTrue(sql.startswith('UPDATE'))
+        self.assertIn('"status"', sql.split('WHERE')[0])
+        self.assertNotIn('"patient_first_name" =', sql)
+        self.assertEqual(response.data['status'], 'complete')
+        self.assertEqual(response.data['patient_first_name'], 'Pat')
+        self.assertEqual(response.data['dob'], '1970-01-02')
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'complete')
+        self.assertEqual(response.data['updated_at'], self.order.updated_at.isoformat())
+
+    def test_patch_version_check(self):
+        """Test PATCH with If-Match succeeds once and rejects the stale ETag"""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.patch(self.url, {'status': 'processing'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        new_etag = response['ETag']
+        self.assertEqual(new_etag, self.client.get(self.url)['ETag'])
+
+        response = self.client.patch(self.url, {'status': 'complete'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        response = self.client.patch(self.url, {'status': 'complete'}, format='json', HTTP_IF_MATCH='"garbage"')
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'processing')
+
+    def test_patch_side_effects(self):
+        """Test PATCH invalidates cached reads and feeds stats, search and the change log"""
+        self.client.get(self.url)
+        self.client.patch(self.url, {'patient_last_name': 'Patched', 'status': 'complete'}, format='json')
+
+        self.assertEqual(self.client.get(self.url).data['patient_last_name'], 'Patched')
+        self.assertEqual([o['id'] for o in self.client.get(reverse('orders_search'), {'q': 'patched'}).data], [self.order.id])
+        self.assertEqual(self.client.get(reverse('orders_stats')).data['by_status']['complete'], 1)
+        self.assertEqual(OrderChange.objects.latest('id').action, 'updated')
+
+    def test_patch_errors(self):
+        """Test PATCH validation and missing orders"""
+        response = self.client.patch(self.url, {'status': 'bogus'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        missing = reverse('order_detail', kwargs={'order_id': 999})
+        response = self.client.patch(missing, {'status': 'new'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class OrdersSerializationTest(APITestCase):
+    def setUp(self):
+        caches['orders'].clear()
+        self.order = Order.objects.create(
+            patient_first_name='Zoë', patient_last_name='Doe', dob='1990-01-01', status='new'
+        )
+        self.order.refresh_from_db()
+
+    def test_row_matches_instance(self):
+        """Test values_list rows and model instances serialize identically"""
+        row = order_rows(Order.objects.all()).get(id=self.order.id)
+        self.assertEqual(row_to_dict(row), order_to_dict(self.order))
+
+    def test_reads_skip_model_instances(self):
+        """Test list and detail GET never instantiate Order"""
+        with mock.patch.object(Order, 'from_db', side_effect=AssertionError('model instantiated')):
+            self.assertEqual(self.client.get(reverse('orders_list')).status_code, status.HTTP_200_OK)
+            url = reverse('order_detail', kwargs={'order_id': self.order.id})
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_fast_renderer_matches_drf(self):
+        """Test FastJSONRenderer output parses the same with and without orjson"""
+        data = [order_to_dict(self.order), {'when': self.order.created_at, 'error': 'x '}]
+        fast = FastJSONRenderer().render(data)
+        with mock.patch.object(renderers, 'orjson', None):
+            fallback = FastJSONRenderer().render(data)
+        self.assertEqual(json.loads(fast), json.loads(JSONRenderer().render(data)))
+        self.assertEqual(json.loads(fallback), json.loads(fast))
+
+class OrdersSparseFieldsTest(APITestCase):
+    def setUp(self):
+        caches['orders'].clear()
+        for i in range(3):
+            Order.objects.create(patient_first_name=f'P{i}', patient_last_name='Sparse', dob='1990-01-01', status='new')
+        self.order = Order.objects.latest('id')
+        self.url = reverse('orders_list')
+
+    def test_list_projection(self):
+        """Test ?fields= limits both the SELECT and the JSON keys"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'status,updated_at'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([set(o) for o in response.data], [{'status', 'updated_at'}] * 3)
+        select = next(q['sql'] for q in queries if 'LIMIT' in q['sql'])
+        self.assertNotIn('patient_first_name', select)
+        self.assertNotIn('"dob"', select)
+
+    def test_list_pages_without_key_fields(self):
+        """Test cursors still work when id and created_at aren't requested"""
+        response = self.client.get(self.url, {'fields': 'patient_first_name', 'limit': 2})
+        self.assertEqual([o['patient_first_name'] for o in response.data], ['P2', 'P1'])
+        next_url = response['Link'].split(';')[0].strip('<>')
+        response = self.client.get(next_url)
+        self.assertEqual(response.data, [{'patient_first_name': 'P0'}])
+
+    def test_detail_fields(self):
+        """Test ?fields= on detail, cached separately from the full representation"""
+        url = reverse('order_detail', kwargs={'order_id': self.order.id})
+        self.assertEqual(len(self.client.get(url).data), 7)
+        response = self.client.get(url, {'fields': 'id,dob'})
+        self.assertEqual(response.data, {'id': self.order.id, 'dob': '1990-01-01'})
+        self.assertEqual(len(self.client.get(url).data), 7)
+
+    def test_unknown_fields_rejected(self):
+        """Test unknown field names return 400 on list and detail"""
+        response = self.client.get(self.url, {'fields': 'id,ssn'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ssn', response.data['error'])
+        url = reverse('order_detail', kwargs={'order_id': self.order.id})
+        response = self.client.get(url, {'fields': 'password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class OrdersArchiveTest(APITestCase):
+    def setUp(self):
+        caches['orders'].clear()
+        self.old = Order.objects.create(patient_first_name='Old', patient_last_name='Done', status='complete')
+        self.recent = Order.objects.create(patient_first_name='Recent', patient_last_name='Done', status='complete')
+        self.open = Order.objects.create(patient_first_name='Old', patient_last_name='Open', status='new')
+        long_ago = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+        Order.objects.filter(id__in=[self.old.id, self.open.id]).update(updated_at=long_ago)
+
+    def archive(self, *args):
+        out = io.StringIO()
+        call_command('archive_orders', '--days', '90', *args, stdout=out)
+        return out.getvalue()
+
+    def test_moves_only_old_complete_orders(self):
+        """Test the command archives complete orders past the age, in batches"""
+        stats_before = self.client.get(reverse('orders_stats')).data
+        self.assertIn('1 orders would be archived', self.archive('--dry-run'))
+        self.assertEqual(OrderArchive.objects.count(), 0)
+
+        self.assertIn('Archived 1 orders', self.archive('--batch-size', '1'))
+        self.assertEqual(list(OrderArchive.objects.values_list('id', flat=True)), [self.old.id])
+        self.assertEqual(set(Order.objects.values_list('id', flat=True)), {self.recent.id, self.open.id})
+        # Archived orders still count in the stats
+        self.assertEqual(self.client.get(reverse('orders_stats')).data, stats_before)
+
+    def test_archive_is_visible_to_reads(self):
+        """Test list, detail, change feed and the archive endpoint after archiving"""
+        self.assertEqual(len(self.client.get(reverse('orders_list')).data), 3)
+        self.archive()
+
+        self.assertNotIn(self.old.id, [o['id'] for o in self.client.get(reverse('orders_list')).data])
+        change = self.client.get(reverse('orders_changes'), {'since': 0}).data['changes'][-1]
+        self.assertEqual((change['order_id'], change['action'], change['order']), (self.old.id, 'archived', None))
+
+        url = reverse('order_detail', kwargs={'order_id': self.old.id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['patient_first_name'], 'Old')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.client.put(url, {'status': 'new'}, format='json').status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+        response = self.client.get(reverse('orders_archive'), {'last_name': 'do', 'fields': 'id,status'})
+        self.assertEqual(response.data, [{'id': self.old.id, 'status': 'complete'}])
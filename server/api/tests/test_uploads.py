@@ -1,10 +1,59 @@
-from django.test import TestCase
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.core.files.uploadedfile import SimpleUploadedFile
+from api.uploads import extraction, fields, jobs, memory, ocr, pdf_utils, result_cache
+from api.uploads.extraction import process_pdf
+from api.uploads.management.commands import run_extraction_worker
+from api.orders.models import Order
+from api.uploads.models import ExtractionCacheEntry, ExtractionJob
+from api.uploads.upload_handlers import PDFUploadHandler
 from api.uploads.pdf_utils import extract_patient_info, normalize_date
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+import hashlib
 import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+def make_pdf(*pages):
+    """Minimal PDF with one Helvetica text page per argument (lines split on newlines)"""
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>', None, '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for text in pages:
+        lines = ''.join(
+            f'({line.replace("(", "[").replace(")", "]")}) Tj 0 -14 Td ' for line in text.split('\n')
+        )
+        stream = f'BT /F1 12 Tf 72 720 Td {lines}ET'
+        objects.append(f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream')
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                       f'/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>')
+        kids.append(f'{len(objects)} 0 R')
+    objects[1] = f'<< /Type /Pages /Kids [{" ".join(kids)}] /Count {len(kids)} >>'
+
+    out = b'%PDF-1.4\n'
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n{body}\nendobj\n'.encode()
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    out += ''.join(f'{offset:010d} 00000 n \n' for offset in offsets).encode()
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+    return out
+
 
 class PDFUtilsTest(TestCase):
     def test_normalize_date(self):
@@ -49,10 +98,32 @@ class PDFUtilsTest(TestCase):
         self.assertIsNone(result4['patient_last_name'])
         self.assertIsNone(result4['dob'])
 
+class FieldExtractorTest(TestCase):
+    def test_new_fields_share_the_single_scan(self):
+        """Test an extra field is one more rule, found in the same pass as the rest"""
+        extractor = fields.FieldExtractor(
+            {**fields.FIELDS, 'mrn': str.upper},
+            fields.RULES + [fields.Rule(['MRN', 'Medical Record Number'], r'([A-Za-z0-9-]+)', ['mrn'])],
+        )
+        result = extractor.extract('Name: Roe, Jane\nmrn: ab-1234\nDOB: 2-3-80')
+        self.assertEqual(result, {'patient_first_name': 'Jane', 'patient_last_name': 'Roe',
+                                  'dob': '1980-02-03', 'mrn': 'AB-1234'})
+
+    def test_rule_precedence(self):
+        """Test Name rules override earlier values while First/Last only fill gaps"""
+        text = 'First: Ann\nLast: Lee\nName: Bob Stone\nFirst Name: Cid\nDOB: 1/2/90\nDOB:\n3/4/05'
+        self.assertEqual(extract_patient_info(text),
+                         {'patient_first_name': 'Bob', 'patient_last_name': 'Stone', 'dob': '1990-01-02'})
+
+    def test_unknown_field_is_rejected(self):
+        with self.assertRaises(ValueError):
+            fields.FieldExtractor(fields.FIELDS, [fields.Rule(['MRN'], r'(\d+)', ['mrn'])])
+
+
 class UploadAPITest(APITestCase):
     def setUp(self):
         # Create a simple text file that simulates a PDF
-        self.pdf_content = b"Patient Name: Test Patient\nDOB: 01/01/1990"
+        self.pdf_content = make_pdf("Patient Name: Test Patient\nDOB: 01/01/1990")
         self.pdf_file = SimpleUploadedFile(
             "test.pdf",
             self.pdf_content,
@@ -156,3 +227,611 @@ class IntegrationTest(APITestCase):
         # 6. Verify deletion
         final_list_response = self.client.get(orders_url)
         self.assertEqual(len(final_list_response.data), 0)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='extraction-jobs-'))
+class ExtractionJobTest(APITestCase):
+    def setUp(self):
+        self.pdf = make_pdf('Referral\nPatient Name: Jane Roe\nDOB: 02/03/1980')
+
+    def submit(self, content=None, name='referral.pdf'):
+        upload = SimpleUploadedFile(name, self.pdf if content is None else content, content_type='application/pdf')
+        return self.client.post(reverse('create_extraction_job'), {'file': upload}, format='multipart')
+
+    def run_worker(self, *args):
+        call_command('run_extraction_worker', '--burst', *(args or ('--workers', '0')), stdout=io.StringIO())
+
+    def test_job_lifecycle(self):
+        """Test 202 + Location, then the worker stores upload_pdf's result and drops the file"""
+        response = self.submit()
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'queued')
+        job = ExtractionJob.objects.get(id=response.data['id'])
+        self.assertTrue(os.path.exists(job.file.path))
+
+        self.run_worker()
+        response = self.client.get(response['Location'])
+        self.assertEqual(response.data['status'], 'done')
+        self.assertEqual(response.data['result_status'], status.HTTP_200_OK)
+        self.assertEqual(response.data['result']['extracted'],
+                         {'patient_first_name': 'Jane', 'patient_last_name': 'Roe', 'dob': '1980-02-03'})
+        self.assertFalse(os.path.exists(job.file.path))
+
+    def test_job_result_matches_sync_errors(self):
+        """Test an unreadable PDF finishes with the same 422 the sync endpoint returns"""
+        job_id = self.submit(content=b'%PDF-1.4 not really a pdf').data['id']
+        self.run_worker()
+        data = self.client.get(reverse('extraction_job', kwargs={'job_id': job_id})).data
+        self.assertEqual((data['status'], data['result_status']), ('done', status.HTTP_422_UNPROCESSABLE_ENTITY))
+        self.assertIn('error', data['result'])
+
+    def test_validation_and_missing_job(self):
+        """Test non-PDF uploads are rejected up front and unknown jobs are 404"""
+        response = self.submit(name='notes.txt')
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        response = self.client.get(reverse('extraction_job', kwargs={'job_id': '00000000-0000-0000-0000-000000000000'}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_jobs_of_a_dead_worker_are_recovered(self):
+        """Test a running job with a stale heartbeat is requeued and completed by the next worker"""
+        self.submit()
+        job = jobs.claim_next('crashed-host:1')
+        ExtractionJob.objects.filter(id=job.id).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('done', 2))
+
+    def test_attempts_are_bounded(self):
+        """Test a job that keeps losing its worker is failed after EXTRACTION_MAX_ATTEMPTS"""
+        self.submit()
+        stale = timezone.now() - timedelta(hours=1)
+        for _ in range(3):
+            job = jobs.claim_next('crashed-host:1')
+            ExtractionJob.objects.filter(id=job.id).update(heartbeat_at=stale)
+            jobs.requeue_expired(max_attempts=3)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIsNone(jobs.claim_next('worker'))
+
+    def test_release_returns_job_without_spending_an_attempt(self):
+        """Test a clean shutdown puts running jobs straight back on the queue"""
+        self.submit()
+        job = jobs.claim_next('worker')
+        jobs.release([job.id])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 0))
+
+    def test_outcome_of_a_lost_job_is_dropped(self):
+        """Test a worker whose job was requeued and claimed elsewhere can't finish or fail it"""
+        self.submit()
+        job = jobs.claim_next('slow-host:1')
+        ExtractionJob.objects.filter(id=job.id).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        jobs.requeue_expired()
+        claimed = jobs.claim_next('worker')
+
+        self.assertFalse(jobs.finish(job, status.HTTP_200_OK, {}))
+        self.assertFalse(jobs.fail(job, 'crashed'))
+        claimed.refresh_from_db()
+        self.assertEqual((claimed.status, claimed.worker, claimed.error), ('running', 'worker', ''))
+        self.assertTrue(os.path.exists(claimed.file.path))
+        self.assertTrue(jobs.finish(claimed, status.HTTP_200_OK, {}))
+
+    @override_settings(EXTRACTION_LEASE_SECONDS=0.15)
+    def test_inline_worker_heartbeats_long_jobs(self):
+        """Test a job outlasting the lease keeps its heartbeat when run inline"""
+        job_id = self.submit().data['id']
+
+        def slow_extraction(path):
+            time.sleep(0.3)
+            return status.HTTP_200_OK, {}
+
+        with mock.patch.object(jobs, 'run_job_file', side_effect=slow_extraction), \
+                mock.patch.object(jobs, 'heartbeat') as heartbeat:
+            self.run_worker()
+        self.assertGreaterEqual(heartbeat.call_count, 2)
+        self.assertEqual(heartbeat.call_args.args, ([ExtractionJob.objects.get(id=job_id).id],))
+        self.assertEqual(ExtractionJob.objects.get(id=job_id).status, 'done')
+
+    def test_process_pool_worker(self):
+        """Test the pooled worker processes several jobs"""
+        ids = [self.submit().data['id'] for _ in range(3)]
+        self.run_worker('--workers', '2')
+        self.assertEqual(
+            list(ExtractionJob.objects.filter(id__in=ids).values_list('status', flat=True).distinct()), ['done']
+        )
+
+    @override_settings(OCR_WORKERS=8)
+    def test_pool_children_share_ocr_workers(self):
+        """Test each extraction process gets its share of OCR_WORKERS, not all of them"""
+        with mock.patch.object(run_extraction_worker, 'ProcessPoolExecutor') as pool:
+            run_extraction_worker.Command().new_pool(3)
+        self.assertEqual(pool.call_args.kwargs['initargs'], (2,))
+        self.assertEqual(run_extraction_worker.child_ocr_workers(16), 1)
+
+
+class ParallelOCRTest(TestCase):
+    def test_pages_come_back_in_order(self):
+        """Test pooled OCR reassembles pages in page order whatever order they finish in"""
+        def fake_ocr_page(path, page_number, dpi, tesseract_cmd):
+            time.sleep(0.01 * (4 - page_number))  # last page finishes first
+            return f'page {page_number}'
+
+        with mock.patch.object(ocr, 'ocr_page', side_effect=fake_ocr_page) as ocr_page, \
+                mock.patch.object(ocr, '_get_pool', return_value=ThreadPoolExecutor(3)), \
+                ocr.PageOCR(io.BytesIO(b'%PDF-1.4'), workers=3, tesseract_cmd='tesseract') as scans:
+            texts = list(scans.pages([1, 2, 3]))
+        self.assertEqual(texts, ['page 1', 'page 2', 'page 3'])
+        self.assertEqual(ocr_page.call_count, 3)
+
+    def test_budget_limits_pages_in_flight_not_pool_size(self):
+        """Test a tight memory budget keeps fewer pages in flight on the one shared pool"""
+        pool = ThreadPoolExecutor(4)
+        bitmap = ocr._page_bitmap_bytes({'Page size': '612 x 792 pts'}, 200)
+        budget = mock.Mock(**{'remaining.return_value': 2 * bitmap})
+        in_flight = []
+        with mock.patch.object(ocr, 'ocr_page', side_effect=lambda path, number, dpi, cmd: f'page {number}'), \
+                mock.patch.object(ocr, '_get_pool', return_value=pool) as get_pool, \
+                mock.patch.object(pool, 'submit', wraps=pool.submit) as submit, \
+                ocr.PageOCR(io.BytesIO(b'%PDF-1.4'), workers=4, tesseract_cmd='tesseract', budget=budget) as scans:
+            scans._info = {'Page size': '612 x 792 pts'}
+            for done, text in enumerate(scans.pages([1, 2, 3, 4, 5, 6])):
+                in_flight.append(submit.call_count - done)
+        self.assertEqual(max(in_flight), 2)
+        self.assertEqual(submit.call_count, 6)
+        get_pool.assert_called_once_with(4)
+
+        # Whatever size is asked for later, the process keeps the one pool
+        with mock.patch.object(ocr, '_pool', None):
+            first = ocr._get_pool(4)
+            self.assertIs(ocr._get_pool(2), first)
+            first.shutdown()
+
+    @override_settings(OCR_WORKERS=4)
+    def test_scanned_pdf_uses_ocr_workers_setting(self):
+        """Test a PDF without a text layer is OCRed with OCR_WORKERS processes"""
+        with mock.patch.object(pdf_utils, 'PageOCR', wraps=ocr.PageOCR) as page_ocr, \
+                mock.patch.object(ocr.PageOCR, 'pages', return_value=(t for t in ['Name: Scan Ned'])):
+            text = pdf_utils.extract_text_from_pdf(io.BytesIO(make_pdf('')))
+        self.assertEqual(text, 'Name: Scan Ned\n')
+        self.assertEqual(page_ocr.call_args.kwargs['workers'], 4)
+
+
+class PerPageExtractionTest(TestCase):
+    def fake_ocr(self, page_numbers):
+        self.ocr_pages.extend(page_numbers)
+        return (f'Name: Scan{number} Page' for number in page_numbers)
+
+    def setUp(self):
+        self.ocr_pages = []
+        patcher = mock.patch.object(ocr.PageOCR, 'pages', autospec=True,
+                                    side_effect=lambda scans, numbers: self.fake_ocr(numbers))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_only_scanned_pages_are_ocred(self):
+        """Test pages with a text layer are read as text and only the scans go to OCR"""
+        pdf = make_pdf('Referral for the patient below', '', 'Clinical notes continue here', '')
+        text = pdf_utils.extract_text_from_pdf(io.BytesIO(pdf))
+        self.assertEqual(self.ocr_pages, [2, 4])
+        self.assertEqual(text.splitlines(), [
+            'Referral for the patient below', 'Name: Scan2 Page', 'Clinical notes continue here', 'Name: Scan4 Page',
+        ])
+
+    def test_stops_once_all_fields_are_found(self):
+        """Test extraction reads no further than the page completing the patient info"""
+        pages = ['Patient Name: Jane Roe', 'DOB: 02/03/1980'] + ['', 'More notes for the record'] * 5
+        with mock.patch.object(pdf_utils, '_page_text', wraps=pdf_utils._page_text) as page_text:
+            text, info, ocr_tier, ocr_failed = pdf_utils.extract_patient_info_from_pdf(io.BytesIO(make_pdf(*pages)))
+        self.assertEqual(info, {'patient_first_name': 'Jane', 'patient_last_name': 'Roe', 'dob': '1980-02-03'})
+        self.assertEqual(max(call.args[0].page_number for call in page_text.call_args_list), 2)
+        self.assertEqual(self.ocr_pages, [])
+        self.assertEqual((ocr_tier, ocr_failed), (None, False))
+        self.assertNotIn('More notes', text)
+
+    def test_document_is_opened_and_first_page_read_once(self):
+        """Test the scan check on page 1 and the per-page loop share one parse of the PDF"""
+        pages = ['Patient Name: Jane Roe', 'DOB: 02/03/1980']
+        with mock.patch.object(pdf_utils.pdfplumber, 'open', wraps=pdf_utils.pdfplumber.open) as pdf_open, \
+                mock.patch.object(pdf_utils, '_page_text', wraps=pdf_utils._page_text) as page_text:
+            text, info, ocr_tier, ocr_failed = pdf_utils.extract_patient_info_from_pdf(io.BytesIO(make_pdf(*pages)))
+        self.assertEqual(info['dob'], '1980-02-03')
+        self.assertEqual(pdf_open.call_count, 1)
+        self.assertEqual([call.args[0].page_number for call in page_text.call_args_list], [1, 2])
+
+    def test_incremental_matches_whole_text(self):
+        """Test feeding text a page at a time gives the same fields as the whole text at once"""
+        pages = ['First Name: Ann\nName: Doe, John', 'Last Name: Smith\nDOB: 1/2/90', 'Name: Jim Beam\nDOB: 3/4/05']
+        found = None
+        for page in pages:
+            found = extract_patient_info(page, found=found)
+        self.assertEqual(found, extract_patient_info('\n'.join(pages)))
+
+
+@override_settings(OCR_HEADER_TIERS=[(150, 0.3), (300, 0.3)], OCR_DPI=200, EXTRACTION_CACHE_MAX_ENTRIES=0)
+class AdaptiveOCRTest(TestCase):
+    def extract(self, header_texts, page_text='Name: Page Scan\nDOB: 5/6/1977'):
+        """Run extraction on a one-page scan with OCR stubbed: header_texts by dpi, page_text for whole pages"""
+        self.pages = []
+
+        def fake_pages(scans, page_numbers):
+            self.pages.extend(page_numbers)
+            scans.pages_ocred += len(page_numbers)
+            return (page_text for _ in page_numbers)
+
+        with mock.patch.object(ocr.PageOCR, 'region', autospec=True,
+                               side_effect=lambda scans, page, dpi, fraction: header_texts.get(dpi, '')) as region, \
+                mock.patch.object(ocr.PageOCR, 'pages', autospec=True, side_effect=fake_pages):
+            result = process_pdf(io.BytesIO(make_pdf('')))
+        self.regions = [call.args[2] for call in region.call_args_list]
+        return result
+
+    def test_low_dpi_header_is_enough(self):
+        """Test a header readable at low DPI is all that gets OCRed"""
+        result_status, body = self.extract({150: 'Patient Name: Jane Roe\nDOB: 02/03/1980'})
+        self.assertEqual(result_status, status.HTTP_200_OK)
+        self.assertEqual(body['ocr_tier'], 'header@150dpi')
+        self.assertEqual(body['extracted']['patient_last_name'], 'Roe')
+        self.assertEqual((self.regions, self.pages), ([150], []))
+
+    def test_escalates_to_higher_dpi_then_whole_pages(self):
+        """Test each tier runs only when the one before it missed a field"""
+        _, body = self.extract({150: 'Patient Name: Jane Roe', 300: 'Patient Name: Jane Roe\nDOB: 02/03/1980'})
+        self.assertEqual((body['ocr_tier'], self.regions, self.pages), ('header@300dpi', [150, 300], []))
+
+        _, body = self.extract({150: 'Patient Name: Jane Roe'})
+        self.assertEqual((body['ocr_tier'], self.regions, self.pages), ('page@200dpi', [150, 300], [1]))
+        self.assertEqual(body['extracted']['dob'], '1977-05-06')
+
+    def test_text_layer_skips_ocr(self):
+        """Test a PDF with a text layer reports no OCR tier"""
+        result_status, body = process_pdf(io.BytesIO(make_pdf('Patient Name: Text Layer\nDOB: 1/1/2001')))
+        self.assertEqual((result_status, body['ocr_tier']), (status.HTTP_200_OK, None))
+
+    def test_tiers_are_counted(self):
+        """Test GET /api/upload/ocr/stats/ counts successful extractions per tier"""
+        extraction.reset_tier_stats()
+        self.extract({150: 'Patient Name: Jane Roe\nDOB: 02/03/1980'})
+        self.extract({150: 'Patient Name: Jane Roe\nDOB: 02/03/1980'})
+        self.extract({})
+        process_pdf(io.BytesIO(make_pdf('Patient Name: Text Layer\nDOB: 1/1/2001')))
+
+        response = self.client.get(reverse('ocr_stats'))
+        self.assertEqual(response.json(), {
+            'tiers': {'header@150dpi': 2, 'page@200dpi': 1, 'text_layer': 1},
+            'total': 4,
+        })
+
+
+@override_settings(EXTRACTION_CACHE_MAX_ENTRIES=0, BATCH_EXTRACTION_WORKERS=2)
+class BatchUploadTest(APITestCase):
+    def post(self, *files):
+        uploads = [SimpleUploadedFile(name, content) for name, content in files]
+        response = self.client.post(reverse('upload_batch'), {'files': uploads}, format='multipart')
+        if response.status_code != status.HTTP_200_OK:
+            return response, None
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).splitlines()
+        return response, [json.loads(line) for line in lines]
+
+    def test_files_and_zip_members_get_a_line_each(self):
+        """Test PDFs, ZIP members and rejected files each get their own result line"""
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as bundle:
+            bundle.writestr('fax/one.pdf', make_pdf('Patient Name: Zip One\nDOB: 1/1/1961'))
+            bundle.writestr('fax/cover.txt', 'cover sheet')
+            bundle.writestr('__MACOSX/fax/._one.pdf', 'resource fork')
+        _, lines = self.post(
+            ('direct.pdf', make_pdf('Patient Name: Direct Upload\nDOB: 2/2/1962')),
+            ('bundle.zip', archive.getvalue()),
+            ('broken.pdf', b'not a pdf'),
+            ('notes.docx', b'docx'),
+        )
+        results = {line['file']: (line['index'], line['result_status'], line['result']) for line in lines}
+        self.assertEqual(set(results), {'direct.pdf', 'bundle.zip/fax/one.pdf', 'bundle.zip/fax/cover.txt',
+                                        'broken.pdf', 'notes.docx'})
+        self.assertEqual(results['direct.pdf'][1:], (200, {
+            'extracted': {'patient_first_name': 'Direct', 'patient_last_name': 'Upload', 'dob': '1962-02-02'},
+            'ocr_tier': None,
+        }))
+        self.assertEqual(results['bundle.zip/fax/one.pdf'][1], 200)
+        self.assertEqual(results['bundle.zip/fax/cover.txt'][1], 415)
+        self.assertEqual(results['broken.pdf'][1:], (415, {'error': 'File is not a PDF'}))
+        self.assertEqual(results['notes.docx'][1], 415)
+        self.assertEqual(sorted(index for index, _, _ in results.values()), list(range(5)))
+
+    def test_results_stream_as_files_finish_with_bounded_parallelism(self):
+        """Test a slow file doesn't hold back the others and no more than BATCH_EXTRACTION_WORKERS run at once"""
+        running, peak = [], []
+
+        def fake_process(pdf_file):
+            running.append(pdf_file.name)
+            peak.append(len(running))
+            time.sleep(0.3 if pdf_file.name == 'slow.pdf' else 0.02)
+            running.remove(pdf_file.name)
+            return 200, {'file': pdf_file.name}
+
+        with mock.patch('api.uploads.batch.process_pdf', side_effect=fake_process):
+            _, lines = self.post(('slow.pdf', b'%PDF-'), *[(f'{i}.pdf', b'%PDF-') for i in range(4)])
+        self.assertEqual(lines[-1]['file'], 'slow.pdf')
+        self.assertEqual(lines[-1]['index'], 0)
+        self.assertLessEqual(max(peak), 2)
+
+    async def test_results_are_an_async_iterator_under_asgi(self):
+        """Test the ASGI batch streams through an async iterator, which Django doesn't buffer"""
+        uploads = [SimpleUploadedFile(f'{name}.pdf', make_pdf(f'Patient Name: Async {name}')) for name in ('Ann', 'Bob')]
+        response = await self.async_client.post(reverse('upload_batch'), {'files': uploads})
+
+        self.assertTrue(response.is_async)
+        lines = [json.loads(line) async for line in response.streaming_content]
+        self.assertEqual(sorted(line['result']['extracted']['patient_last_name'] for line in lines),
+                         ['Ann', 'Bob'])
+
+    @override_settings(BATCH_MAX_FILES=2)
+    def test_rejected_batches(self):
+        response, _ = self.post()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response, _ = self.post(*[(f'{i}.pdf', b'%PDF-') for i in range(3)])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        _, lines = self.post(('bad.zip', b'PK\x03\x04 not really'))
+        self.assertEqual((lines[0]['result_status'], lines[0]['result']['error']), (400, 'Invalid ZIP archive'))
+
+    @override_settings(PDF_MAX_FILE_MB=1, BATCH_MAX_FILES=6)
+    def test_files_are_checked_as_they_stream_in(self):
+        """Test each batch file is spooled with its hash, and capped and header-checked on its own"""
+        pdf = make_pdf('Patient Name: Spool Ed')
+        hashes = []
+
+        def fake_process(pdf_file):
+            hashes.append(pdf_file.sha256)
+            return 200, {}
+
+        with mock.patch('api.uploads.batch.process_pdf', side_effect=fake_process):
+            _, lines = self.post(
+                ('ok.pdf', pdf),
+                ('big.pdf', b'%PDF-1.4\n' + b'0' * (2 * 1024 * 1024)),
+                ('renamed.pdf', b'GIF89a' + b' ' * 2000),
+                ('renamed.zip', b'%PDF-1.4'),
+                ('big.zip', b'PK\x03\x04' + b'0' * (7 * 1024 * 1024)),
+                ('notes.docx', b'docx'),
+            )
+        results = {line['file']: (line['result_status'], line['result']) for line in lines}
+        self.assertEqual(hashes, [hashlib.sha256(pdf).hexdigest()])
+        self.assertEqual(results, {
+            'ok.pdf': (200, {}),
+            'big.pdf': (413, {'error': 'PDF is larger than 1 MB'}),
+            'renamed.pdf': (415, {'error': 'File is not a PDF'}),
+            'renamed.zip': (415, {'error': 'File is not a ZIP archive'}),
+            'big.zip': (413, {'error': 'ZIP archive is larger than 6 MB'}),
+            'notes.docx': (415, {'error': 'Unsupported file type. Please upload a PDF.'}),
+        })
+
+
+class UploadCreateOrderTest(APITestCase):
+    def upload(self, text, create_order='true'):
+        upload = SimpleUploadedFile('referral.pdf', make_pdf(text), content_type='application/pdf')
+        return self.client.post(reverse('upload_pdf') + f'?create_order={create_order}', {'file': upload},
+                                format='multipart')
+
+    def test_creates_then_matches_the_patient(self):
+        """Test the first upload creates the order and a later one for the same patient matches it"""
+        first = self.upload('Patient Name: Jane Roe\nDOB: 02/03/1980')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(first.data['order_created'])
+        self.assertEqual(first.data['order']['patient_last_name'], 'Roe')
+        self.assertEqual(first.data['extracted']['dob'], '1980-02-03')
+
+        # Same patient, different capitalisation and date format
+        second = self.upload('Name: ROE, jane\nDate of Birth: 2-3-80')
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertFalse(second.data['order_created'])
+        self.assertEqual(second.data['order']['id'], first.data['order']['id'])
+        self.assertEqual(Order.objects.count(), 1)
+
+        self.assertEqual(self.upload('Patient Name: Jane Roe\nDOB: 02/03/1981').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_incomplete_patient_is_never_matched(self):
+        """Test uploads missing a DOB each create their own order"""
+        self.assertEqual(self.upload('Patient Name: No Birthday').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.upload('Patient Name: No Birthday').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_impossible_dob_is_stored_as_none(self):
+        """Test a day/month-swapped DOB creates an order without one instead of failing"""
+        for _ in range(2):
+            response = self.upload('Patient Name: Jane Roe\nDOB: 31/12/1980')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertIsNone(response.data['order']['dob'])
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_lookup_runs_under_the_write_lock(self):
+        """Test the write lock is taken before the patient lookup, whatever the transaction mode"""
+        from api.orders.intake import get_or_create_patient_order
+        with CaptureQueriesContext(connection) as queries:
+            get_or_create_patient_order({'patient_first_name': 'Jane', 'patient_last_name': 'Roe', 'dob': '1980-02-03'})
+        statements = [query['sql'] for query in queries.captured_queries]
+        lock = next(i for i, sql in enumerate(statements) if sql.startswith('UPDATE') and 'WHERE 0' in sql)
+        lookup = next(i for i, sql in enumerate(statements) if sql.startswith('SELECT'))
+        self.assertLess(lock, lookup)
+
+    def test_without_the_option_or_on_failure_no_order(self):
+        response = self.upload('Patient Name: Jane Roe\nDOB: 02/03/1980', create_order='false')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('order', response.data)
+        self.assertEqual(self.upload('nothing useful here at all').status_code,
+                         status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertFalse(Order.objects.exists())
+
+
+class PDFUploadHandlerTest(APITestCase):
+    def upload(self, content, name='referral.pdf'):
+        upload = SimpleUploadedFile(name, content, content_type='application/pdf')
+        return self.client.post(reverse('upload_pdf'), {'file': upload}, format='multipart')
+
+    def test_upload_is_spooled_hashed_and_read_in_place(self):
+        """Test a small upload still goes to disk with its hash, and OCR reads that file without a copy"""
+        pdf = make_pdf('')
+        seen = {}
+
+        def fake_pages(scans, page_numbers):
+            seen['path'] = scans.path
+            seen['sha256'] = scans.pdf_file.sha256
+            seen['temp_files'] = os.listdir(scans.temp_dir)
+            return (text for text in ['Patient Name: Spool Ed\nDOB: 1/2/1999'])
+
+        with mock.patch.object(ocr.PageOCR, 'region', side_effect=OSError('no poppler')), \
+                mock.patch.object(ocr.PageOCR, 'pages', autospec=True, side_effect=fake_pages), \
+                mock.patch.object(result_cache, 'file_sha256') as file_sha256:
+            response = self.upload(pdf)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(seen['sha256'], hashlib.sha256(pdf).hexdigest())
+        self.assertTrue(seen['path'].startswith(tempfile.gettempdir()))
+        self.assertEqual(seen['temp_files'], [])
+        file_sha256.assert_not_called()
+
+    def test_non_pdf_bodies_are_rejected(self):
+        """Test bytes without a PDF header are refused with 415, short or long"""
+        for content in (b'GIF89a', b'<html>' + b' ' * 200000):
+            response = self.upload(content)
+            self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+            self.assertEqual(response.data['error'], 'File is not a PDF')
+
+    @override_settings(PDF_MAX_FILE_MB=1)
+    def test_oversized_uploads_are_rejected_early(self):
+        """Test a file past PDF_MAX_FILE_MB is dropped while streaming, before extraction"""
+        with mock.patch('api.uploads.views.process_pdf') as process:
+            response = self.upload(b'%PDF-1.4\n' + b'0' * (2 * 1024 * 1024))
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        process.assert_not_called()
+        with mock.patch.object(PDFUploadHandler, 'receive_data_chunk') as receive:
+            response = self.upload(b'%PDF-1.4\n' + b'0' * (2 * 1024 * 1024))
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        receive.assert_not_called()
+
+
+PEAK_RSS_SCRIPT = """
+import io, os, sys
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_backend.settings')
+import django
+django.setup()
+from api.tests.test_uploads import make_pdf
+from api.uploads.memory import peak_rss
+from api.uploads.pdf_utils import extract_text_from_pdf
+page = '\\n'.join(f'Line {i} of the clinical notes for this referral' for i in range(50))
+pdf = make_pdf(*[page] * int(sys.argv[1]))
+before = peak_rss()
+text = extract_text_from_pdf(io.BytesIO(pdf), memory_budget_mb=0)
+assert text.count('Line 49') == int(sys.argv[1])
+print(peak_rss() - before)
+"""
+
+
+class BoundedMemoryExtractionTest(TestCase):
+    def test_peak_rss_stays_flat_for_long_documents(self):
+        """Test peak RSS growth while extracting a 30-page text PDF (about 150 MB if page caches were kept)"""
+        result = subprocess.run(
+            [sys.executable, '-c', PEAK_RSS_SCRIPT, '30'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=120,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertLess(int(result.stdout.split()[-1]), 40 * memory.MB)
+
+    def test_budget_exceeded_is_413(self):
+        """Test extraction stops with 413 once RSS growth passes the budget"""
+        rss = iter(range(0, 10**12, 64 * memory.MB))
+        with mock.patch.object(memory, 'current_rss', side_effect=lambda: next(rss)), \
+                self.settings(EXTRACTION_MEMORY_BUDGET_MB=100):
+            result_status, body = process_pdf(io.BytesIO(make_pdf(*['Name: Big Doc'] * 5)))
+        self.assertEqual(result_status, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertIn('100 MB', body['details'])
+
+    def test_ocr_rasterizes_runs_of_pages(self):
+        """Test in-process OCR rasterizes each run of scanned pages in one call, checking the budget per page"""
+        def fake_convert(path, dpi, first_page, last_page, output_folder, paths_only):
+            pages = range(first_page, last_page + 1)
+            for page in pages:
+                open(os.path.join(output_folder, f'{page}.ppm'), 'w').close()
+            return [os.path.join(output_folder, f'{page}.ppm') for page in pages]
+
+        budget = mock.Mock(**{'remaining.return_value': None})
+        with mock.patch.object(ocr, 'convert_from_path', side_effect=fake_convert) as convert, \
+                mock.patch.object(ocr.pytesseract, 'image_to_string',
+                                  side_effect=lambda path, config: os.path.basename(path)), \
+                ocr.PageOCR(io.BytesIO(b'%PDF-1.4'), workers=1, budget=budget) as scans:
+            texts = list(scans.pages([1, 2, 4, 5, 7]))
+        self.assertEqual(texts, ['1.ppm', '2.ppm', '4.ppm', '5.ppm', '7.ppm'])
+        self.assertEqual([(c.kwargs['first_page'], c.kwargs['last_page']) for c in convert.call_args_list],
+                         [(1, 2), (4, 5), (7, 7)])
+        self.assertEqual(budget.check.call_count, 5)
+
+
+class ExtractionCacheTest(APITestCase):
+    def setUp(self):
+        self.pdf = make_pdf('Patient Name: Cache Hit\nDOB: 04/05/1970')
+
+    def upload(self, content):
+        upload = SimpleUploadedFile('referral.pdf', content, content_type='application/pdf')
+        return self.client.post(reverse('upload_pdf'), {'file': upload}, format='multipart')
+
+    def test_resubmission_is_served_from_cache(self):
+        """Test the same bytes are extracted once and then answered with two queries"""
+        with mock.patch('api.uploads.extraction.extract_patient_info_from_pdf',
+                        wraps=pdf_utils.extract_patient_info_from_pdf) as extract:
+            first = self.upload(self.pdf)
+            with self.assertNumQueries(2):
+                status_code, body = process_pdf(io.BytesIO(self.pdf))
+            second = self.upload(self.pdf)
+        self.assertEqual(extract.call_count, 1)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual((second.status_code, second.data), (first.status_code, first.data))
+        self.assertEqual(body, first.data)
+        self.assertIn('Cache Hit', ExtractionCacheEntry.objects.get().text)
+
+    def test_extractor_version_change_misses(self):
+        """Test entries written by an older extractor are ignored and cleared out"""
+        self.upload(self.pdf)
+        with mock.patch.object(result_cache, 'EXTRACTOR_VERSION', 'newer'):
+            self.assertIsNone(result_cache.lookup(result_cache.file_sha256(io.BytesIO(self.pdf))))
+            self.upload(self.pdf)
+            self.assertEqual(list(ExtractionCacheEntry.objects.values_list('extractor_version', flat=True)),
+                             [result_cache.extractor_version()])
+
+    def test_ocr_settings_change_misses(self):
+        """Test retuning OCR_DPI or OCR_HEADER_TIERS retires cached results"""
+        self.upload(self.pdf)
+        sha256 = result_cache.file_sha256(io.BytesIO(self.pdf))
+        self.assertIsNotNone(result_cache.lookup(sha256))
+        with override_settings(OCR_DPI=300):
+            self.assertIsNone(result_cache.lookup(sha256))
+        with override_settings(OCR_HEADER_TIERS=[(100, 0.5)]):
+            self.assertIsNone(result_cache.lookup(sha256))
+
+    def test_results_read_around_an_ocr_failure_are_not_cached(self):
+        """Test a result from a document whose OCR failed part way is retried next time"""
+        pdf = make_pdf('Patient Name: Part Read', '', 'DOB: 04/05/1970')
+
+        def failing_pages(scans, page_numbers):
+            raise OSError('tesseract died')
+            yield
+
+        with mock.patch.object(ocr.PageOCR, 'pages', autospec=True, side_effect=failing_pages):
+            first = self.upload(pdf)
+        # The text layers still gave an answer, but the scan in between went unread
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertFalse(ExtractionCacheEntry.objects.exists())
+
+    @override_settings(EXTRACTION_CACHE_MAX_ENTRIES=2)
+    def test_lru_eviction(self):
+        """Test the least recently used entry goes once the cache is full"""
+        digests = [f'{i:064x}' for i in range(3)]
+        result_cache.store(digests[0], 'text', 200, {})
+        result_cache.store(digests[1], 'text', 200, {})
+        result_cache.lookup(digests[0])
+        result_cache.store(digests[2], 'text', 200, {})
+        self.assertEqual(set(ExtractionCacheEntry.objects.values_list('sha256', flat=True)), {digests[0], digests[2]})
+
+    def test_unreadable_pdfs_are_not_cached(self):
+        """Test a PDF that yielded no text (maybe OCR was down) is retried next time"""
+        self.assertEqual(self.upload(b'%PDF-1.4 truncated').status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertFalse(ExtractionCacheEntry.objects.exists())
@@ -0,0 +1,127 @@
+import asyncio
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+
+from django.conf import settings
+from django.db import connection
+from rest_framework import status
+
+from ..orders.renderers import dumps
+from .extraction import process_pdf
+
+# Extraction of a bundle of PDFs in one request, for senders such as a fax
+# gateway. Files run on a bounded thread pool: most of the time per scan is
+# spent in Poppler and Tesseract subprocesses, which threads overlap fine.
+# Results stream back one NDJSON line per file as each finishes, and a file
+# that fails only fails its own line. Under ASGI the lines come from
+# aiter_batch_results() instead, as Django's ASGI handler would hold back a
+# sync iterator until it was exhausted.
+
+UNSUPPORTED = (status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, {'error': 'Unsupported file type. Please upload a PDF.'})
+
+
+def _is_pdf(name):
+    return name.lower().endswith('.pdf')
+
+
+def _is_zip(name):
+    return name.lower().endswith('.zip')
+
+
+@contextmanager
+def _zip_member(archive, info):
+    # pdfplumber seeks all over the file, which a compressed member does badly
+    with archive.open(info) as member, tempfile.TemporaryFile() as copy:
+        shutil.copyfileobj(member, copy)
+        copy.seek(0)
+        yield copy
+
+
+def _zip_items(upload):
+    try:
+        archive = zipfile.ZipFile(upload)
+    except zipfile.BadZipFile as e:
+        yield upload.name, None, (status.HTTP_400_BAD_REQUEST, {'error': 'Invalid ZIP archive', 'details': str(e)})
+        return
+    for info in archive.infolist():
+        if info.is_dir() or info.filename.startswith('__MACOSX/'):
+            continue
+        name = f'{upload.name}/{info.filename}'
+        if not _is_pdf(info.filename):
+            yield name, None, UNSUPPORTED
+        elif info.file_size > settings.PDF_MAX_FILE_MB * 1024 * 1024:
+            yield name, None, (status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                               {'error': f'PDF is larger than {settings.PDF_MAX_FILE_MB} MB'})
+        else:
+            yield name, lambda info=info: _zip_member(archive, info), None
+
+
+def batch_items(uploads):
+    """
+    (name, open, rejection) for every file in uploads, ZIP archives expanded
+    to their members. open() is a context manager giving the PDF as a
+    seekable file; rejection is the (http_status, body) of a file refused
+    without being read, and open is None for those.
+    """
+    for upload in uploads:
+        if _is_zip(upload.name):
+            yield from _zip_items(upload)
+        elif _is_pdf(upload.name):
+            yield upload.name, lambda upload=upload: nullcontext(upload), None
+        else:
+            yield upload.name, None, UNSUPPORTED
+
+
+def _extract(open_pdf):
+    try:
+        with open_pdf() as pdf_file:
+            return process_pdf(pdf_file)
+    except Exception as e:
+        return status.HTTP_400_BAD_REQUEST, {'error': 'Failed to process PDF', 'details': str(e)}
+    finally:
+        # Each pool thread opened its own connection for the extraction cache
+        connection.close()
+
+
+def _line(index, name, result_status, result):
+    return dumps({'index': index, 'file': name, 'result_status': result_status, 'result': result}) + b'\n'
+
+
+def iter_batch_results(items, workers):
+    """NDJSON line per item of batch_items(), in the order extractions finish"""
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch-extract')
+    futures = {}
+    try:
+        for index, (name, open_pdf, rejection) in enumerate(items):
+            if rejection:
+                yield _line(index, name, *rejection)
+            else:
+                futures[pool.submit(_extract, open_pdf)] = index, name
+        for future in as_completed(futures):
+            index, name = futures[future]
+            yield _line(index, name, *future.result())
+    finally:
+        # The client went away, or we're done: drop whatever hasn't started
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def aiter_batch_results(items, workers):
+    """iter_batch_results() as an async iterator, for ASGI"""
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch-extract')
+    pending = {}
+    try:
+        for index, (name, open_pdf, rejection) in enumerate(items):
+            if rejection:
+                yield _line(index, name, *rejection)
+            else:
+                pending[asyncio.wrap_future(pool.submit(_extract, open_pdf))] = index, name
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                index, name = pending.pop(future)
+                yield _line(index, name, *future.result())
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,78 @@
+import threading
+from collections import Counter
+
+from rest_framework import status
+
+from . import result_cache
+from .memory import MemoryBudgetExceeded
+from .pdf_utils import extract_patient_info_from_pdf
+
+
+# Successful extractions per OCR tier in this process, the way the order
+# cache counts hits: which passes actually find the fields is what
+# OCR_HEADER_TIERS is tuned by. Cache hits did no OCR and aren't counted.
+TEXT_LAYER = 'text_layer'
+_tier_lock = threading.Lock()
+_tier_counts = Counter()
+
+
+def _record_tier(ocr_tier):
+    with _tier_lock:
+        _tier_counts[ocr_tier or TEXT_LAYER] += 1
+
+
+def tier_stats():
+    """{tier: extractions} for the tiers used so far, and their total"""
+    with _tier_lock:
+        counts = dict(_tier_counts)
+    return {'tiers': counts, 'total': sum(counts.values())}
+
+
+def reset_tier_stats():
+    with _tier_lock:
+        _tier_counts.clear()
+
+
+def _extract(pdf_file):
+    # Returns (http_status, body, text, ocr_failed); text is None when
+    # nothing was read. Pages are read only until every field has turned up
+    text, extracted, ocr_tier, ocr_failed = extract_patient_info_from_pdf(pdf_file)
+
+    if not text or len(text.strip()) < 10:
+        return status.HTTP_422_UNPROCESSABLE_ENTITY, {'error': 'No extractable text found in PDF'}, None, ocr_failed
+
+    if not extracted['patient_first_name'] and not extracted['patient_last_name'] and not extracted['dob']:
+        return status.HTTP_422_UNPROCESSABLE_ENTITY, {'error': 'Could not extract patient info from PDF'}, text, ocr_failed
+
+    # ocr_tier records which OCR pass (if any) found the fields, for tuning OCR_HEADER_TIERS
+    _record_tier(ocr_tier)
+    return status.HTTP_200_OK, {'extracted': extracted, 'ocr_tier': ocr_tier}, text, ocr_failed
+
+
+def process_pdf(pdf_file):
+    """
+    Extract patient info from an open PDF file. Returns (http_status, body),
+    the response upload_pdf sends, so background jobs report exactly what
+    the synchronous endpoint would have. Results for bytes seen before come
+    from the extraction cache.
+    """
+    try:
+        # PDFUploadHandler hashes uploads as they stream in
+        sha256 = getattr(pdf_file, 'sha256', None) or result_cache.file_sha256(pdf_file)
+        cached = result_cache.lookup(sha256)
+        if cached is not None:
+            return cached
+
+        result_status, body, text, ocr_failed = _extract(pdf_file)
+        # No text can mean OCR was unavailable rather than a blank scan, and
+        # a failed OCR pass leaves scans unread; only outcomes that actually
+        # read the whole document they needed are worth keeping
+        if text is not None and not ocr_failed:
+            result_cache.store(sha256, text, result_status, body)
+        return result_status, body
+
+    except MemoryBudgetExceeded as e:
+        return status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, {'error': 'PDF is too large to process', 'details': str(e)}
+
+    except Exception as e:
+        return status.HTTP_400_BAD_REQUEST, {'error': 'Failed to process PDF', 'details': str(e)}
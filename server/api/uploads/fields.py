@@ -0,0 +1,113 @@
+import re
+
+# Patient fields are pulled out of document text by rules of the form
+# 'Label: value'. Every rule is compiled into one alternation, so the text
+# is scanned once however many fields or rules there are. To extract a new
+# field, add it to FIELDS (with a normalizer, if its value needs one) and
+# add a Rule that fills it.
+
+WORD = r"([A-Za-z][A-Za-z\-']*)"
+DATE = r'(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})'
+# Whitespace that doesn't cross a line; a field never continues on the next one
+SPACE = r'[^\S\n]'
+
+
+def normalize_date(date_str):
+    """Normalize date string to YYYY-MM-DD format"""
+    if not date_str:
+        return None
+
+    # Replace dashes with slashes for consistent parsing
+    date_str = date_str.replace('-', '/')
+    parts = date_str.split('/')
+
+    if len(parts) != 3:
+        return None
+
+    month, day, year = parts
+
+    # Handle 2-digit years
+    if len(year) == 2:
+        year_num = int(year)
+        if year_num >= 70:
+            year = f"19{year}"
+        else:
+            year = f"20{year}"
+
+    # Pad with zeros
+    month = month.zfill(2)
+    day = day.zfill(2)
+
+    return f"{year}-{month}-{day}"
+
+
+class Rule:
+    """
+    'Label: value' where label is one of labels (case-insensitive) and each
+    capture group of value fills the matching entry of fields. A rule that
+    overrides replaces values found earlier in the text; one that doesn't
+    only fills fields still empty.
+    """
+
+    def __init__(self, labels, value, fields, overrides=True):
+        self.labels = labels
+        self.value = value
+        self.fields = fields
+        self.overrides = overrides
+
+    def pattern(self):
+        labels = '|'.join(self.labels)
+        return rf'(?:{labels})\b{SPACE}*:{SPACE}*{self.value}'
+
+
+# field -> normalizer applied to the matched text (None keeps it as is)
+FIELDS = {
+    'patient_first_name': None,
+    'patient_last_name': None,
+    'dob': normalize_date,
+}
+
+# Where two rules could match at the same spot, the earlier one wins
+RULES = [
+    Rule(['Patient Name', 'Name'], rf'{WORD}{SPACE}+{WORD}', ['patient_first_name', 'patient_last_name']),
+    Rule(['Patient Name', 'Name'], rf'{WORD}{SPACE}*,{SPACE}*{WORD}', ['patient_last_name', 'patient_first_name']),
+    Rule(['First Name', 'Given Name', 'First'], WORD, ['patient_first_name'], overrides=False),
+    Rule(['Last Name', 'Family Name', 'Surname', 'Last'], WORD, ['patient_last_name'], overrides=False),
+    Rule(['DOB', 'Date of Birth'], DATE, ['dob']),
+]
+
+
+class FieldExtractor:
+    def __init__(self, fields, rules):
+        for rule in rules:
+            unknown = set(rule.fields) - set(fields)
+            if unknown:
+                raise ValueError(f"Rule for {rule.labels[0]!r} fills unknown fields: {', '.join(sorted(unknown))}")
+        self.fields = fields
+        # Most positions in a document can't start a label; checking the
+        # first letter up front lets the scanner skip them cheaply
+        initials = sorted({label[0].lower() + label[0].upper() for rule in rules for label in rule.labels})
+        alternatives = '|'.join(f'(?P<rule{i}>{rule.pattern()})' for i, rule in enumerate(rules))
+        self.scanner = re.compile(rf"\b(?=[{''.join(initials)}])(?:{alternatives})", re.IGNORECASE)
+        # rule name -> (rule, number of the group holding its first value)
+        self.rules = {
+            f'rule{i}': (rule, self.scanner.groupindex[f'rule{i}'] + 1) for i, rule in enumerate(rules)
+        }
+
+    def extract(self, text, found=None):
+        """
+        Field values in text, as a dict over every field. found is the result
+        for the text before it, so a document can be fed through in pieces.
+        """
+        values = {name: (found or {}).get(name) for name in self.fields}
+        for match in self.scanner.finditer(text or ''):
+            rule, first_group = self.rules[match.lastgroup]
+            for offset, name in enumerate(rule.fields):
+                if rule.overrides or not values[name]:
+                    normalize = self.fields[name]
+                    value = match.group(first_group + offset)
+                    values[name] = normalize(value) if normalize else value
+        return values
+
+
+patient_fields = FieldExtractor(FIELDS, RULES)
@@ -0,0 +1,134 @@
+import os
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .extraction import process_pdf
+from .models import ExtractionJob
+
+# DB-backed queue for PDF extraction. A worker claims a job with a
+# conditional UPDATE (status still 'queued'), so two workers can never take
+# the same job, and keeps a heartbeat on it while it runs. A job whose
+# heartbeat goes stale (the worker died or was killed) is requeued, up to
+# EXTRACTION_MAX_ATTEMPTS, so nothing is lost across restarts.
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def enqueue(uploaded_file):
+    """Store the upload and queue it. Returns the ExtractionJob."""
+    return ExtractionJob.objects.create(file=uploaded_file, original_name=uploaded_file.name)
+
+
+def claim_next(worker):
+    """Mark the oldest queued job running for worker and return it, or None if the queue is empty"""
+    while True:
+        job_id = (
+            ExtractionJob.objects.filter(status='queued')
+            .order_by('created_at').values_list('id', flat=True).first()
+        )
+        if job_id is None:
+            return None
+        now = timezone.now()
+        claimed = ExtractionJob.objects.filter(id=job_id, status='queued').update(
+            status='running', worker=worker, attempts=F('attempts') + 1,
+            started_at=now, heartbeat_at=now,
+        )
+        if claimed:
+            return ExtractionJob.objects.get(id=job_id)
+        # Another worker won the race for this job; try the next one
+
+
+def heartbeat(job_ids):
+    ExtractionJob.objects.filter(id__in=job_ids, status='running').update(heartbeat_at=timezone.now())
+
+
+def requeue_expired(lease_seconds=None, max_attempts=None):
+    """
+    Requeue running jobs whose worker stopped heartbeating, or fail them once
+    they have used up their attempts. Returns the number of jobs touched.
+    """
+    lease_seconds = lease_seconds or settings.EXTRACTION_LEASE_SECONDS
+    max_attempts = max_attempts or settings.EXTRACTION_MAX_ATTEMPTS
+    expired = ExtractionJob.objects.filter(
+        status='running', heartbeat_at__lt=timezone.now() - timedelta(seconds=lease_seconds)
+    )
+    with transaction.atomic():
+        failed = expired.filter(attempts__gte=max_attempts).update(
+            status='failed', error='Worker stopped responding', finished_at=timezone.now()
+        )
+        requeued = expired.update(status='queued', worker='')
+    return failed + requeued
+
+
+def release(job_ids):
+    """Hand unfinished jobs back to the queue on a clean shutdown, without spending an attempt"""
+    ExtractionJob.objects.filter(id__in=job_ids, status='running').update(
+        status='queued', worker='', attempts=F('attempts') - 1
+    )
+
+
+def _owned(job):
+    # A worker whose lease lapsed may find its job requeued and claimed again
+    # by the time it finishes; only the claim it still holds may record anything
+    return ExtractionJob.objects.filter(id=job.id, worker=job.worker, attempts=job.attempts, status='running')
+
+
+def _record(job, fields, drop_file):
+    if not _owned(job).update(**fields, **({'file': ''} if drop_file else {})):
+        return False
+    if drop_file:
+        # The extracted fields are all that's needed from here on
+        job.file.delete(save=False)
+    for name, value in fields.items():
+        setattr(job, name, value)
+    return True
+
+
+def finish(job, result_status, result):
+    """Store the job's result. Returns False, changing nothing, if the job is no longer job.worker's."""
+    return _record(job, {
+        'status': 'done', 'result_status': result_status, 'result': result, 'finished_at': timezone.now(),
+    }, drop_file=True)
+
+
+def fail(job, error, max_attempts=None):
+    """
+    Record a crashed attempt: requeue the job, or fail it once attempts run
+    out. Returns False, changing nothing, if the job is no longer job.worker's.
+    """
+    max_attempts = max_attempts or settings.EXTRACTION_MAX_ATTEMPTS
+    fields = {'error': error, 'worker': ''}
+    if job.attempts >= max_attempts:
+        return _record(job, {**fields, 'status': 'failed', 'finished_at': timezone.now()}, drop_file=True)
+    return _record(job, {**fields, 'status': 'queued'}, drop_file=False)
+
+
+def run_job_file(path):
+    """Extract one stored upload; runs in a worker pool process, which only touches the extraction cache"""
+    with open(path, 'rb') as pdf_file:
+        return process_pdf(pdf_file)
+
+
+def job_to_dict(job):
+    data = {
+        'id': str(job.id),
+        'status': job.status,
+        'file_name': job.original_name,
+        'attempts': job.attempts,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if job.status == 'done':
+        data['result_status'] = job.result_status
+        data['result'] = job.result
+    elif job.status == 'failed':
+        data['error'] = job.error
+    return data
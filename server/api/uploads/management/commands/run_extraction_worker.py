@@ -0,0 +1,158 @@
+import signal
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.uploads import jobs
+
+
+def child_ocr_workers(workers):
+    """
+    OCR processes each extraction process may start. Every child would
+    otherwise build its own pool of OCR_WORKERS, workers * OCR_WORKERS
+    Tesseracts in all (CPU count squared by default), so OCR_WORKERS is
+    shared out between them instead.
+    """
+    return max(1, settings.OCR_WORKERS // workers)
+
+
+@contextmanager
+def heartbeating(job_ids):
+    """
+    Keep job_ids' heartbeats fresh from a side thread while the body runs,
+    for extractions that block the thread that would otherwise send them.
+    """
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(settings.EXTRACTION_LEASE_SECONDS / 3):
+                jobs.heartbeat(job_ids)
+        finally:
+            # The thread's own connection, opened by its first heartbeat
+            connections.close_all()
+
+    thread = threading.Thread(target=beat, name='extraction-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _init_child(ocr_workers):
+    django.setup()
+    settings.OCR_WORKERS = ocr_workers
+
+
+class Command(BaseCommand):
+    help = 'Process queued PDF extraction jobs with a local pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.EXTRACTION_WORKERS,
+                            help='Extraction processes; 0 runs jobs inline in this process '
+                                 f'(default EXTRACTION_WORKERS, {settings.EXTRACTION_WORKERS})')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        self.worker = jobs.worker_name()
+        self.burst = options['burst']
+        self.poll_seconds = settings.EXTRACTION_POLL_SECONDS
+        requeued = jobs.requeue_expired()
+        if requeued:
+            self.stdout.write(f'Recovered {requeued} jobs from stopped workers')
+        if options['workers'] == 0:
+            self.run_inline()
+        else:
+            self.run_pool(options['workers'])
+
+    def run_inline(self):
+        while True:
+            job = jobs.claim_next(self.worker)
+            if job is None:
+                if self.burst:
+                    return
+                time.sleep(self.poll_seconds)
+                jobs.requeue_expired()
+                continue
+            try:
+                # A scan can take longer than the lease; without heartbeats
+                # the job would be requeued and extracted twice
+                with heartbeating([job.id]):
+                    result = jobs.run_job_file(job.file.path)
+                jobs.finish(job, *result)
+            except Exception as e:
+                jobs.fail(job, str(e))
+            self.report(job)
+
+    def new_pool(self, workers):
+        # Children inherit nothing useful from our DB connections
+        connections.close_all()
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_child,
+                                   initargs=(child_ocr_workers(workers),))
+
+    def run_pool(self, workers):
+        # Let SIGTERM (systemd, docker stop) unwind through the finally below
+        previous_handler = signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        pool = self.new_pool(workers)
+        running = {}  # future -> job
+        last_heartbeat = time.monotonic()
+        try:
+            while True:
+                while len(running) < workers:
+                    job = jobs.claim_next(self.worker)
+                    if job is None:
+                        break
+                    running[pool.submit(jobs.run_job_file, job.file.path)] = job
+
+                if not running:
+                    if self.burst:
+                        return
+                    time.sleep(self.poll_seconds)
+                    jobs.requeue_expired()
+                    continue
+
+                done, _ = wait(running, timeout=self.poll_seconds, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    job = running.pop(future)
+                    try:
+                        jobs.finish(job, *future.result())
+                    except BrokenProcessPool as e:
+                        # A child died (e.g. killed for memory); every job still in the pool is lost with it
+                        jobs.fail(job, f'Extraction process died: {e}')
+                        broken = True
+                    except Exception as e:
+                        jobs.fail(job, str(e))
+                    self.report(job)
+                if broken:
+                    for job in running.values():
+                        jobs.fail(job, 'Extraction process died')
+                    running.clear()
+                    pool.shutdown(cancel_futures=True)
+                    pool = self.new_pool(workers)
+
+                if running and time.monotonic() - last_heartbeat >= settings.EXTRACTION_LEASE_SECONDS / 3:
+                    jobs.heartbeat([job.id for job in running.values()])
+                    last_heartbeat = time.monotonic()
+        finally:
+            # Ctrl-C / SIGTERM: hand unfinished jobs straight back instead of waiting out the lease
+            jobs.release([job.id for job in running.values()])
+            pool.shutdown(wait=False, cancel_futures=True)
+            signal.signal(signal.SIGTERM, previous_handler)
+
+    def report(self, job):
+        outcome = job.result_status if job.status == 'done' else job.status
+        if job.status == 'running':
+            # finish()/fail() found the job requeued and claimed elsewhere
+            outcome = 'lost to another worker'
+        self.stdout.write(f'{job.id} {job.original_name}: {outcome}')
@@ -0,0 +1,48 @@
+import os
+import resource
+import sys
+
+MB = 1024 * 1024
+
+
+class MemoryBudgetExceeded(Exception):
+    pass
+
+
+def current_rss():
+    """Resident set size of this process in bytes"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # No /proc (macOS): the peak is the closest figure available
+        return peak_rss()
+
+
+def peak_rss():
+    """Highest resident set size this process has reached, in bytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MemoryBudget:
+    """
+    Caps how far this process's RSS may grow during one extraction.
+    limit is in bytes; None or 0 means unlimited. RSS is per process, so
+    extractions running in other threads count against it too.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit or None
+        self.baseline = current_rss() if self.limit else 0
+
+    def remaining(self):
+        if self.limit is None:
+            return None
+        return max(0, self.limit - (current_rss() - self.baseline))
+
+    def check(self):
+        """Raise MemoryBudgetExceeded once growth since the start passes the limit"""
+        if self.limit is not None and self.remaining() == 0:
+            raise MemoryBudgetExceeded(f'Extraction exceeded its {self.limit // MB} MB memory budget')
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0001_extraction_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractionCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64)),
+                ('extractor_version', models.CharField(max_length=16)),
+                ('text', models.TextField()),
+                ('result_status', models.PositiveSmallIntegerField()),
+                ('result', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_used_at'], name='extraction_cache_lru_idx')],
+                'constraints': [models.UniqueConstraint(fields=('sha256', 'extractor_version'), name='extraction_cache_key_uniq')],
+            },
+        ),
+    ]
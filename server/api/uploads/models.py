@@ -0,0 +1,62 @@
+import uuid
+
+from django.db import models
+
+
+class ExtractionJob(models.Model):
+    """A PDF queued for background extraction by run_extraction_worker"""
+    STATUSES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Deleted once the job finishes; only the result is kept
+    file = models.FileField(upload_to='extraction_jobs/', blank=True)
+    original_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUSES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    # HTTP status and body upload_pdf would have returned for this file
+    result_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Claiming the oldest queued job and finding expired leases
+            models.Index(fields=['status', 'created_at'], name='extraction_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.original_name} ({self.status})"
+
+
+class ExtractionCacheEntry(models.Model):
+    """Extraction outcome for one PDF's bytes under one extractor version (see result_cache.py)"""
+    sha256 = models.CharField(max_length=64)
+    extractor_version = models.CharField(max_length=16)
+    text = models.TextField()
+    # HTTP status and body upload_pdf returned for these bytes
+    result_status = models.PositiveSmallIntegerField()
+    result = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['sha256', 'extractor_version'], name='extraction_cache_key_uniq'),
+        ]
+        indexes = [
+            # LRU eviction
+            models.Index(fields=['last_used_at'], name='extraction_cache_lru_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sha256[:12]} v{self.extractor_version}"
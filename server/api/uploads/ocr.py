@@ -0,0 +1,232 @@
+import io
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytesseract
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+# OCR for scanned pages. With more than one worker each page is rasterized
+# and recognised in its own process, so an N-page scan keeps up to N cores
+# busy; results come back in page order. With one worker pages go through
+# temp files, keeping memory flat however long the scan. This module stays
+# free of Django imports so pool processes start quickly.
+
+TESSERACT_CONFIG = '--psm 6'
+_PAGE_SIZE_RE = re.compile(r'([\d.]+) x ([\d.]+) pts')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    # Tesseract's own OpenMP threads would fight the pool for the same cores
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+
+
+def _get_pool(workers):
+    # One long-lived pool per process, sized by the first caller (OCR_WORKERS)
+    # and shared by every document: spawning processes per document would
+    # cost more than OCR of a short scan. Documents limit how many of their
+    # pages are in flight rather than asking for a smaller pool. 'spawn'
+    # because web servers fork poorly once threads are running.
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+        return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def ocr_page(pdf_path, page_number, dpi, tesseract_cmd):
+    """Rasterize one page (1-based) of the PDF at pdf_path and OCR it"""
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number)
+    return ''.join(pytesseract.image_to_string(image, config=TESSERACT_CONFIG) for image in images)
+
+
+def ocr_region(pdf_path, page_number, dpi, top_fraction, tesseract_cmd):
+    """Rasterize one page (1-based) of the PDF at pdf_path and OCR its top top_fraction"""
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    texts = []
+    for image in convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number, grayscale=True):
+        width, height = image.size
+        texts.append(pytesseract.image_to_string(
+            image.crop((0, 0, width, int(height * top_fraction))), config=TESSERACT_CONFIG
+        ))
+        image.close()
+    return ''.join(texts)
+
+
+def _page_bitmap_bytes(info, dpi):
+    # pdfinfo reports the first page, e.g. 'Page size: 612 x 792 pts (letter)'
+    match = _PAGE_SIZE_RE.match(info.get('Page size', ''))
+    width, height = (float(match.group(1)), float(match.group(2))) if match else (612, 792)
+    return int(width / 72 * dpi) * int(height / 72 * dpi) * 3  # RGB
+
+
+def _file_path(pdf_file):
+    # Files already on disk (spooled uploads, stored job files) are read in
+    # place by Poppler instead of being copied out first
+    if hasattr(pdf_file, 'temporary_file_path'):
+        return pdf_file.temporary_file_path()
+    if isinstance(pdf_file, (io.BufferedReader, io.FileIO)) and isinstance(pdf_file.name, str):
+        return pdf_file.name
+    return None
+
+
+def _runs(page_numbers):
+    # [1, 2, 3, 7, 8] -> [(1, 3), (7, 8)]: one Poppler call per contiguous run
+    runs = []
+    for number in page_numbers:
+        if runs and runs[-1][1] == number - 1:
+            runs[-1][1] = number
+        else:
+            runs.append([number, number])
+    return runs
+
+
+class PageOCR:
+    """
+    OCR of selected pages of one PDF. Poppler reads files already on disk
+    where they are; anything else is copied to a temp file the first time a
+    page is needed, so text-only PDFs never pay for it. close() removes the
+    copy along with any page images.
+    """
+
+    def __init__(self, pdf_file, dpi=200, workers=1, tesseract_cmd=None, budget=None):
+        self.pdf_file = pdf_file
+        self.dpi = dpi
+        self.workers = workers
+        self.tesseract_cmd = tesseract_cmd or pytesseract.pytesseract.tesseract_cmd
+        self.budget = budget
+        # Whole pages recognised so far, for callers reporting what OCR ran
+        self.pages_ocred = 0
+        # Set by callers that carried on without OCR after it raised, so a
+        # result read around the failure isn't taken for the whole story
+        self.ocr_failed = False
+        self._temp_dir = None
+        self._path = None
+        self._info = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._temp_dir is not None:
+            self._temp_dir.cleanup()
+            self._temp_dir = None
+            self._path = None
+
+    @property
+    def temp_dir(self):
+        # Page images (and the document copy, when one is needed) go here
+        if self._temp_dir is None:
+            self._temp_dir = tempfile.TemporaryDirectory(prefix='ocr-')
+        return self._temp_dir.name
+
+    @property
+    def path(self):
+        if self._path is None:
+            self._path = _file_path(self.pdf_file)
+        if self._path is None:
+            self._path = os.path.join(self.temp_dir, 'document.pdf')
+            # pdfplumber may be mid-read on the same file; leave its position be
+            position = self.pdf_file.tell()
+            self.pdf_file.seek(0)
+            with open(self._path, 'wb') as copy:
+                shutil.copyfileobj(self.pdf_file, copy)
+            self.pdf_file.seek(position)
+        return self._path
+
+    @property
+    def info(self):
+        if self._info is None:
+            self._info = pdfinfo_from_path(self.path)
+        return self._info
+
+    def page_count(self):
+        return self.info['Pages']
+
+    def region(self, page_number, dpi, top_fraction):
+        """OCR text of the top top_fraction of one page (1-based) at dpi"""
+        return ocr_region(self.path, page_number, dpi, top_fraction, self.tesseract_cmd)
+
+    def pages(self, page_numbers):
+        """Yield the OCR text of each page in page_numbers (1-based), in order"""
+        if self.workers > 1 and len(page_numbers) > 1 and self._in_flight_limit() > 1:
+            return self._pages_pooled(page_numbers)
+        return self._pages_in_process(page_numbers)
+
+    def _in_flight_limit(self):
+        # Each page in flight is one bitmap held by a pool worker; keep them
+        # within what the memory budget has left
+        remaining = self.budget.remaining() if self.budget is not None else None
+        if remaining is None:
+            return self.workers
+        return min(self.workers, max(1, remaining // _page_bitmap_bytes(self.info, self.dpi)))
+
+    def _pages_in_process(self, page_numbers):
+        # pdftoppm writes the pages to disk and Tesseract reads the files
+        # itself, so no page bitmap is ever held in this process.
+        pytesseract.pytesseract.tesseract_cmd = self.tesseract_cmd
+        out_dir = self.temp_dir
+        for first, last in _runs(page_numbers):
+            paths = convert_from_path(
+                self.path, dpi=self.dpi, first_page=first, last_page=last, output_folder=out_dir, paths_only=True
+            )
+            for image_path in paths:
+                try:
+                    text = pytesseract.image_to_string(image_path, config=TESSERACT_CONFIG)
+                finally:
+                    os.remove(image_path)
+                self.pages_ocred += 1
+                yield text
+                if self.budget is not None:
+                    self.budget.check()
+
+    def _pages_pooled(self, page_numbers):
+        pool = _get_pool(self.workers)
+        pending = iter(page_numbers)
+        futures = deque()
+        try:
+            while True:
+                # Top up to the limit, which shrinks as the budget runs down
+                while len(futures) < self._in_flight_limit():
+                    number = next(pending, None)
+                    if number is None:
+                        break
+                    futures.append(pool.submit(ocr_page, self.path, number, self.dpi, self.tesseract_cmd))
+                if not futures:
+                    return
+                text = futures.popleft().result()
+                self.pages_ocred += 1
+                yield text
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool next time
+            _discard_pool(pool)
+            raise
+        finally:
+            # The caller may stop early once it has what it needs
+            for future in futures:
+                future.cancel()
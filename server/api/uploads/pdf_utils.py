@@ -1,124 +1,188 @@
 import pdfplumber
 import pytesseract
-from pdf2image import convert_from_bytes
-import re
+from contextlib import closing, nullcontext
 from django.conf import settings
+from .fields import normalize_date, patient_fields  # noqa: F401
+from .memory import MB, MemoryBudget, MemoryBudgetExceeded
+from .ocr import PageOCR
 
 # Set Tesseract path
 pytesseract.pytesseract.tesseract_cmd = settings.TESSERACT_CMD
 
-def normalize_date(date_str):
-    """Normalize date string to YYYY-MM-DD format"""
-    if not date_str:
-        return None
-    
-    # Replace dashes with slashes for consistent parsing
-    date_str = date_str.replace('-', '/')
-    parts = date_str.split('/')
-    
-    if len(parts) != 3:
-        return None
-    
-    month, day, year = parts
-    
-    # Handle 2-digit years
-    if len(year) == 2:
-        year_num = int(year)
-        if year_num >= 70:
-            year = f"19{year}"
-        else:
-            year = f"20{year}"
-    
-    # Pad with zeros
-    month = month.zfill(2)
-    day = day.zfill(2)
-    
-    return f"{year}-{month}-{day}"
-
-def extract_text_from_pdf(pdf_file):
-    """Extract text from PDF using pdfplumber first, then OCR if needed"""
-    text = ""
-    
-    # Try pdfplumber first
+# Pages with less text than this are treated as scans and OCRed
+MIN_PAGE_TEXT = 10
+
+def _page_text(page, budget):
     try:
-        with pdfplumber.open(pdf_file) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
+        text = page.extract_text() or ""
+    except Exception as e:
+        # Treated as a scan, so OCR gets a go at it
+        print(f"pdfplumber failed on page {page.page_number}: {e}")
+        text = ""
+    finally:
+        # Drop the page's parsed layout; pdfplumber otherwise keeps every
+        # page's objects until the document is closed
+        page.close()
+    budget.check()
+    return text
+
+def _is_scan(text):
+    return len(text.strip()) < MIN_PAGE_TEXT
+
+def _page_ocr(pdf_file, ocr_workers, memory_budget_mb):
+    if memory_budget_mb is None:
+        memory_budget_mb = settings.EXTRACTION_MEMORY_BUDGET_MB
+    if ocr_workers is None:
+        ocr_workers = settings.OCR_WORKERS
+    budget = MemoryBudget(memory_budget_mb * MB)
+    return PageOCR(pdf_file, dpi=settings.OCR_DPI, workers=ocr_workers, budget=budget)
+
+def iter_page_texts(pdf_file, ocr_workers=None, memory_budget_mb=None):
+    """
+    Yield the text of each page in order: its text layer, or OCR for pages
+    that have next to none (scans). Pages are only read as the caller asks
+    for them. Raises MemoryBudgetExceeded if the process grows by more than
+    memory_budget_mb (default EXTRACTION_MEMORY_BUDGET_MB) along the way.
+    """
+    with _page_ocr(pdf_file, ocr_workers, memory_budget_mb) as scans:
+        yield from _page_texts(pdf_file, scans)
+
+def _open_pdf(pdf_file):
+    try:
+        return pdfplumber.open(pdf_file)
     except Exception as e:
         print(f"pdfplumber failed: {e}")
-    
-    # If no text extracted, try OCR
-    if not text or len(text.strip()) < 10:
+        return None
+
+def _page_texts(pdf_file, scans):
+    pdf = _open_pdf(pdf_file)
+    if pdf is None:
+        yield from _rasterized_page_texts(scans)
+        return
+    with pdf:
+        yield from _pdf_page_texts(pdf, scans)
+
+def _rasterized_page_texts(scans):
+    # Not parseable as text; maybe Poppler can still rasterize it
+    try:
+        pages = [(number, "") for number in range(1, scans.page_count() + 1)]
+    except Exception as e:
+        print(f"OCR failed: {e}")
+        scans.ocr_failed = True
+        return
+    yield from _with_ocr(scans, pages)
+
+def _pdf_page_texts(pdf, scans, first_page_text=None):
+    # first_page_text is page 1's text layer when the caller has read it already
+    budget = scans.budget
+    # Scans found together are OCRed together, enough of them to keep the
+    # OCR workers (or one Poppler call) busy
+    window = max(scans.workers, settings.OCR_PAGE_WINDOW)
+    ocr_ok = True
+    index = 0
+    while index < len(pdf.pages):
+        if index == 0 and first_page_text is not None:
+            text = first_page_text
+        else:
+            text = _page_text(pdf.pages[index], budget)
+        if not ocr_ok or not _is_scan(text):
+            yield text
+            index += 1
+            continue
+        pages = [(index + 1, text)]
+        pages += [(page.page_number, _page_text(page, budget))
+                  for page in pdf.pages[index + 1:index + window]]
+        ocr_ok = yield from _with_ocr(scans, pages)
+        index += len(pages)
+
+def _with_ocr(scans, pages):
+    # Yield the (page_number, text_layer) pages with scans replaced by OCR
+    # text, recognised lazily. Returns False if OCR failed, after which the
+    # remaining pages keep their text layers.
+    ocr_texts = scans.pages([number for number, text in pages if _is_scan(text)])
+    ocr_ok = True
+    try:
+        for number, text in pages:
+            if ocr_ok and _is_scan(text):
+                try:
+                    text = next(ocr_texts)
+                except MemoryBudgetExceeded:
+                    raise
+                except Exception as e:
+                    print(f"OCR failed: {e}")
+                    scans.ocr_failed = True
+                    ocr_ok = False
+            yield text
+    finally:
+        ocr_texts.close()
+    return ocr_ok
+
+def extract_text_from_pdf(pdf_file, ocr_workers=None, memory_budget_mb=None):
+    """Extract text from every page of a PDF, OCRing scanned pages"""
+    pages = iter_page_texts(pdf_file, ocr_workers=ocr_workers, memory_budget_mb=memory_budget_mb)
+    return "".join(text + "\n" for text in pages if text)
+
+def _first_page_text(pdf, budget):
+    # Page 1's text layer; "" (so a scan, left to OCR) if there is none to read
+    try:
+        return _page_text(pdf.pages[0], budget) if pdf.pages else ""
+    except MemoryBudgetExceeded:
+        raise
+    except Exception:
+        return ""
+
+def _header_tiers(scans):
+    # Yield (tier, text, info) for each header crop of page 1 OCR manages
+    for dpi, fraction in settings.OCR_HEADER_TIERS:
         try:
-            # Reset file pointer
-            pdf_file.seek(0)
-            pdf_bytes = pdf_file.read()
-            
-            # Convert PDF to images
-            images = convert_from_bytes(pdf_bytes, dpi=200)
-            
-            for image in images:
-                # Use pytesseract for OCR
-                page_text = pytesseract.image_to_string(image, config='--psm 6')
-                if page_text:
-                    text += page_text + "\n"
-                    
+            text = scans.region(1, dpi, fraction)
         except Exception as e:
             print(f"OCR failed: {e}")
-    
-    return text
+            scans.ocr_failed = True
+            return
+        scans.budget.check()
+        yield f"header@{dpi}dpi", text, extract_patient_info(text)
 
-def extract_patient_info(text):
-    """Extract patient information from text"""
-    if not text:
-        return {
-            'patient_first_name': None,
-            'patient_last_name': None,
-            'dob': None
-        }
-    
-    first_name = None
-    last_name = None
-    dob = None
-    
-    lines = text.split('\n')
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Look for "Patient Name: John Doe" or "Name: John Doe"
-        name_match = re.search(r'\b(?:Patient Name|Name)\b\s*:\s*([A-Za-z][A-Za-z\-\']*)\s+([A-Za-z][A-Za-z\-\']*)', line, re.IGNORECASE)
-        if name_match:
-            first_name = name_match.group(1)
-            last_name = name_match.group(2)
-        
-        # Look for "Patient Name: Doe, John" or "Name: Doe, John"
-        comma_match = re.search(r'\b(?:Patient Name|Name)\b\s*:\s*([A-Za-z][A-Za-z\-\']*)\s*,\s*([A-Za-z][A-Za-z\-\']*)', line, re.IGNORECASE)
-        if comma_match:
-            last_name = comma_match.group(1)
-            first_name = comma_match.group(2)
-        
-        # Look for separate "First Name: John" patterns
-        first_match = re.search(r'\b(?:First Name|Given Name|First)\b\s*:\s*([A-Za-z][A-Za-z\-\']*)', line, re.IGNORECASE)
-        if first_match and not first_name:
-            first_name = first_match.group(1)
-        
-        # Look for separate "Last Name: Doe" patterns
-        last_match = re.search(r'\b(?:Last Name|Family Name|Surname|Last)\b\s*:\s*([A-Za-z][A-Za-z\-\']*)', line, re.IGNORECASE)
-        if last_match and not last_name:
-            last_name = last_match.group(1)
-        
-        # Look for DOB patterns
-        dob_match = re.search(r'\b(?:DOB|Date of Birth)\b\s*:\s*(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})', line, re.IGNORECASE)
-        if dob_match:
-            dob = normalize_date(dob_match.group(1))
-    
-    return {
-        'patient_first_name': first_name,
-        'patient_last_name': last_name,
-        'dob': dob
-    }
+def extract_patient_info_from_pdf(pdf_file, ocr_workers=None, memory_budget_mb=None):
+    """
+    Extract patient information page by page, stopping as soon as every
+    field has been found. A scanned first page is tried first with the
+    OCR_HEADER_TIERS crops, which are far cheaper than whole pages.
+    Returns (text read, info, ocr_tier, ocr_failed): ocr_tier names the OCR
+    pass the result came from, or None if the text layer sufficed;
+    ocr_failed is True if OCR raised and some scan went unread.
+    """
+    with _page_ocr(pdf_file, ocr_workers, memory_budget_mb) as scans:
+        pdf = _open_pdf(pdf_file)
+        with pdf if pdf is not None else nullcontext():
+            # The document is parsed once and page 1 read once, both for the
+            # scan check and as the first page of the per-page loop
+            first_page_text = _first_page_text(pdf, scans.budget) if pdf is not None else ""
+            if _is_scan(first_page_text):
+                for tier, text, info in _header_tiers(scans):
+                    if all(info.values()):
+                        return text, info, tier, scans.ocr_failed
+
+            text = ""
+            info = extract_patient_info("")
+            if pdf is not None:
+                pages = _pdf_page_texts(pdf, scans, first_page_text)
+            else:
+                pages = _rasterized_page_texts(scans)
+            with closing(pages):
+                for page_text in pages:
+                    if not page_text:
+                        continue
+                    text += page_text + "\n"
+                    info = extract_patient_info(page_text, found=info)
+                    if all(info.values()):
+                        break
+        ocr_tier = f"page@{scans.dpi}dpi" if scans.pages_ocred else None
+        return text, info, ocr_tier, scans.ocr_failed
+
+def extract_patient_info(text, found=None):
+    """
+    Extract patient information from text. found is the result for the
+    text before it, so a document can be fed through a page at a time.
+    """
+    return patient_fields.extract(text, found=found)
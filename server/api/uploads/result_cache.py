@@ -0,0 +1,85 @@
+import hashlib
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ExtractionCacheEntry
+
+# Persistent cache of extraction results keyed by the SHA-256 of the PDF
+# bytes. Entries also carry the extractor version, a digest of the source of
+# every module that shapes the result and of the OCR settings, so editing the
+# extraction logic or retuning OCR retires all older entries without anyone
+# having to remember to bump it.
+
+EXTRACTOR_SOURCES = ['pdf_utils.py', 'fields.py', 'ocr.py', 'extraction.py']
+
+
+def _extractor_version():
+    digest = hashlib.sha256()
+    for name in EXTRACTOR_SOURCES:
+        digest.update((Path(__file__).parent / name).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+EXTRACTOR_VERSION = _extractor_version()
+
+
+def extractor_version():
+    """EXTRACTOR_VERSION combined with the settings that decide what OCR reads"""
+    digest = hashlib.sha256(EXTRACTOR_VERSION.encode())
+    digest.update(repr((settings.OCR_DPI, [tuple(tier) for tier in settings.OCR_HEADER_TIERS])).encode())
+    return digest.hexdigest()[:16]
+
+
+def file_sha256(pdf_file):
+    """SHA-256 of an open file, read in chunks; leaves the file at the start"""
+    digest = hashlib.sha256()
+    pdf_file.seek(0)
+    for chunk in iter(lambda: pdf_file.read(1024 * 1024), b''):
+        digest.update(chunk)
+    pdf_file.seek(0)
+    return digest.hexdigest()
+
+
+def _enabled():
+    return settings.EXTRACTION_CACHE_MAX_ENTRIES > 0
+
+
+def lookup(sha256):
+    """(result_status, result) cached for these bytes, or None"""
+    if not _enabled():
+        return None
+    entry = (
+        ExtractionCacheEntry.objects
+        .filter(sha256=sha256, extractor_version=extractor_version())
+        .values_list('id', 'result_status', 'result').first()
+    )
+    if entry is None:
+        return None
+    entry_id, result_status, result = entry
+    ExtractionCacheEntry.objects.filter(id=entry_id).update(last_used_at=timezone.now())
+    return result_status, result
+
+
+def store(sha256, text, result_status, result):
+    if not _enabled():
+        return
+    # ignore_conflicts: a concurrent extraction of the same file may have stored it first
+    ExtractionCacheEntry.objects.bulk_create([ExtractionCacheEntry(
+        sha256=sha256, extractor_version=extractor_version(), text=text,
+        result_status=result_status, result=result, last_used_at=timezone.now(),
+    )], ignore_conflicts=True)
+    evict(settings.EXTRACTION_CACHE_MAX_ENTRIES)
+
+
+def evict(max_entries):
+    """Drop entries from older extractor versions, then the least recently used beyond max_entries"""
+    deleted, _ = ExtractionCacheEntry.objects.exclude(extractor_version=extractor_version()).delete()
+    stale = list(
+        ExtractionCacheEntry.objects.order_by('-last_used_at', '-id')
+        .values_list('id', flat=True)[max_entries:]
+    )
+    if stale:
+        deleted += ExtractionCacheEntry.objects.filter(id__in=stale).delete()[0]
+    return deleted
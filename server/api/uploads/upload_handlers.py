@@ -0,0 +1,128 @@
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from rest_framework import status
+
+PDF_MAGIC = b'%PDF-'
+# PDF readers accept the header anywhere in the first 1024 bytes
+MAGIC_WINDOW = 1024
+# Local file header, or the end record of an empty archive
+ZIP_MAGICS = (b'PK\x03\x04', b'PK\x05\x06')
+# Multipart boundaries, part headers and small form fields around the file
+MULTIPART_OVERHEAD = 64 * 1024
+NOT_A_PDF = 'File is not a PDF'
+NOT_A_ZIP = 'File is not a ZIP archive'
+UNSUPPORTED_TYPE = 'Unsupported file type. Please upload a PDF.'
+
+
+class PDFUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams an upload straight to a temp file, whatever its size, hashing it
+    and checking for the PDF header on the way. A file that turns out to be
+    too large or not a PDF is dropped as soon as that is known, with the
+    reason left on request.upload_rejection as (http_status, message). The
+    finished file carries its SHA-256 hex digest as .sha256.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.max_bytes = settings.PDF_MAX_FILE_MB * 1024 * 1024
+        # A body this big can only hold an oversized file: refuse it unread
+        self.body_too_large = content_length > self.max_bytes + MULTIPART_OVERHEAD
+
+    def new_file(self, *args, **kwargs):
+        self.digest = hashlib.sha256()
+        self.head = b''
+        self.checked = False
+        self.file = None
+        super().new_file(*args, **kwargs)
+        if self.body_too_large:
+            self._reject_too_large()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_bytes:
+            self._reject_too_large()
+        if not self.checked:
+            self.head += raw_data[:MAGIC_WINDOW - len(self.head)]
+            if len(self.head) >= MAGIC_WINDOW:
+                self._check_magic()
+        self.digest.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        # Empty files pass; extraction reports them like any other unreadable PDF.
+        # SkipFile isn't caught this late, so a short non-PDF is dropped by
+        # returning no file instead.
+        if not self.checked and self.head and not self._has_magic():
+            self._record_rejection(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, self._wrong_type())
+            return None
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.digest.hexdigest()
+        return self.file
+
+    def _has_magic(self):
+        return PDF_MAGIC in self.head
+
+    def _wrong_type(self):
+        return NOT_A_PDF
+
+    def _check_magic(self):
+        self.checked = True
+        if not self._has_magic():
+            self._reject(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, self._wrong_type())
+
+    def _reject_too_large(self):
+        self._reject(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, f'PDF is larger than {settings.PDF_MAX_FILE_MB} MB')
+
+    def _record_rejection(self, http_status, message):
+        self.request.upload_rejection = (http_status, message)
+        if self.file is not None:
+            # Deletes the temp file
+            self.file.close()
+
+    def _reject(self, http_status, message):
+        self._record_rejection(http_status, message)
+        raise SkipFile()
+
+
+class BatchUploadHandler(PDFUploadHandler):
+    """
+    PDFUploadHandler for upload_batch, where each file of the request is
+    checked on its own: a PDF as above, a ZIP archive for its header and
+    against PDF_MAX_FILE_MB * BATCH_MAX_FILES (its members are capped
+    individually when it is expanded), and anything else is dropped unread.
+    Every file refused is listed on request.upload_rejections as
+    (file_name, http_status, message).
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.request.upload_rejections = []
+        # A batch body holds many files; only each file is capped
+        self.body_too_large = False
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        self.is_zip = file_name.lower().endswith('.zip')
+        max_mb = settings.PDF_MAX_FILE_MB * (settings.BATCH_MAX_FILES if self.is_zip else 1)
+        self.max_bytes = max_mb * 1024 * 1024
+        super().new_file(field_name, file_name, *args, **kwargs)
+        if not self.is_zip and not file_name.lower().endswith('.pdf'):
+            self._reject(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, UNSUPPORTED_TYPE)
+
+    def _has_magic(self):
+        if self.is_zip:
+            return self.head.startswith(ZIP_MAGICS)
+        return super()._has_magic()
+
+    def _wrong_type(self):
+        return NOT_A_ZIP if self.is_zip else NOT_A_PDF
+
+    def _reject_too_large(self):
+        if self.is_zip:
+            max_mb = settings.PDF_MAX_FILE_MB * settings.BATCH_MAX_FILES
+            self._reject(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, f'ZIP archive is larger than {max_mb} MB')
+        super()._reject_too_large()
+
+    def _record_rejection(self, http_status, message):
+        super()._record_rejection(http_status, message)
+        self.request.upload_rejections.append((self.file_name, http_status, message))
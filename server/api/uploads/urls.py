@@ -3,5 +3,9 @@ from . import views
 
 urlpatterns = [
     path('health/', views.health_check, name='health_check'),
+    path('ocr/stats/', views.ocr_stats, name='ocr_stats'),
+    path('batch/', views.upload_batch, name='upload_batch'),
+    path('jobs/', views.create_extraction_job, name='create_extraction_job'),
+    path('jobs/<uuid:job_id>/', views.extraction_job, name='extraction_job'),
     path('', views.upload_pdf, name='upload_pdf'),
 ]
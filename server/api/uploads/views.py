@@ -1,39 +1,107 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.urls import reverse
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from .pdf_utils import extract_text_from_pdf, extract_patient_info
+from ..orders.intake import get_or_create_patient_order
+from ..orders.serializers import order_to_dict
+from .batch import aiter_batch_results, batch_items, iter_batch_results
+from .extraction import process_pdf, tier_stats
+from .jobs import enqueue, job_to_dict
+from .models import ExtractionJob
+from .upload_handlers import BatchUploadHandler, PDFUploadHandler
 
 @api_view(['GET'])
 def health_check(request):
     """Health check endpoint"""
     return Response({'ok': True, 'message': 'API is working'})
 
-@api_view(['POST'])
-def upload_pdf(request):
-    """Upload and process PDF file"""
+@api_view(['GET'])
+def ocr_stats(request):
+    """Successful extractions per OCR tier in this process"""
+    return Response(tier_stats())
+
+def _get_pdf(request):
+    """The uploaded PDF, or an error Response"""
+    # Spool to disk, hashing and checking the header as it streams in; this
+    # has to be set before anything reads the request body
+    request._request.upload_handlers = [PDFUploadHandler(request._request)]
     if not request.FILES.get('file'):
-        return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        rejection = getattr(request._request, 'upload_rejection', None)
+        if rejection:
+            rejection_status, message = rejection
+            return None, Response({'error': message}, status=rejection_status)
+        return None, Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
     
     pdf_file = request.FILES['file']
     
     # Check file type
     if not pdf_file.name.lower().endswith('.pdf'):
-        return Response({'error': 'Unsupported file type. Please upload a PDF.'}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        return None, Response({'error': 'Unsupported file type. Please upload a PDF.'}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+    return pdf_file, None
+
+def _wants_order(request):
+    value = request.query_params.get('create_order', request.data.get('create_order', ''))
+    return str(value).lower() in ('1', 'true', 'yes')
+
+@api_view(['POST'])
+def upload_pdf(request):
+    """Upload and process PDF file; with create_order=true also create (or match) the patient's order"""
+    pdf_file, error = _get_pdf(request)
+    if error:
+        return error
+    
+    result_status, body = process_pdf(pdf_file)
+    if result_status != status.HTTP_200_OK or not _wants_order(request):
+        return Response(body, status=result_status)
     
+    order, created = get_or_create_patient_order(body['extracted'])
+    body = {**body, 'order': order_to_dict(order), 'order_created': created}
+    return Response(body, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+@api_view(['POST'])
+def upload_batch(request):
+    """Extract a bundle of PDFs (repeated 'files' fields, ZIP archives expanded), streaming NDJSON per file"""
+    # Spool each file to disk, checking its size and header as it streams in
+    request._request.upload_handlers = [BatchUploadHandler(request._request)]
+    uploads = request.FILES.getlist('files')
+    rejected = getattr(request._request, 'upload_rejections', [])
+    if not uploads and not rejected:
+        return Response({'error': 'files is required'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Files the handler dropped still get their line
+    items = list(batch_items(uploads))
+    items += [(name, None, (rejection_status, {'error': message})) for name, rejection_status, message in rejected]
+    if len(items) > settings.BATCH_MAX_FILES:
+        return Response({'error': f'A batch can hold at most {settings.BATCH_MAX_FILES} files'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    
+    # Lines go out as files finish, not in upload order; 'index' says which is which.
+    # Under ASGI a sync iterator would be buffered whole before sending.
+    results = aiter_batch_results if isinstance(request._request, ASGIRequest) else iter_batch_results
+    return StreamingHttpResponse(results(items, settings.BATCH_EXTRACTION_WORKERS),
+                                 content_type='application/x-ndjson')
+
+@api_view(['POST'])
+def create_extraction_job(request):
+    """Queue a PDF for background extraction - 202 with a job to poll"""
+    pdf_file, error = _get_pdf(request)
+    if error:
+        return error
+    
+    job = enqueue(pdf_file)
+    location = reverse('extraction_job', kwargs={'job_id': job.id})
+    return Response(job_to_dict(job), status=status.HTTP_202_ACCEPTED,
+                    headers={'Location': location, 'Retry-After': '1'})
+
+@api_view(['GET'])
+def extraction_job(request, job_id):
+    """Status of an extraction job, with upload_pdf's result once it is done"""
     try:
-        # Extract text from PDF
-        text = extract_text_from_pdf(pdf_file)
-        
-        if not text or len(text.strip()) < 10:
-            return Response({'error': 'No extractable text found in PDF'}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
-        
-        # Extract patient information
-        extracted = extract_patient_info(text)
-        
-        if not extracted['patient_first_name'] and not extracted['patient_last_name'] and not extracted['dob']:
-            return Response({'error': 'Could not extract patient info from PDF'}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
-        
-        return Response({'extracted': extracted})
-        
-    except Exception as e:
-        return Response({'error': 'Failed to process PDF', 'details': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        job = ExtractionJob.objects.get(id=job_id)
+    except ExtractionJob.DoesNotExist:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    headers = {'Retry-After': '1'} if job.status in ('queued', 'running') else {}
+    return Response(job_to_dict(job), headers=headers)
@@ -1,6 +1,16 @@
+from django.conf import settings
 from django.urls import path, include
 
 urlpatterns = [
     path('upload/', include('api.uploads.urls')),
+]
+
+if settings.ORDERS_ASYNC_VIEWS:
+    # ASGI mode: serve the order list/detail routes from the async views;
+    # every other orders/ route falls through to the sync URLconf below.
+    urlpatterns.append(path('orders/', include('api.orders.async_urls')))
+
+urlpatterns += [
     path('orders/', include('api.orders.urls')),
+    path('async/orders/', include('api.orders.async_urls')),
 ]
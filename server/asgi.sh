@@ -0,0 +1,12 @@
+#!/bin/bash
+
+# Serve the API under ASGI (uvicorn) with the native async order views
+
+# Activate virtual environment
+source venv/bin/activate
+
+export ORDERS_ASYNC_VIEWS=true
+
+# Run Django under uvicorn; set WEB_CONCURRENCY for more worker processes
+# (the order cache then defaults to a shared FileBasedCache, see settings.py)
+uvicorn django_backend.asgi:application --host 0.0.0.0 --port 8001 --workers ${WEB_CONCURRENCY:-1}
@@ -0,0 +1,47 @@
+"""Shared bootstrap for the benchmark scripts in this directory."""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django(temp_db=True, disable_order_cache=True):
+    """
+    Configure Django for a benchmark run. By default points the database at
+    a fresh temporary SQLite file (migrated) and swaps the order response
+    cache for DummyCache so reads hit the database. Set DB_PROFILE in the
+    environment to pick the database profile.
+    """
+    sys.path.insert(0, str(SERVER_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_backend.settings')
+    if temp_db:
+        # Read by settings.py, so every database alias points at the temp file
+        db_dir = tempfile.mkdtemp(prefix='orders-bench-')
+        os.environ['SQLITE_PATH'] = str(Path(db_dir) / 'bench.sqlite3')
+
+    from django.conf import settings
+
+    settings.DEBUG = False  # Don't accumulate connection.queries
+    settings.ALLOWED_HOSTS = ['testserver']  # django.test.Client's host
+    if disable_order_cache:
+        settings.CACHES['orders'] = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+
+    import django
+    django.setup()
+
+    if temp_db:
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+
+
+def seed_orders(count, batch_size=5000):
+    from api.orders.models import Order
+
+    statuses = ['new', 'processing', 'complete']
+    for start in range(0, count, batch_size):
+        Order.objects.bulk_create([
+            Order(patient_first_name=f'First{i}', patient_last_name=f'Last{i}', status=statuses[i % 3])
+            for i in range(start, min(start + batch_size, count))
+        ])
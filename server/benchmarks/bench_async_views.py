@@ -0,0 +1,81 @@
+"""
+Concurrent-request throughput of the WSGI (sync DRF) and ASGI (async ORM)
+order views.
+
+Both paths run in-process against the same temporary SQLite database: the
+WSGI path drives django.test.Client from a thread pool, the ASGI path
+drives AsyncClient from one event loop. The order response cache is
+disabled so every request reaches the ORM.
+
+    python benchmarks/bench_async_views.py --orders 5000 --requests 2000 --concurrency 1 10 50
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _django import seed_orders, setup_django
+
+
+def run_wsgi(path, requests, concurrency):
+    from django.test import Client
+
+    def worker(count):
+        client = Client()
+        for _ in range(count):
+            assert client.get(path).status_code == 200
+
+    per_worker = [requests // concurrency] * concurrency
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(worker, per_worker))
+    return sum(per_worker) / (time.perf_counter() - start)
+
+
+def run_asgi(path, requests, concurrency):
+    from django.test import AsyncClient
+
+    async def worker(count):
+        client = AsyncClient()
+        for _ in range(count):
+            response = await client.get(path)
+            assert response.status_code == 200
+
+    async def main():
+        per_worker = [requests // concurrency] * concurrency
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(count) for count in per_worker))
+        return sum(per_worker) / (time.perf_counter() - start)
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--limit', type=int, default=50, help='page size for list requests')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50])
+    args = parser.parse_args()
+
+    setup_django()
+    seed_orders(args.orders)
+
+    from api.orders.models import Order
+    order_id = Order.objects.values_list('id', flat=True).first()
+    cases = [
+        ('list', f'/api/orders/?limit={args.limit}', f'/api/async/orders/?limit={args.limit}'),
+        ('detail', f'/api/orders/{order_id}/', f'/api/async/orders/{order_id}/'),
+    ]
+
+    print(f'{args.orders} orders, {args.requests} requests per run')
+    print(f"{'endpoint':<8} {'conc':>5} {'wsgi req/s':>11} {'asgi req/s':>11}")
+    for name, sync_path, async_path in cases:
+        for concurrency in args.concurrency:
+            wsgi = run_wsgi(sync_path, args.requests, concurrency)
+            asgi = run_asgi(async_path, args.requests, concurrency)
+            print(f'{name:<8} {concurrency:>5} {wsgi:>11.0f} {asgi:>11.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Throughput of patient field extraction on large OCR-like texts.
+
+Times extract_patient_info (one compiled scanner over the whole text)
+against the previous implementation, five re.search calls per line, on
+generated text of --megabytes MB each, with the fields near the end so
+both have to read all of it. Best of --repeat runs.
+
+    python benchmarks/bench_fields.py --megabytes 1 4 --repeat 5
+"""
+import argparse
+import random
+import re
+import time
+
+from _django import setup_django
+
+WORDS = ['the', 'patient', 'was', 'seen', 'for', 'follow', 'up', 'name', 'first', 'last', 'date', 'of',
+         'visit', 'notes', 'reviewed', 'plan', 'dob', 'given', '12/04/2019', 'mg', 'daily']
+
+
+def sample_text(megabytes, seed=0):
+    rng = random.Random(seed)
+    lines, size = [], 0
+    while size < megabytes * 1024 * 1024:
+        line = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 14)))
+        lines.append(line)
+        size += len(line) + 1
+    lines[-20:-20] = ['Patient Name: Jane Roe', 'DOB: 02/03/1980']
+    return '\n'.join(lines)
+
+
+def per_line_extract(text, normalize_date):
+    # extract_patient_info before the compiled scanner, for comparison
+    first_name = last_name = dob = None
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        name_match = re.search(r'\b(?:Patient Name|Name)\b\s*:\s*([A-Za-z][A-Za-z\-\']*)\s+([A-Za-z][A-Za-z\-\']*)', line, re.IGNORECASE)
+        if name_match:
+            first_name, last_name = name_match.group(1), name_match.group(2)
+        comma_match = re.search(r'\b(?:Patient Name|Name)\b\s*:\s*([A-Za-z][A-Za-z\-\']*)\s*,\s*([A-Za-z][A-Za-z\-\']*)', line, re.IGNORECASE)
+        if comma_match:
+            last_name, first_name = comma_match.group(1), comma_match.group(2)
+        first_match = re.search(r'\b(?:First Name|Given Name|First)\b\s*:\s*([A-Za-z][A-Za-z\-\']*)', line, re.IGNORECASE)
+        if first_match and not first_name:
+            first_name = first_match.group(1)
+        last_match = re.search(r'\b(?:Last Name|Family Name|Surname|Last)\b\s*:\s*([A-Za-z][A-Za-z\-\']*)', line, re.IGNORECASE)
+        if last_match and not last_name:
+            last_name = last_match.group(1)
+        dob_match = re.search(r'\b(?:DOB|Date of Birth)\b\s*:\s*(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})', line, re.IGNORECASE)
+        if dob_match:
+            dob = normalize_date(dob_match.group(1))
+    return {'patient_first_name': first_name, 'patient_last_name': last_name, 'dob': dob}
+
+
+def best_time(extract, text, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = extract(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--megabytes', type=float, nargs='+', default=[1, 4])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django(temp_db=False)
+    from api.uploads.pdf_utils import extract_patient_info, normalize_date
+
+    print(f"{'MB':>6}{'per line':>12}{'scanner':>12}{'speedup':>10}  (MB/s)")
+    for megabytes in args.megabytes:
+        text = sample_text(megabytes)
+        old, expected = best_time(lambda t: per_line_extract(t, normalize_date), text, args.repeat)
+        new, result = best_time(extract_patient_info, text, args.repeat)
+        assert result == expected, (result, expected)
+        print(f'{megabytes:>6g}{megabytes / old:>12.1f}{megabytes / new:>12.1f}{old / new:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
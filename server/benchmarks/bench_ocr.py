@@ -0,0 +1,67 @@
+"""
+Wall time of OCR for scanned PDFs against page count and OCR worker count.
+
+Builds image-only PDFs (no text layer, like a fax) with Pillow and times
+extract_text_from_pdf on each for every --workers value. Worker pools are
+warmed up before timing, as they would be in a long-running server.
+Needs Tesseract (TESSERACT_CMD) and Poppler installed.
+
+    python benchmarks/bench_ocr.py --pages 1 5 20 --workers 1 2 4 8
+"""
+import argparse
+import io
+import shutil
+import time
+
+from _django import setup_django
+
+
+def scanned_pdf(pages, dpi=200):
+    from PIL import Image, ImageDraw, ImageFont
+
+    font = ImageFont.load_default(size=36)
+    images = []
+    for number in range(1, pages + 1):
+        image = Image.new('L', (int(8.5 * dpi), 11 * dpi), 255)
+        draw = ImageDraw.Draw(image)
+        lines = [f'Referral page {number}', 'Patient Name: Jane Roe', 'DOB: 02/03/1980']
+        lines += [f'Clinical note line {i} for page {number}' for i in range(30)]
+        for row, line in enumerate(lines):
+            draw.text((150, 150 + row * 60), line, fill=0, font=font)
+        images.append(image)
+    out = io.BytesIO()
+    images[0].save(out, format='PDF', save_all=True, append_images=images[1:], resolution=dpi)
+    return out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 5, 20])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    setup_django(temp_db=False, disable_order_cache=False)
+    from django.conf import settings
+
+    from api.uploads.pdf_utils import extract_text_from_pdf
+
+    if not shutil.which(settings.TESSERACT_CMD) or not shutil.which('pdftoppm'):
+        raise SystemExit('Tesseract (TESSERACT_CMD) and Poppler (pdftoppm) are required')
+
+    documents = {pages: scanned_pdf(pages) for pages in args.pages}
+    for workers in args.workers:
+        extract_text_from_pdf(io.BytesIO(documents[min(args.pages)]), ocr_workers=workers)
+
+    print(f"{'pages':>6}" + ''.join(f'{f"{w} workers":>12}' for w in args.workers) + '  (seconds)')
+    for pages, pdf_bytes in documents.items():
+        timings = []
+        for workers in args.workers:
+            start = time.perf_counter()
+            text = extract_text_from_pdf(io.BytesIO(pdf_bytes), ocr_workers=workers)
+            timings.append(time.perf_counter() - start)
+            assert 'Roe' in text, 'OCR produced no usable text'
+        print(f'{pages:>6}' + ''.join(f'{t:>12.2f}' for t in timings))
+
+
+if __name__ == '__main__':
+    main()
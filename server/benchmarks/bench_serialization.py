@@ -0,0 +1,60 @@
+"""
+Rows/second for building and encoding order list responses.
+
+Compares the old path (model instances -> order_to_dict -> DRF's
+JSONRenderer) with values_list rows -> row_to_dict, encoded by DRF's
+renderer and by FastJSONRenderer (orjson when installed). Each figure
+covers the query, the dicts and the encoded bytes; best of --repeat runs.
+
+    python benchmarks/bench_serialization.py --sizes 10000 100000 --repeat 3
+"""
+import argparse
+import time
+
+from _django import seed_orders, setup_django
+
+
+def best_rate(build, size, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = build(size)
+        best = min(best, time.perf_counter() - start)
+    assert body
+    return size / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    seed_orders(max(args.sizes))
+
+    from rest_framework.renderers import JSONRenderer
+
+    from api.orders.models import Order
+    from api.orders.renderers import FastJSONRenderer, orjson
+    from api.orders.serializers import order_rows, order_to_dict, row_to_dict
+
+    def ordered():
+        return Order.objects.order_by('-created_at', '-id')
+
+    drf, fast = JSONRenderer(), FastJSONRenderer()
+    cases = [
+        ('instances + drf', lambda n: drf.render([order_to_dict(o) for o in ordered()[:n]])),
+        ('values_list + drf', lambda n: drf.render([row_to_dict(r) for r in order_rows(ordered())[:n]])),
+        ('values_list + fast', lambda n: fast.render([row_to_dict(r) for r in order_rows(ordered())[:n]])),
+    ]
+
+    print(f"FastJSONRenderer backend: {'orjson' if orjson else 'json (orjson not installed)'}")
+    print(f"{'path':<20}" + ''.join(f'{size:>14}' for size in args.sizes) + '  (rows/s)')
+    for name, build in cases:
+        rates = [best_rate(build, size, args.repeat) for size in args.sizes]
+        print(f'{name:<20}' + ''.join(f'{rate:>14.0f}' for rate in rates))
+
+
+if __name__ == '__main__':
+    main()
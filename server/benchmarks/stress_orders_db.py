@@ -0,0 +1,83 @@
+"""
+Hammer orders_list with concurrent POSTs and GETs against a temporary
+SQLite file and report throughput and failures such as "database is locked".
+
+Run it with the production database profile to exercise WAL, busy_timeout
+and the read/write router:
+
+    DB_PROFILE=production python benchmarks/stress_orders_db.py --writers 8 --readers 8 --seconds 5
+
+Exits non-zero if any request failed.
+"""
+import argparse
+import threading
+import time
+from collections import Counter
+
+from _django import setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db import connections
+    from django.test import Client
+
+    from api.orders.models import Order
+
+    results = Counter()
+    errors = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.seconds
+
+    def run(kind):
+        client = Client()
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    if kind == 'write':
+                        response = client.post('/api/orders/', {
+                            'patient_first_name': 'Stress', 'patient_last_name': threading.current_thread().name,
+                        }, content_type='application/json')
+                        ok = response.status_code == 201
+                    else:
+                        response = client.get('/api/orders/?limit=20')
+                        ok = response.status_code == 200
+                    outcome = f'{kind}_ok' if ok else f'{kind}_http_{response.status_code}'
+                except Exception as e:  # "database is locked" surfaces as OperationalError
+                    outcome = f'{kind}_error'
+                    with lock:
+                        errors.append(repr(e))
+                with lock:
+                    results[outcome] += 1
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=run, args=('write',), name=f'w{i}') for i in range(args.writers)]
+    threads += [threading.Thread(target=run, args=('read',), name=f'r{i}') for i in range(args.readers)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    created = Order.objects.count()
+    print(f"writes ok: {results['write_ok']} ({results['write_ok'] / elapsed:.0f}/s), "
+          f"reads ok: {results['read_ok']} ({results['read_ok'] / elapsed:.0f}/s), rows: {created}")
+    failures = {k: v for k, v in results.items() if not k.endswith('_ok')}
+    if failures or created != results['write_ok']:
+        print(f'failures: {failures}')
+        for error in sorted(set(errors))[:5]:
+            print(f'  {error}')
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
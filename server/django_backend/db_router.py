@@ -0,0 +1,25 @@
+from django.db import connections
+
+
+class ReadWriteRouter:
+    """
+    Send reads to the read-only 'replica' connection and writes to 'default'.
+
+    Reads made inside a transaction on 'default' stay there so they see that
+    transaction's own uncommitted writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if connections['default'].in_atomic_block:
+            return 'default'
+        return 'replica'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same SQLite file
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
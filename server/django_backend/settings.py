@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -83,13 +84,107 @@ WSGI_APPLICATION = 'django_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+SQLITE_PATH = os.getenv('SQLITE_PATH', str(BASE_DIR / 'db.sqlite3'))
+
+# DB_PROFILE=production tunes SQLite for concurrent traffic (see below)
+DB_PROFILE = os.getenv('DB_PROFILE', 'development')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': SQLITE_PATH,
     }
 }
 
+if DB_PROFILE == 'production':
+    # Applied on every new connection. WAL lets readers run alongside the
+    # single writer; synchronous=NORMAL is durable across app crashes in WAL
+    # mode; busy_timeout makes a blocked writer wait instead of failing with
+    # "database is locked".
+    SQLITE_PRAGMAS = [
+        'PRAGMA journal_mode = WAL',
+        'PRAGMA synchronous = NORMAL',
+        f"PRAGMA busy_timeout = {int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '30000'))}",
+        f"PRAGMA mmap_size = {int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))}",
+        f"PRAGMA cache_size = -{int(os.getenv('SQLITE_CACHE_SIZE_KB', str(64 * 1024)))}",
+        'PRAGMA temp_store = MEMORY',
+    ]
+    _sqlite_common = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': SQLITE_PATH,
+        # Persistent connections instead of one per request
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': True,
+    }
+    DATABASES = {
+        'default': {
+            **_sqlite_common,
+            'OPTIONS': {
+                # Take the write lock at BEGIN so concurrent writers queue on
+                # busy_timeout rather than deadlocking on a lock upgrade.
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '30000')) / 1000,
+                'init_command': '; '.join(SQLITE_PRAGMAS),
+            },
+        },
+        # Same file, separate connection that refuses writes
+        'replica': {
+            **_sqlite_common,
+            'OPTIONS': {
+                'init_command': '; '.join(SQLITE_PRAGMAS + ['PRAGMA query_only = ON']),
+            },
+            'TEST': {'MIRROR': 'default'},
+        },
+    }
+    DATABASE_ROUTERS = ['django_backend.db_router.ReadWriteRouter']
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# 'orders' holds order responses keyed by database-owned versions (see
+# api/orders/cache.py), so any backend stays correct whichever process
+# writes. LocMemCache is per-process, though, so each worker builds its own
+# copy of every entry; when WEB_CONCURRENCY (uvicorn's worker count, see
+# asgi.sh) is above 1 the default is FileBasedCache in a directory every
+# worker shares (it culls at random rather than least recently used).
+# ORDERS_CACHE_BACKEND/ORDERS_CACHE_LOCATION override either choice.
+
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', '1'))
+if WEB_CONCURRENCY > 1:
+    _ORDERS_CACHE = ('django.core.cache.backends.filebased.FileBasedCache',
+                     os.path.join(tempfile.gettempdir(), 'orders-cache'))
+else:
+    _ORDERS_CACHE = ('django.core.cache.backends.locmem.LocMemCache', 'orders')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'orders': {
+        'BACKEND': os.getenv('ORDERS_CACHE_BACKEND', _ORDERS_CACHE[0]),
+        'LOCATION': os.getenv('ORDERS_CACHE_LOCATION', _ORDERS_CACHE[1]),
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('ORDERS_CACHE_MAX_ENTRIES', '5000')),
+            # Evict the least recently used 1/N entries when full
+            'CULL_FREQUENCY': 10,
+        },
+    },
+}
+
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+# FastJSONRenderer encodes with orjson when it is installed and falls back
+# to DRF's JSONRenderer otherwise.
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.orders.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -150,13 +245,63 @@ CORS_ALLOW_HEADERS = [
     'x-csrftoken',
     'x-requested-with',
 ]
+# Response headers the client reads: pagination links and the change sequence of a list page
+CORS_EXPOSE_HEADERS = ['Link', 'X-Changes-Seq']
+
+# Serve /api/orders/ list and detail from the native async views (ASGI only, see asgi.sh)
+ORDERS_ASYNC_VIEWS = os.getenv('ORDERS_ASYNC_VIEWS', 'False').lower() == 'true'
+
+# Order change feed (Server-Sent Events)
+ORDER_CHANGES_POLL_SECONDS = float(os.getenv('ORDER_CHANGES_POLL_SECONDS', '1'))
+# Streams end after this long; EventSource reconnects and resumes from Last-Event-ID
+ORDER_CHANGES_STREAM_SECONDS = float(os.getenv('ORDER_CHANGES_STREAM_SECONDS', '300'))
 
-# File upload settings
+# archive_orders moves complete orders not updated for this many days to OrderArchive
+ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv('ORDER_ARCHIVE_AFTER_DAYS', '90'))
+
+# File upload settings. PDF uploads to upload_pdf and jobs always stream to a temp
+# file (api/uploads/upload_handlers.py); these apply to other uploads such as batches.
 FILE_UPLOAD_MAX_MEMORY_SIZE = 20 * 1024 * 1024  # 20MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 20 * 1024 * 1024  # 20MB
 
+# Largest PDF accepted for extraction: single and job uploads (PDFUploadHandler) and ZIP members in batches
+PDF_MAX_FILE_MB = int(os.getenv('PDF_MAX_FILE_MB', '50'))
+# Batch uploads (POST /api/upload/batch/): files per request, and how many are extracted at once
+BATCH_MAX_FILES = int(os.getenv('BATCH_MAX_FILES', '100'))
+BATCH_EXTRACTION_WORKERS = int(os.getenv('BATCH_EXTRACTION_WORKERS', '4'))
+
+# Uploaded files waiting for a background extraction job (api/uploads/jobs.py)
+MEDIA_ROOT = os.getenv('MEDIA_ROOT', str(BASE_DIR / 'media'))
+
+# PDF extraction jobs (python manage.py run_extraction_worker)
+EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', str(os.cpu_count() or 1)))
+EXTRACTION_POLL_SECONDS = float(os.getenv('EXTRACTION_POLL_SECONDS', '1'))
+# A running job whose worker hasn't heartbeated for this long is requeued
+EXTRACTION_LEASE_SECONDS = int(os.getenv('EXTRACTION_LEASE_SECONDS', '300'))
+EXTRACTION_MAX_ATTEMPTS = int(os.getenv('EXTRACTION_MAX_ATTEMPTS', '3'))
+
 # Tesseract path (adjust for your system)
 # For macOS with Homebrew: /opt/homebrew/bin/tesseract
 # For Ubuntu: /usr/bin/tesseract
 # For Windows: r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-TESSERACT_CMD = os.getenv('TESSERACT_CMD', '/opt/homebrew/bin/tesseract')
\ No newline at end of file
+TESSERACT_CMD = os.getenv('TESSERACT_CMD', '/opt/homebrew/bin/tesseract')
+
+# Processes OCRing the pages of one scanned PDF in parallel; 1 OCRs in-process, page by page.
+# run_extraction_worker splits this between its processes rather than giving each as many
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', str(os.cpu_count() or 1)))
+# Scanned pages looked ahead for and OCRed together (at least OCR_WORKERS)
+OCR_PAGE_WINDOW = int(os.getenv('OCR_PAGE_WINDOW', '4'))
+# Resolution whole pages are OCRed at
+OCR_DPI = int(os.getenv('OCR_DPI', '200'))
+# Header crops OCRed first when page 1 is a scan, as 'dpi:fraction of the page
+# from the top' in order; the first to find every patient field wins, and
+# only then are whole pages OCRed. Results name the tier used in ocr_tier.
+OCR_HEADER_TIERS = [
+    (int(dpi), float(fraction))
+    for dpi, fraction in (tier.split(':') for tier in os.getenv('OCR_HEADER_TIERS', '150:0.33,300:0.33').split(',') if tier)
+]
+# extract_text_from_pdf fails with 413 once the process has grown by this much; 0 disables the check
+EXTRACTION_MEMORY_BUDGET_MB = int(os.getenv('EXTRACTION_MEMORY_BUDGET_MB', '1024'))
+
+# Extraction results cached by PDF content hash (api/uploads/result_cache.py); 0 disables
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv('EXTRACTION_CACHE_MAX_ENTRIES', '10000'))